@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends, HTTPException
+from app.models.user import User
+from app.core.dependencies import get_current_user
+from app.core.pool_stats import pool_stats, pool_status
+from app.core.session import engine, replica_engine
+from app.core.metrics import InstrumentedRoute
+from app.core.sql_budget import sql_budget
+from app.jobs.task_stats import run_task_stats_reconciliation
+
+router = APIRouter(route_class=InstrumentedRoute)
+
+
+def require_admin(current_user: User = Depends(get_current_user)) -> User:
+    if current_user.role != "Admin":
+        raise HTTPException(status_code=403, detail="Permiso denegado")
+    return current_user
+
+
+@router.get("/pool")
+@sql_budget(1)
+async def read_pool_stats(_: User = Depends(require_admin)):
+    """Estado del pool de conexiones de este worker (y el de la réplica, si hay)."""
+    status = pool_status(engine.sync_engine.pool)
+    if replica_engine is not None:
+        # Las latencias de checkout solo se miden en el pool del primario
+        status["replica"] = pool_status(replica_engine.sync_engine.pool, stats=None)
+    return status
+
+
+@router.post("/pool/reset")
+@sql_budget(1)
+async def reset_pool_stats(_: User = Depends(require_admin)):
+    pool_stats.reset()
+    return {"reiniciado": "ok"}
+
+
+@router.post("/task-stats/reconcile")
+@sql_budget(6)
+async def reconcile_task_stats(_: User = Depends(require_admin)):
+    """Reconstruye task_stats ahora y devuelve las diferencias encontradas."""
+    try:
+        return await run_task_stats_reconciliation()
+    except Exception as e:
+        print(f"Error reconciling task_stats: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error interno del servidor")
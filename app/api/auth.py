@@ -5,16 +5,21 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.config import settings
 from app.models.user import User
 from app.schemas.user_schema import AccessToken, LoginRequest, UserCreate, UserResponse
-from app.services.user_service import get_user_by_email, create_user
+from app.services.user_service import get_user_by_email, create_user, set_password_hash
 from app.core.session import get_db
 from app.core.dependencies import get_current_user
-from app.core.security import create_access_token
+from app.core.passwords import verify_password
+from app.core.security import create_access_token, decode_token
+from app.core.etag import etag_matches, not_modified, set_etag, weak_etag
 from app.core.token_blacklist import add_token_to_blacklist
+from app.core.metrics import InstrumentedRoute
+from app.core.sql_budget import sql_budget
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute)
 
 
 @router.post("/login", response_model=AccessToken)
+@sql_budget(4)
 async def login(
     response: Response,  
     login_data: LoginRequest,
@@ -25,8 +30,12 @@ async def login(
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Usuario no existe")
     if db_user.deleted:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Usuario no habilitado")
-    if not login_data.password == db_user.password:
+    valid, new_hash = await verify_password(login_data.password, db_user.password)
+    if not valid:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Credenciales inválidas")
+    if new_hash:
+        # Migración transparente: contraseña en claro o hash con parámetros de coste antiguos
+        await set_password_hash(db, db_user.id, new_hash)
 
     access_token = create_access_token(data={"sub": db_user.email, "role": str(db_user.role)})
     
@@ -44,6 +53,7 @@ async def login(
     
 
 @router.post("/register", response_model=UserResponse)
+@sql_budget(6)
 async def register(
     user: UserCreate, 
     db: AsyncSession = Depends(get_db),
@@ -82,10 +92,18 @@ async def register(
     
 
 @router.get("/me", response_model=UserResponse)
+@sql_budget(1)
 async def get_current_user_data(
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db), 
     current_user: User = Depends(get_current_user)
     ):
+    # El usuario ya viene de la caché de principals: el 304 no toca la base de datos
+    etag = weak_etag("user", current_user.id, current_user.updated_at.isoformat())
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
     try:
         return UserResponse(
             id=current_user.id,
@@ -101,8 +119,16 @@ async def get_current_user_data(
 
 
 
+async def _revoke(db: AsyncSession, token: str) -> None:
+    # Un token inválido o ya expirado no necesita revocarse
+    payload = decode_token(token)
+    if payload:
+        await add_token_to_blacklist(db, payload, token)
+
+
 @router.get("/logout")
-async def logout(request: Request):
+@sql_budget(4)
+async def logout(request: Request, db: AsyncSession = Depends(get_db)):
     response = JSONResponse(
         status_code=200,
         content={"message": "Sesión finalizada"}
@@ -120,11 +146,11 @@ async def logout(request: Request):
         if not token:
             token = token_from_header
         elif token != token_from_header:
-            add_token_to_blacklist(token_from_header)
+            await _revoke(db, token_from_header)
 
     if token:
         print(f"Adding to blacklist: {token}")  # Para depuración
-        add_token_to_blacklist(token)
+        await _revoke(db, token)
 
     response.delete_cookie(
         key="access_token",
@@ -1,22 +1,58 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+import asyncio
+import json
+from typing import AsyncIterator, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, WebSocket, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from pydantic import ValidationError
 from app.config import settings
-from app.models.task import Task
+from app.models.task import Task, TaskStatus
 from app.models.user import User
-from app.schemas.task_schema import PaginatedTasks, TaskResponse, TaskCreate, TaskUpdate
+from app.schemas.task_schema import (
+    PaginatedTasks,
+    TaskBatchCreate,
+    TaskBatchDelete,
+    TaskBatchItemResult,
+    TaskBatchResponse,
+    TaskBatchUpdate,
+    TaskImportError,
+    TaskImportSummary,
+    TaskResponse,
+    TaskStats,
+    TaskCreate,
+    TaskUpdate,
+)
 from app.services.task_service import (
     get_task,
+    get_task_stamp,
+    get_task_stats,
     get_tasks_by_user,
+    get_tasks_version,
+    search_tasks,
+    stream_user_tasks,
+    EXPORT_FIELDS,
     create_task,
+    create_tasks,
     update_task,
+    update_tasks,
     deactivate_task,
+    deactivate_tasks,
+    import_tasks,
 )
-from app.core.session import get_db
-from app.core.dependencies import get_current_user
+from app.core.counters import TotalMode
+from app.core.etag import etag_matches, not_modified, set_etag, weak_etag
+from app.core.export import MEDIA_TYPES, ExportFormat, serialize_stream
+from app.core.ingest import InvalidUpload, LineTooLong, multipart_file, read_records
+from app.core.task_events import DROPPED, Subscription, task_events
+from app.core.pagination import InvalidCursor, next_page_cursor
+from app.core.search_index import InvalidSearch
+from app.core.responses import fast_response, model_row, model_rows
+from app.core.dependencies import get_current_user, get_read_db, get_streaming_user, get_write_db, read_session_factory
+from app.core.metrics import InstrumentedRoute
+from app.core.sql_budget import sql_budget
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute)
 
 
 def require_admin(current_user: User = Depends(get_current_user)) -> User:
@@ -25,147 +61,385 @@ def require_admin(current_user: User = Depends(get_current_user)) -> User:
     return current_user
 
 
+def _task_etag(task_id: str, updated_at) -> str:
+    return weak_etag("task", task_id, updated_at.isoformat())
+
+
 @router.get("", response_model=List[TaskResponse])
+@sql_budget(3)
 async def read_my_tasks(
+    request: Request,
     limit: int = Query(default=settings.DEFAULT_LIMIT, ge=1, le=settings.MAX_LIMIT),
     offset: int = Query(default=0, ge=0),
-    db: AsyncSession = Depends(get_db),
+    status: Optional[TaskStatus] = Query(default=None),
+    cursor: Optional[str] = Query(default=None),
+    response: Response = None,
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ):
+    # La versión se lee antes que las filas: si cambia entremedias, el ETag queda viejo y se revalida
+    version = await get_tasks_version(db, current_user.id)
+    etag = weak_etag("tasks", current_user.id, version, limit, offset, status, cursor)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+
     tasks, _ = await get_tasks_by_user(
-        db, user_id=current_user.id, limit=limit, offset=offset
+        db, user_id=current_user.id, limit=limit, offset=offset, status=status, cursor=cursor,
+        total_mode=TotalMode.none,
     )
-    return [
-        TaskResponse(
-            id=task.id,
-            task_name=task.task_name,
-            description=task.description,
-            status=task.status,
-            user_id=task.user_id,
-            created_at=task.created_at,
-            updated_at=task.updated_at,
-        )
-        for task in tasks
-    ]
+    next_cursor = next_page_cursor(tasks, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return fast_response(model_rows(TaskResponse, tasks), response)
     
 @router.get("/filter", response_model=PaginatedTasks, tags=["Tareas"])
+@sql_budget(3)
 async def filter_list_tasks(
-    db: AsyncSession = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
     limit: int = Query(default=settings.DEFAULT_LIMIT, ge=1, le=settings.MAX_LIMIT),
     offset: int = Query(default=0, ge=0),
     search: Optional[str] = Query(default=None),
+    cursor: Optional[str] = Query(default=None),
+    total_mode: TotalMode = Query(default=TotalMode.exact),
 ):
     try:
-        
-        stmt = select(Task).where(
-            Task.deleted == False,
-            Task.user_id == current_user.id  
-        ).order_by(Task.created_at.desc())
-
-        result = await db.execute(stmt)
-        tasks = result.scalars().all()
-
-        tasks_dict = [{
-            "id": str(task.id),
-            "task_name": task.task_name,
-            "description": task.description,
-            "status": task.status,
-            "user_id": task.user_id,
-            "created_at": task.created_at,
-            "updated_at": task.updated_at
-        } for task in tasks]
-
-        if search:
-            search_term = search.lower().strip()
-            filtered_tasks = []
-
-            for task in tasks_dict:
-                score = 0
-                task_name = (task["task_name"] or "").lower()
-                description = (task["description"] or "").lower()
-                status = (task["status"] or "").lower()
-
-                if task_name.startswith(search_term):
-                    score += 100
-                elif search_term in task_name:
-                    score += 30
-
-                if description and (description.startswith(search_term) or search_term in description):
-                    score += 50
-
-                if status.startswith(search_term) or search_term in status:
-                    score += 20
-
-                if score > 0:
-                    task["score"] = score
-                    filtered_tasks.append(task)
-
-            filtered_tasks.sort(key=lambda x: (-x["score"], x["task_name"]))
-            tasks_dict = filtered_tasks
-
-        total_tasks = len(tasks_dict)
-        paginated_tasks = tasks_dict[offset: offset + limit]
-
-        return {
+        tasks, total_tasks, next_cursor = await search_tasks(
+            db, user_id=current_user.id, search=search, limit=limit, offset=offset, cursor=cursor,
+            total_mode=total_mode,
+        )
+
+        return fast_response({
             "total": total_tasks,
-            "tasks": paginated_tasks,
+            "tasks": model_rows(TaskResponse, tasks),
             "limit": limit,
             "offset": offset,
-        }
+            "next_cursor": next_cursor,
+        }, response)
+
+    except (InvalidCursor, InvalidSearch):
+        raise
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al obtener tareas: {str(e)}")
 
 
+@router.get("/stats", response_model=TaskStats, tags=["Tareas"])
+@sql_budget(3)
+async def read_my_task_stats(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Tareas activas del usuario por estado, leídas de task_stats (sin recorrer las tareas)."""
+    try:
+        version = await get_tasks_version(db, current_user.id)
+        etag = weak_etag("task-stats", current_user.id, version)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        set_etag(response, etag)
+
+        stats = await get_task_stats(db, current_user.id)
+        return TaskStats(**stats, total=sum(stats.values()))
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al obtener estadísticas: {str(e)}")
+
+
+@router.get("/export")
+@sql_budget(2)
+async def export_my_tasks(
+    request: Request,
+    format: ExportFormat = Query(default=ExportFormat.ndjson),
+    current_user: User = Depends(get_streaming_user),
+):
+    user_id = current_user.id
+    session_factory = read_session_factory(request, current_user)
+
+    async def rows():
+        # Única sesión de la ruta: se abre al empezar a enviar el cuerpo y se cierra al terminar
+        async with session_factory() as db:
+            async for chunk in stream_user_tasks(db, user_id):
+                yield chunk
+
+    return StreamingResponse(
+        serialize_stream(EXPORT_FIELDS, rows(), format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="tasks.{format.value}"'},
+    )
+
+
+def _require_task_events() -> None:
+    if not settings.TASK_EVENTS:
+        raise HTTPException(status_code=404, detail="Los eventos de tareas están desactivados")
+
+
+async def _sse_events(request: Request, user_id: str) -> AsyncIterator[str]:
+    async with task_events.subscribe(user_id) as subscription:
+        yield "retry: 3000\n\n"
+        while True:
+            event = await subscription.next(settings.TASK_EVENTS_HEARTBEAT)
+            if event is None:
+                if await request.is_disconnected():
+                    return
+                # Comentario SSE: mantiene viva la conexión a través de proxies
+                yield ": ping\n\n"
+                continue
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+            if event["type"] == DROPPED:
+                return
+
+
+@router.get("/stream")
+@sql_budget(1)
+async def stream_my_task_events(
+    request: Request,
+    # Sin get_db: una sesión de la dependencia seguiría abierta mientras dure el stream
+    current_user: User = Depends(get_streaming_user),
+):
+    """Eventos `created`, `updated` y `deleted` (con los ids) de las tareas del usuario, por SSE.
+
+    `resync` avisa de que pudo perderse algún evento y `dropped` de que la conexión se cierra
+    por no leer a tiempo; en ambos casos el cliente debe volver a leer sus tareas.
+    """
+    _require_task_events()
+    return StreamingResponse(
+        _sse_events(request, current_user.id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _send_events(websocket: WebSocket, subscription: Subscription) -> None:
+    heartbeat = settings.TASK_EVENTS_HEARTBEAT
+    while True:
+        event = await subscription.next(heartbeat) or {"type": "ping"}
+        # Un cliente que no lee bloquea el envío: se trata como consumidor lento
+        await asyncio.wait_for(websocket.send_json(event), heartbeat)
+        if event["type"] == DROPPED:
+            return
+
+
+async def _wait_disconnect(websocket: WebSocket) -> None:
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+
+
+@router.websocket("/ws")
+async def task_events_websocket(websocket: WebSocket):
+    """Los mismos eventos que /tasks/stream por WebSocket (token en la cabecera o en la cookie)."""
+    if not settings.TASK_EVENTS:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Eventos desactivados")
+        return
+    # Sesión solo para autenticar: no se mantiene abierta mientras dura la conexión
+    try:
+        current_user = await get_streaming_user(websocket)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Not authenticated")
+        return
+
+    await websocket.accept()
+    async with task_events.subscribe(current_user.id) as subscription:
+        sender = asyncio.create_task(_send_events(websocket, subscription))
+        receiver = asyncio.create_task(_wait_disconnect(websocket))
+        done, pending = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        if sender in done:
+            reason = "Consumidor lento" if subscription.dropped or sender.exception() else ""
+            try:
+                await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason=reason)
+            except RuntimeError:
+                pass
+
+
+def _upload_chunks(request: Request) -> AsyncIterator[bytes]:
+    """Cuerpo en crudo o, si es multipart, el campo `file`; en ambos casos según llega."""
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        return multipart_file(request.stream(), content_type)
+    return request.stream()
+
+
+def _validation_detail(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, item['loc']))}: {item['msg']}" for item in error.errors())
+
+
+@router.post("/import", response_model=TaskImportSummary)
+@sql_budget(None, allow_repeats=True)
+async def import_my_tasks(
+    request: Request,
+    format: ExportFormat = Query(default=ExportFormat.ndjson),
+    db: AsyncSession = Depends(get_write_db),
+    current_user: User = Depends(get_current_user),
+):
+    summary = TaskImportSummary()
+    chunk: List[TaskCreate] = []
+
+    async def flush() -> None:
+        summary.imported += await import_tasks(db, chunk, current_user.id)
+        # Única excepción a que confirme get_db: cada bloque es su propia transacción,
+        # así una importación grande no retiene una transacción (ni sus locks) de principio a fin
+        await db.commit()
+        summary.chunks += 1
+        chunk.clear()
+
+    try:
+        async for line, record, error in read_records(_upload_chunks(request), format):
+            if record is not None:
+                try:
+                    chunk.append(TaskCreate.model_validate(record))
+                except ValidationError as validation:
+                    error = _validation_detail(validation)
+            if error is not None:
+                summary.failed += 1
+                if len(summary.errors) < settings.IMPORT_MAX_ERRORS:
+                    summary.errors.append(TaskImportError(line=line, detail=error))
+            elif len(chunk) >= settings.IMPORT_CHUNK_SIZE:
+                await flush()
+    except (InvalidUpload, LineTooLong) as error:
+        # Los bloques anteriores ya están confirmados: se indica cuántas tareas entraron
+        code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE if isinstance(error, LineTooLong) else status.HTTP_400_BAD_REQUEST
+        raise HTTPException(status_code=code, detail=f"{error} (importadas antes: {summary.imported})")
+
+    if chunk:
+        await flush()
+    return summary
+
+
 @router.post("", response_model=TaskResponse, status_code=status.HTTP_201_CREATED)
+@sql_budget(6)
 async def create_task_route(
     task: TaskCreate,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_write_db),
     current_user: User = Depends(get_current_user),
 ):
     new_task = await create_task(db, task, current_user.id)
     return TaskResponse.model_validate(new_task)
 
 
+def _batch_response(results: List[TaskBatchItemResult]) -> TaskBatchResponse:
+    succeeded = sum(1 for result in results if result.ok)
+    return TaskBatchResponse(succeeded=succeeded, failed=len(results) - succeeded, results=results)
+
+
+@router.post("/batch", response_model=TaskBatchResponse, status_code=status.HTTP_201_CREATED)
+@sql_budget(6)
+async def create_tasks_batch(
+    batch: TaskBatchCreate,
+    db: AsyncSession = Depends(get_write_db),
+    current_user: User = Depends(get_current_user),
+):
+    new_tasks = await create_tasks(db, batch.tasks, current_user.id)
+    return _batch_response([
+        TaskBatchItemResult(index=index, id=task.id, ok=True, task=TaskResponse.model_validate(task))
+        for index, task in enumerate(new_tasks)
+    ])
+
+
+@router.patch("/batch", response_model=TaskBatchResponse)
+@sql_budget(7)
+async def update_tasks_batch(
+    batch: TaskBatchUpdate,
+    db: AsyncSession = Depends(get_write_db),
+    current_user: User = Depends(get_current_user),
+):
+    seen = set()
+    unique_items = []
+    for item in batch.tasks:
+        if item.id not in seen:
+            seen.add(item.id)
+            unique_items.append(item)
+
+    updated = await update_tasks(db, unique_items, current_user.id)
+
+    results = []
+    reported = set()
+    for index, item in enumerate(batch.tasks):
+        if item.id in reported:
+            results.append(TaskBatchItemResult(index=index, id=item.id, ok=False, detail="Tarea duplicada en el lote"))
+            continue
+        reported.add(item.id)
+        task = updated.get(item.id)
+        if task is None:
+            results.append(TaskBatchItemResult(index=index, id=item.id, ok=False, detail="Tarea no encontrada"))
+        else:
+            results.append(TaskBatchItemResult(index=index, id=item.id, ok=True, task=TaskResponse.model_validate(task)))
+    return _batch_response(results)
+
+
+@router.delete("/batch", response_model=TaskBatchResponse)
+@sql_budget(5)
+async def delete_tasks_batch(
+    batch: TaskBatchDelete,
+    db: AsyncSession = Depends(get_write_db),
+    current_user: User = Depends(get_current_user),
+):
+    deleted = set(await deactivate_tasks(db, list(dict.fromkeys(batch.ids)), current_user.id))
+
+    results = []
+    reported = set()
+    for index, task_id in enumerate(batch.ids):
+        if task_id in reported:
+            results.append(TaskBatchItemResult(index=index, id=task_id, ok=False, detail="Tarea duplicada en el lote"))
+        elif task_id in deleted:
+            results.append(TaskBatchItemResult(index=index, id=task_id, ok=True))
+        else:
+            results.append(TaskBatchItemResult(index=index, id=task_id, ok=False, detail="Tarea no encontrada"))
+        reported.add(task_id)
+    return _batch_response(results)
+
+
 @router.get("/{task_id}", response_model=TaskResponse)
+@sql_budget(3)
 async def read_my_task(
     task_id: str,
-    db: AsyncSession = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ):    
+    if request.headers.get("if-none-match"):
+        # Revalidación: basta con updated_at, sin cargar ni descifrar la tarea
+        stamp = await get_task_stamp(db, task_id)
+        if stamp and stamp.user_id == current_user.id:
+            etag = _task_etag(task_id, stamp.updated_at)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+
     task = await get_task(db, task_id)
     if not task or task.user_id != current_user.id:
         raise HTTPException(status_code=404, detail="Tarea no encontrada")
-    return TaskResponse.model_validate(task)
+    set_etag(response, _task_etag(task.id, task.updated_at))
+    return fast_response(model_row(TaskResponse, task), response)
 
 
 @router.put("/{task_id}", response_model=TaskResponse)
+@sql_budget(7)
 async def update_my_task(
     task_id: str,
     task: TaskUpdate,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_write_db),
     current_user: User = Depends(get_current_user),
 ):
-    db_task = await get_task(db, task_id)
-    if not db_task or db_task.user_id != current_user.id:
-        raise HTTPException(status_code=404, detail="Tarea no encontrada")
-
     task_updated = await update_task(db, task_id, task, current_user.id)
+    if not task_updated:
+        raise HTTPException(status_code=404, detail="Tarea no encontrada")
     return TaskResponse.model_validate(task_updated)
 
 
 @router.delete("/{task_id}", status_code=status.HTTP_200_OK)
+@sql_budget(5)
 async def delete_my_task(
     task_id: str,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_write_db),
     current_user: User = Depends(get_current_user),
 ):
-    db_task = await get_task(db, task_id)
-    if not db_task or db_task.user_id != current_user.id:
+    if not await deactivate_task(db, task_id, current_user.id):
         raise HTTPException(status_code=404, detail="Tarea no encontrada")
-
-    await deactivate_task(db, task_id, current_user.id)
     return {"eliminada": "ok"}
 
 
@@ -1,5 +1,5 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy import func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
@@ -8,15 +8,25 @@ from app.models.user import Log, User
 from app.schemas.user_schema import LogOut, PaginatedLogsResponse, PaginatedUsers, UserResponse, UserUpdate
 from app.services.user_service import (
     get_user, 
+    get_user_stamp,
     get_users, 
+    get_users_version,
+    search_users,
     update_user, 
     deactivate_user, 
     activate_user
 )
-from app.core.session import get_db
-from app.core.dependencies import get_current_user
+from app.services.log_service import list_logs
+from app.core.counters import TotalMode
+from app.core.etag import etag_matches, not_modified, set_etag, weak_etag
+from app.core.pagination import InvalidCursor, next_page_cursor
+from app.core.search_index import InvalidSearch
+from app.core.responses import fast_response, model_row, model_rows
+from app.core.dependencies import get_current_user, get_read_db, get_write_db
+from app.core.metrics import InstrumentedRoute
+from app.core.sql_budget import sql_budget
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute)
 
 
 def require_admin(current_user: User = Depends(get_current_user)) -> User:
@@ -25,113 +35,86 @@ def require_admin(current_user: User = Depends(get_current_user)) -> User:
     return current_user
 
 
+def _user_etag(user_id: str, updated_at) -> str:
+    # Mismo valor que GET /auth/me: la representación es la misma
+    return weak_etag("user", user_id, updated_at.isoformat())
+
+
 @router.get("", response_model=List[UserResponse])
+@sql_budget(3)
 async def read_users(
+    request: Request,
     limit: int = Query(default=settings.DEFAULT_LIMIT, ge=1, le=settings.MAX_LIMIT),
     offset: int = Query(default=0, ge=0),
-    db: AsyncSession = Depends(get_db),
+    cursor: Optional[str] = Query(default=None),
+    response: Response = None,
+    db: AsyncSession = Depends(get_read_db),
     _: User = Depends(require_admin),
 ):     
-    users = await get_users(db, offset=offset, limit=limit)
-    return [
-        UserResponse(
-            id=user.id,
-            name_complete=user.name_complete,
-            email=user.email,
-            role=user.role,
-            created_at=user.created_at,
-            updated_at=user.updated_at,
-        ) for user in users
-    ]
+    etag = weak_etag("users", await get_users_version(db), limit, offset, cursor)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+
+    users = await get_users(db, offset=offset, limit=limit, cursor=cursor)
+    next_cursor = next_page_cursor(users, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return fast_response(model_rows(UserResponse, users), response)
 
 @router.get("/filter", response_model=PaginatedUsers, tags=["Usuarios"])
+@sql_budget(4)
 async def filter_list_users(
-    db: AsyncSession = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
     _: User = Depends(require_admin),  
     limit: int = Query(default=settings.DEFAULT_LIMIT, ge=1, le=settings.MAX_LIMIT),
     offset: int = Query(default=0, ge=0),
     search: Optional[str] = Query(default=None),
+    cursor: Optional[str] = Query(default=None),
+    total_mode: TotalMode = Query(default=TotalMode.exact),
 ):
+    etag = weak_etag("users/filter", await get_users_version(db), limit, offset, search, cursor, total_mode.value)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+
     try:
-        stmt = select(User).where(User.deleted == False).order_by(User.created_at.desc())
-        result = await db.execute(stmt)
-        users = result.scalars().all()
-
-        users_dict = [{
-            "id": str(user.id),
-            "name_complete": user.name_complete,
-            "email": user.email,
-            "role": user.role,
-            "created_at": user.created_at,
-            "updated_at": user.updated_at
-        } for user in users]
-
-        if search:
-            search_term = search.lower().strip()
-            filtered_users = []
-
-            for user in users_dict:
-                score = 0
-                name_complete = user["name_complete"].lower()
-                email = user["email"].lower()
-                role = user["role"].lower()
-
-                if name_complete.startswith(search_term):
-                    score += 100
-                elif search_term in name_complete:
-                    score += 30
-
-                if email.startswith(search_term) or role.startswith(search_term):
-                    score += 50
-                elif search_term in email or search_term in role:
-                    score += 20
-
-                if score > 0:
-                    user["score"] = score
-                    filtered_users.append(user)
-
-            filtered_users.sort(key=lambda x: (-x["score"], x["name_complete"]))
-            users_dict = filtered_users
-
-        total_users = len(users_dict)
-        paginated_users = users_dict[offset: offset + limit]
-
-        return {
+        users, total_users, next_cursor = await search_users(
+            db, search=search, limit=limit, offset=offset, cursor=cursor, total_mode=total_mode
+        )
+
+        return fast_response({
             "total": total_users,
-            "users": paginated_users,
+            "users": model_rows(UserResponse, users),
             "limit": limit,
             "offset": offset,
-        }
+            "next_cursor": next_cursor,
+        }, response)
+
+    except (InvalidCursor, InvalidSearch):
+        raise
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al obtener usuarios: {str(e)}")
     
 @router.get("/logs", response_model=PaginatedLogsResponse)
+@sql_budget(3)
 async def list_logs_paginated(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     _: User = Depends(require_admin),
     limit: int = Query(default=settings.DEFAULT_LIMIT, ge=1, le=settings.MAX_LIMIT),
     offset: int = Query(default=0, ge=0),
+    cursor: Optional[str] = Query(default=None),
+    total_mode: TotalMode = Query(default=TotalMode.exact),
 ):    
     
     try:
-        # Query para los logs (sin joinedload ya que el schema solo necesita user_id)
-        query = (
-            select(Log)
-            .order_by(Log.created_at.desc())
-            .offset(offset)
-            .limit(limit)
+        # El total sale del contador mantenido en row_counters (o del planificador)
+        logs, total = await list_logs(
+            db, limit=limit, offset=offset, cursor=cursor, total_mode=total_mode
         )
-        
-        # Query para el conteo total
-        count_query = select(func.count()).select_from(Log)
-        
-        # Ejecutar queries
-        result = await db.execute(query)
-        logs = result.scalars().all()
-        
-        count_result = await db.execute(count_query)
-        total = count_result.scalar_one()
 
         # Crear respuesta usando el schema LogOut
         logs_response = [
@@ -148,37 +131,46 @@ async def list_logs_paginated(
             total=total,
             limit=limit,
             offset=offset,
-            logs=logs_response
+            logs=logs_response,
+            next_cursor=next_page_cursor(logs, limit)
         )
         
+    except InvalidCursor:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al obtener logs: {str(e)}")
     
 @router.get("/{user_id}", response_model=UserResponse)
+@sql_budget(2)
 async def read_user(
     user_id: str,
-    db: AsyncSession = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
     _: User = Depends(require_admin),
 ):
+    if request.headers.get("if-none-match"):
+        # Revalidación: basta con updated_at, sin cargar ni descifrar el usuario
+        updated_at = await get_user_stamp(db, user_id)
+        if updated_at is not None:
+            etag = _user_etag(user_id, updated_at)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+
     user = await get_user(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
     
-    return UserResponse(
-        id=user.id,
-        name_complete=user.name_complete,
-        email=user.email,
-        role=user.role,
-        created_at=user.created_at,
-        updated_at=user.updated_at,
-    )
+    set_etag(response, _user_etag(user.id, user.updated_at))
+    return fast_response(model_row(UserResponse, user), response)
 
 
 @router.put("/{user_id}", response_model=UserResponse)
+@sql_budget(8)
 async def edit_user(
     user_id: str,
     user: UserUpdate,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_write_db),
     _: User = Depends(require_admin),
 ):
     user = await update_user(db, user_id, user)
@@ -196,9 +188,10 @@ async def edit_user(
 
 
 @router.delete("/{user_id}", status_code=status.HTTP_200_OK)
+@sql_budget(6)
 async def deactivate_user_route(
     user_id: str,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_write_db),
     _: User = Depends(require_admin),
 ):
     user_deleted = await deactivate_user(db, user_id)
@@ -209,9 +202,10 @@ async def deactivate_user_route(
 
 
 @router.post("/activate/{user_id}", status_code=status.HTTP_200_OK)
+@sql_budget(6)
 async def activate_user_route(
     user_id: str,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_write_db),
     _: User = Depends(require_admin),
 ):
     user_activated = await activate_user(db, user_id)
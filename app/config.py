@@ -17,11 +17,72 @@ class Settings:
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES")) 
     DB_SECRET_KEY: str = os.getenv("DB_SECRET_KEY")
     JWT_SECRET_KEY: str = os.getenv("JWT_SECRET_KEY")
+    BLIND_INDEX_KEY: str = os.getenv("BLIND_INDEX_KEY", DB_SECRET_KEY)
+    ENCRYPTION_FORMAT: str = os.getenv("ENCRYPTION_FORMAT", "gcm")  # gcm, legacy (AES-CBC de sqlalchemy_utils)
     
     DEFAULT_LIMIT: int = int(os.getenv("DEFAULT_LIMIT", 100))
     MAX_LIMIT: int = int(os.getenv("MAX_LIMIT", 500))        
+    MAX_BATCH_SIZE: int = int(os.getenv("MAX_BATCH_SIZE", 500))
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", 1000))  # filas por bloque del cursor
+    IMPORT_CHUNK_SIZE: int = int(os.getenv("IMPORT_CHUNK_SIZE", 1000))  # filas por INSERT y commit
+    IMPORT_MAX_ERRORS: int = int(os.getenv("IMPORT_MAX_ERRORS", 100))   # errores detallados en el resumen
+    IMPORT_MAX_LINE_LENGTH: int = int(os.getenv("IMPORT_MAX_LINE_LENGTH", 1048576))  # caracteres por línea/registro
+
+    PASSWORD_HASH_TIME_COST: int = int(os.getenv("PASSWORD_HASH_TIME_COST", 3))            # argon2id: iteraciones
+    PASSWORD_HASH_MEMORY_COST: int = int(os.getenv("PASSWORD_HASH_MEMORY_COST", 65536))     # KiB por hash
+    PASSWORD_HASH_PARALLELISM: int = int(os.getenv("PASSWORD_HASH_PARALLELISM", 1))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+    PASSWORD_HASH_QUEUE_SIZE: int = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", 64))  # pendientes antes de responder 503
+
+    PRINCIPAL_CACHE_TTL_SECONDS: float = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", 30))
+    PRINCIPAL_CACHE_MAX_SIZE: int = int(os.getenv("PRINCIPAL_CACHE_MAX_SIZE", 1024))
+
+    AUDIT_MODE: str = os.getenv("AUDIT_MODE", "transaction")  # transaction, async
+    AUDIT_QUEUE_SIZE: int = int(os.getenv("AUDIT_QUEUE_SIZE", 10000))
+    AUDIT_BATCH_SIZE: int = int(os.getenv("AUDIT_BATCH_SIZE", 500))
+    AUDIT_FLUSH_INTERVAL: float = float(os.getenv("AUDIT_FLUSH_INTERVAL", 0.5))
+
+    LOG_PARTITIONS_AHEAD: int = int(os.getenv("LOG_PARTITIONS_AHEAD", 3))          # meses creados por adelantado
+    LOG_RETENTION_MONTHS: int = int(os.getenv("LOG_RETENTION_MONTHS", 0))          # 0 = sin retención
+    LOG_PARTITION_CHECK_INTERVAL: float = float(os.getenv("LOG_PARTITION_CHECK_INTERVAL", 3600))
+    LOG_COUNTER_SHARDS: int = int(os.getenv("LOG_COUNTER_SHARDS", 16))              # filas del contador global de logs
+    TASK_STATS_RECONCILE_INTERVAL: float = float(os.getenv("TASK_STATS_RECONCILE_INTERVAL", 3600))
+
+    TASK_EVENTS: bool = os.getenv("TASK_EVENTS", "true").lower() == "true"  # NOTIFY en cada escritura de tareas
+    TASK_EVENTS_QUEUE_SIZE: int = int(os.getenv("TASK_EVENTS_QUEUE_SIZE", 256))  # eventos pendientes por conexión
+    TASK_EVENTS_HEARTBEAT: float = float(os.getenv("TASK_EVENTS_HEARTBEAT", 15))   # segundos entre latidos
+
+    REVOCATION_BACKEND: str = os.getenv("REVOCATION_BACKEND", "memory")  # memory, postgres
+    REVOCATION_BLOOM_CAPACITY: int = int(os.getenv("REVOCATION_BLOOM_CAPACITY", 100000))
+    REVOCATION_BLOOM_ERROR_RATE: float = float(os.getenv("REVOCATION_BLOOM_ERROR_RATE", 0.001))
+    REVOCATION_PRUNE_INTERVAL: float = float(os.getenv("REVOCATION_PRUNE_INTERVAL", 300))
+    
+    DB_ECHO: bool = os.getenv("DB_ECHO", "false").lower() == "true"
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", 5))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", 10))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", 30))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", 1800))          # segundos; -1 desactiva
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    DB_STATEMENT_CACHE_SIZE: int = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 100))
+    DB_PGBOUNCER: bool = os.getenv("DB_PGBOUNCER", "false").lower() == "true"  # pool_mode=transaction
+
+    DB_REPLICA_HOST: str = os.getenv("DB_REPLICA_HOST", "")  # vacío = sin réplica, todo va al primario
+    DB_REPLICA_PORT: int = int(os.getenv("DB_REPLICA_PORT", DB_PORT))
+    DB_REPLICA_USER: str = os.getenv("DB_REPLICA_USER", DB_USER)
+    DB_REPLICA_PASSWORD: str = os.getenv("DB_REPLICA_PASSWORD", DB_PASSWORD)
+    DB_REPLICA_DATABASE: str = os.getenv("DB_REPLICA_DATABASE", DB_DATABASE)
+    DB_STICKY_SECONDS: float = float(os.getenv("DB_STICKY_SECONDS", 5))  # lecturas al primario tras escribir
+
+    FAST_JSON: bool = os.getenv("FAST_JSON", "false").lower() == "true"  # orjson y respuestas serializadas en una pasada
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    SQL_BUDGET_MODE: str = os.getenv("SQL_BUDGET_MODE", "off")  # off, warn, raise (desarrollo y pruebas)
+    SQL_N_PLUS_ONE_THRESHOLD: int = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", 5))
     
     DATABASE_URL = f"{DB_DRIVER}://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_DATABASE}" 
+    DATABASE_REPLICA_URL = (
+        f"{DB_DRIVER}://{DB_REPLICA_USER}:{DB_REPLICA_PASSWORD}@{DB_REPLICA_HOST}:{DB_REPLICA_PORT}/{DB_REPLICA_DATABASE}"
+        if DB_REPLICA_HOST else None
+    )
     
 
 settings = Settings()
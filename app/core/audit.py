@@ -0,0 +1,148 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.counters import LOGS, bump, sharded_key
+from app.core.metrics import metrics
+from app.core.session import async_session
+from app.models.user import Log
+
+TRANSACTION = "transaction"
+ASYNC = "async"
+
+_PENDING_KEY = "pending_audit"
+_STOP = object()
+
+
+class AuditEntry(NamedTuple):
+    action: str
+    user_id: Optional[str]
+    created_at: datetime
+
+
+class AuditWriter:
+    """Cola acotada en memoria + tarea de fondo que inserta los logs por lotes."""
+
+    def __init__(self, max_queue: int, batch_size: int, flush_interval: float):
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.enqueued = 0
+        self.dropped = 0
+        self.flushed = 0
+        self.failed = 0
+        self.batches = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run())
+
+    def enqueue(self, entry: AuditEntry) -> bool:
+        if not self.running:
+            self.dropped += 1
+            return False
+        try:
+            self._queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        self.enqueued += 1
+        return True
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Vacía la cola antes de terminar (se llama al apagar la aplicación)."""
+        if not self.running:
+            return
+        await self._queue.put(_STOP)
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            self._task.cancel()
+            print(f"Audit writer: drenado incompleto, {self._queue.qsize()} entradas pendientes")
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "max_queue": self.max_queue,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "flushed": self.flushed,
+            "failed": self.failed,
+            "batches": self.batches,
+        }
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                break
+
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[AuditEntry]) -> None:
+        try:
+            async with async_session() as session:
+                await session.execute(insert(Log), [entry._asdict() for entry in batch])
+                await bump(session, LOGS, sharded_key(), len(batch))
+                await session.commit()
+        except Exception as error:
+            self.failed += len(batch)
+            print(f"Audit writer: error al insertar {len(batch)} logs: {error}")
+            return
+        self.flushed += len(batch)
+        self.batches += 1
+
+
+audit_writer = AuditWriter(
+    max_queue=settings.AUDIT_QUEUE_SIZE,
+    batch_size=settings.AUDIT_BATCH_SIZE,
+    flush_interval=settings.AUDIT_FLUSH_INTERVAL,
+)
+metrics.register_source("audit", audit_writer.stats)
+
+
+def defer_audit(session: Session, entry: AuditEntry) -> None:
+    """Encola `entry` cuando la transacción de la petición confirma; se descarta si hace rollback."""
+    session.info.setdefault(_PENDING_KEY, []).append(entry)
+
+
+@event.listens_for(Session, "after_commit")
+def _enqueue_pending(session: Session) -> None:
+    for entry in session.info.pop(_PENDING_KEY, ()):
+        audit_writer.enqueue(entry)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending(session: Session, previous_transaction) -> None:
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,30 @@
+import hashlib
+import hmac
+from functools import lru_cache
+from typing import Optional
+
+from app.config import settings
+
+USER_EMAIL = "user.email"
+USER_ROLE = "user.role"
+TASK_STATUS = "task.status"
+
+
+@lru_cache(maxsize=None)
+def _purpose_key(purpose: str) -> bytes:
+    # Una clave derivada por columna: el mismo valor en columnas distintas
+    # produce digests distintos.
+    return hmac.new(
+        settings.BLIND_INDEX_KEY.encode(), f"blind-index:{purpose}".encode(), hashlib.sha256
+    ).digest()
+
+
+def normalize(value: str) -> str:
+    return value.strip().lower()
+
+
+def blind_index(value: Optional[str], purpose: str) -> Optional[str]:
+    """HMAC-SHA256 del valor normalizado, para búsquedas por igualdad sobre columnas cifradas."""
+    if value is None:
+        return None
+    return hmac.new(_purpose_key(purpose), normalize(value).encode(), hashlib.sha256).hexdigest()
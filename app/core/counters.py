@@ -0,0 +1,108 @@
+import json
+from enum import Enum
+from typing import Dict, Mapping, Sequence, Tuple
+from sqlalchemy import func, or_, select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.counter import RowCounter, TaskStat
+from app.models.task import TaskStatus
+
+TASKS = "tasks"
+LOGS = "logs"
+# Versiones (solo crecen) para ETags de listados: tareas por usuario y usuarios en global
+TASK_VERSIONS = "task_versions"
+USER_VERSIONS = "user_versions"
+GLOBAL_KEY = "*"
+
+
+class TotalMode(str, Enum):
+    exact = "exact"
+    estimate = "estimate"
+    none = "none"
+
+
+async def bump(db: AsyncSession, scope: str, key: str, delta: int) -> None:
+    await bump_many(db, [(scope, key, delta)])
+
+
+def counters_upsert(deltas: Sequence[Tuple[str, str, int]]):
+    """Upsert multi-fila de varios (scope, key, delta) distintos; None si no hay nada que sumar."""
+    rows = [{"scope": scope, "key": key, "value": delta} for scope, key, delta in deltas if delta]
+    if not rows:
+        return None
+    stmt = insert(RowCounter).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[RowCounter.scope, RowCounter.key],
+        set_={"value": RowCounter.value + stmt.excluded.value},
+    )
+
+
+async def bump_many(db: AsyncSession, deltas: Sequence[Tuple[str, str, int]]) -> None:
+    """Varios (scope, key, delta) distintos en un solo upsert multi-fila."""
+    stmt = counters_upsert(deltas)
+    if stmt is not None:
+        await db.execute(stmt)
+
+
+async def read_counter(db: AsyncSession, scope: str, key: str = GLOBAL_KEY) -> int:
+    result = await db.execute(
+        select(RowCounter.value).where(RowCounter.scope == scope, RowCounter.key == key)
+    )
+    return result.scalar() or 0
+
+
+def sharded_key(key: str = GLOBAL_KEY, shards: int = settings.LOG_COUNTER_SHARDS):
+    """Clave `key#n` de una de `shards` filas, elegida por el backend de Postgres de la conexión.
+
+    Para contadores globales que se suman en casi todas las escrituras: las transacciones
+    concurrentes van por conexiones distintas y bloquean filas distintas hasta el commit,
+    en lugar de esperar todas por la misma. Se lee con read_sharded_counter.
+    """
+    if shards <= 1:
+        return key
+    return func.concat(key, "#", func.pg_backend_pid() % shards)
+
+
+async def read_sharded_counter(db: AsyncSession, scope: str, key: str = GLOBAL_KEY) -> int:
+    """Suma de `key` y de todas sus filas `key#n` (también las de un número de shards anterior)."""
+    result = await db.execute(
+        select(func.coalesce(func.sum(RowCounter.value), 0)).where(
+            RowCounter.scope == scope,
+            or_(RowCounter.key == key, RowCounter.key.startswith(f"{key}#")),
+        )
+    )
+    return int(result.scalar())
+
+
+def task_stats_upsert(user_id: str, deltas: Mapping[str, int]):
+    """Upsert de deltas por estado en task_stats (p. ej. {"pending": -1, "done": 1}); None si todo es 0."""
+    rows = [{"user_id": user_id, "status": status, "count": delta} for status, delta in deltas.items() if delta]
+    if not rows:
+        return None
+    stmt = insert(TaskStat).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[TaskStat.user_id, TaskStat.status],
+        set_={"count": TaskStat.count + stmt.excluded.count},
+    )
+
+
+async def read_task_stats(db: AsyncSession, user_id: str) -> Dict[str, int]:
+    """Tareas activas del usuario por estado, con 0 en los estados sin filas."""
+    result = await db.execute(select(TaskStat.status, TaskStat.count).where(TaskStat.user_id == user_id))
+    stats = {status.value: 0 for status in TaskStatus}
+    stats.update(result.tuples().all())
+    return stats
+
+
+async def estimate_count(db: AsyncSession, query) -> int:
+    """Filas estimadas por el planificador para `query` (EXPLAIN, sin ejecutarla)."""
+    compiled = query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    result = await db.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}"))
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
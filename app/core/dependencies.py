@@ -1,6 +1,8 @@
+import time
 from typing import Optional
-from fastapi import Depends, HTTPException, Request, status
-from app.core.session import get_db
+from fastapi import Depends, HTTPException, Request, Response, status
+from fastapi.requests import HTTPConnection
+from app.core.session import STICKY_COOKIE, async_session, get_db, replica_session, sticky_writes
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.config import settings
@@ -9,12 +11,13 @@ from jose import JWTError, jwt
 from app.models.user import User
 from app.services.user_service import get_user_by_email
 from app.core.token_blacklist import is_token_blacklisted
+from app.core.principal_cache import principal_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 
 async def get_current_user(
-    request: Request,
+    request: HTTPConnection,
     db: AsyncSession = Depends(get_db)
 ) -> User:
     credentials_exception = HTTPException(
@@ -38,24 +41,93 @@ async def get_current_user(
         print("No token found in request")
         raise credentials_exception
 
-    if is_token_blacklisted(token):
-        print(f"Token blacklisted: {token}")  
-        raise credentials_exception
-
     try:
         payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.ALGORITHM])
+
+        if await is_token_blacklisted(db, payload, token):
+            print(f"Token blacklisted: {token}")  
+            raise credentials_exception
+
         user_email: Optional[str] = payload.get("sub")
         if not user_email:
             print("No 'sub' field in payload")
             raise credentials_exception
 
-        user = await get_user_by_email(db, email=user_email)
-        if not user or user.deleted:
-            print(f"User not found or deleted: {user_email}")
-            raise credentials_exception
+        user = principal_cache.get(user_email)
+        if user is None:
+            # Antes de la consulta: una invalidación que llegue mientras tanto descarta el resultado
+            generation = principal_cache.generation
+            user = await get_user_by_email(db, email=user_email)
+            if not user or user.deleted:
+                print(f"User not found or deleted: {user_email}")
+                raise credentials_exception
+            # Se separa de la sesión para poder reutilizarlo entre peticiones
+            db.expunge(user)
+            principal_cache.set(user_email, user, generation)
 
     except JWTError as e:
         print(f"JWTError: {e}")
         raise credentials_exception
 
-    return user
\ No newline at end of file
+    return user
+
+
+async def get_streaming_user(request: HTTPConnection) -> User:
+    """get_current_user con una sesión propia que se cierra antes de responder.
+
+    Para respuestas en streaming: FastAPI cierra las dependencias con yield (get_db) cuando
+    termina de enviar la respuesta, así que una descarga o un stream largo retendría una
+    conexión del pool, inactiva y con la transacción abierta, durante todo el envío.
+    """
+    async with async_session() as db:
+        return await get_current_user(request, db)
+
+
+def _reads_from_primary(request: Request, user: User) -> bool:
+    if replica_session is None or sticky_writes.active(user.id):
+        return True
+    try:
+        return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def read_session_factory(request: Request, user: User):
+    """Sessionmaker para las lecturas del usuario: la réplica, salvo que acabe de escribir."""
+    return async_session if _reads_from_primary(request, user) else replica_session
+
+
+async def get_read_db(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Sesión para rutas GET. Sin réplica, o si el usuario escribió hace menos de
+    DB_STICKY_SECONDS, es la misma sesión del primario que usa get_current_user."""
+    factory = read_session_factory(request, current_user)
+    if factory is async_session:
+        yield db
+        return
+    async with factory() as session:
+        yield session
+
+
+def get_write_db(
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> AsyncSession:
+    """Sesión del primario para rutas que escriben. Marca al usuario para que sus
+    lecturas de los próximos DB_STICKY_SECONDS no vayan a la réplica (que puede ir atrasada)."""
+    if replica_session is not None:
+        sticky_writes.mark(current_user.id)
+        # La cookie cubre el caso de que la siguiente lectura la atienda otro worker
+        response.set_cookie(
+            key=STICKY_COOKIE,
+            value=f"{time.time() + settings.DB_STICKY_SECONDS:.3f}",
+            max_age=max(1, int(settings.DB_STICKY_SECONDS)),
+            httponly=True,
+            samesite="lax",
+        )
+    return db
+
@@ -0,0 +1,125 @@
+import base64
+import hashlib
+import hmac
+import os
+import time
+from functools import lru_cache
+from typing import Iterable, List, NamedTuple, Optional
+
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from sqlalchemy.types import Text, TypeDecorator
+
+from app.config import settings
+from app.core.metrics import metrics
+
+GCM = "gcm"
+LEGACY = "legacy"
+
+# Cabecera de versión: ':' no existe en el alfabeto base64 de los valores antiguos
+GCM_HEADER = "g1:"
+NONCE_SIZE = 12
+_LEGACY_BLOCK = 16
+_LEGACY_PADDING = b"*"
+
+
+class Ciphers(NamedTuple):
+    gcm: AESGCM
+    legacy: Cipher
+
+
+@lru_cache(maxsize=None)
+def ciphers(key: str) -> Ciphers:
+    """Deriva las claves una sola vez por clave de configuración (no en cada valor)."""
+    legacy_key = hashlib.sha256(key.encode()).digest()
+    gcm_key = hmac.new(key.encode(), b"column-encryption:aes-256-gcm:v1", hashlib.sha256).digest()
+    return Ciphers(
+        gcm=AESGCM(gcm_key),
+        # Mismo esquema que sqlalchemy_utils.AesEngine: clave SHA-256, IV fijo y relleno '*'
+        legacy=Cipher(algorithms.AES(legacy_key), modes.CBC(legacy_key[:16])),
+    )
+
+
+def encrypt_value(value: str, key: str, fmt: str = GCM) -> str:
+    if fmt == LEGACY:
+        return _encrypt_legacy(value, key)
+    nonce = os.urandom(NONCE_SIZE)
+    sealed = ciphers(key).gcm.encrypt(nonce, value.encode(), None)
+    return GCM_HEADER + base64.b64encode(nonce + sealed).decode()
+
+
+def decrypt_value(value: str, key: str) -> str:
+    """Descifra tanto el formato versionado (AES-GCM) como el de sqlalchemy_utils (AES-CBC)."""
+    if value.startswith(GCM_HEADER):
+        raw = base64.b64decode(value[len(GCM_HEADER):])
+        return ciphers(key).gcm.decrypt(raw[:NONCE_SIZE], raw[NONCE_SIZE:], None).decode()
+    return _decrypt_legacy(value, ciphers(key).legacy)
+
+
+def decrypt_many(values: Iterable[Optional[str]], key: str) -> List[Optional[str]]:
+    """Descifra una columna completa reutilizando los objetos de cifrado (None se conserva)."""
+    start = time.perf_counter()
+    cached = ciphers(key)
+    gcm_decrypt = cached.gcm.decrypt
+    result = []
+    for value in values:
+        if value is None:
+            result.append(None)
+        elif value.startswith(GCM_HEADER):
+            raw = base64.b64decode(value[len(GCM_HEADER):])
+            result.append(gcm_decrypt(raw[:NONCE_SIZE], raw[NONCE_SIZE:], None).decode())
+        else:
+            result.append(_decrypt_legacy(value, cached.legacy))
+    metrics.decrypt_seconds += time.perf_counter() - start
+    metrics.decrypt_count += len(result)
+    return result
+
+
+def _encrypt_legacy(value: str, key: str) -> str:
+    data = value.encode()
+    data += (_LEGACY_BLOCK - len(data) % _LEGACY_BLOCK) * _LEGACY_PADDING
+    encryptor = ciphers(key).legacy.encryptor()
+    return base64.b64encode(encryptor.update(data) + encryptor.finalize()).decode()
+
+
+def _decrypt_legacy(value: str, cipher: Cipher) -> str:
+    decryptor = cipher.decryptor()
+    data = decryptor.update(base64.b64decode(value)) + decryptor.finalize()
+    try:
+        return data.rstrip(_LEGACY_PADDING).decode()
+    except UnicodeDecodeError:
+        raise ValueError("Invalid decryption key")
+
+
+class EncryptedString(TypeDecorator):
+    """Texto cifrado en la BD. Escribe AES-GCM versionado y lee también los valores antiguos."""
+
+    impl = Text
+    cache_ok = True
+
+    def __init__(self, key: str, fmt: Optional[str] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.key = key
+        self.fmt = fmt or settings.ENCRYPTION_FORMAT
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        start = time.perf_counter()
+        encrypted = encrypt_value(str(value), self.key, self.fmt)
+        metrics.encrypt_seconds += time.perf_counter() - start
+        metrics.encrypt_count += 1
+        return encrypted
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        start = time.perf_counter()
+        decrypted = decrypt_value(value, self.key)
+        metrics.decrypt_seconds += time.perf_counter() - start
+        metrics.decrypt_count += 1
+        return decrypted
+
+    @property
+    def python_type(self):
+        return str
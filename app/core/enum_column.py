@@ -0,0 +1,42 @@
+from enum import Enum
+from typing import Type
+
+from sqlalchemy.types import SmallInteger, TypeDecorator
+
+
+class SmallIntEnum(TypeDecorator):
+    """Enum de texto guardado como smallint (2 bytes, indexable y comparable sin descifrar).
+
+    El código de cada valor es su posición en el Enum: los valores nuevos se añaden
+    siempre al final y nunca se reordenan ni se borran.
+    """
+
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(self, enum_class: Type[Enum], **kwargs):
+        super().__init__(**kwargs)
+        self.enum_class = enum_class
+        self._labels = tuple(member.value for member in enum_class)
+        self._codes = {label: code for code, label in enumerate(self._labels)}
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        label = value.value if isinstance(value, Enum) else value
+        try:
+            return self._codes[label]
+        except KeyError:
+            raise ValueError(f"Valor no válido para {self.enum_class.__name__}: {value!r}")
+
+    def process_literal_param(self, value, dialect):
+        return self.process_bind_param(value, dialect)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return self._labels[value]
+
+    @property
+    def python_type(self):
+        return str
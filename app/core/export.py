@@ -0,0 +1,49 @@
+import csv
+import io
+import json
+from datetime import datetime
+from enum import Enum
+from typing import AsyncIterator, Sequence
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+MEDIA_TYPES = {
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.csv: "text/csv; charset=utf-8",
+}
+
+
+def _plain(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def ndjson_chunk(fields: Sequence[str], rows: Sequence[tuple]) -> str:
+    return "".join(
+        json.dumps(dict(zip(fields, map(_plain, row))), ensure_ascii=False) + "\n" for row in rows
+    )
+
+
+def csv_chunk(fields: Sequence[str], rows: Sequence[tuple], header: bool = False) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(fields)
+    writer.writerows([_plain(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+
+async def serialize_stream(
+    fields: Sequence[str], chunks: AsyncIterator[Sequence[tuple]], fmt: ExportFormat
+) -> AsyncIterator[bytes]:
+    """Serializa bloque a bloque: la memoria depende del tamaño del bloque, no del total de filas."""
+    if fmt == ExportFormat.csv:
+        yield csv_chunk(fields, (), header=True).encode()
+    async for rows in chunks:
+        if fmt == ExportFormat.csv:
+            yield csv_chunk(fields, rows).encode()
+        else:
+            yield ndjson_chunk(fields, rows).encode()
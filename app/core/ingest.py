@@ -0,0 +1,165 @@
+import codecs
+import csv
+import json
+from typing import AsyncIterator, List, Optional, Tuple
+
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from app.config import settings
+from app.core.export import ExportFormat
+
+# (número de línea, registro, error): exactamente uno de registro/error viene informado
+Record = Tuple[int, Optional[dict], Optional[str]]
+
+
+class InvalidUpload(ValueError):
+    """Cuerpo multipart mal formado o sin el campo del archivo."""
+
+
+class LineTooLong(ValueError):
+    def __init__(self, line: int):
+        super().__init__(f"La línea {line} supera {settings.IMPORT_MAX_LINE_LENGTH} caracteres")
+        self.line = line
+
+
+async def multipart_file(chunks: AsyncIterator[bytes], content_type: str, field: str = "file") -> AsyncIterator[bytes]:
+    """Contenido del campo `field` de un cuerpo multipart/form-data a medida que llega.
+
+    No pasa por request.form(), que guarda el cuerpo entero (en memoria o en disco)
+    antes de devolver nada: los bytes del archivo salen con cada bloque recibido y el
+    resto de campos se descarta.
+    """
+    _, options = parse_options_header(content_type)
+    boundary = options.get(b"boundary")
+    if not boundary:
+        raise InvalidUpload("Falta el boundary del cuerpo multipart")
+
+    part = {"header": b"", "value": b"", "name": None}
+    received: List[bytes] = []
+    found = False
+
+    def on_part_begin() -> None:
+        part["name"] = None
+
+    def on_header_field(data: bytes, start: int, end: int) -> None:
+        part["header"] += data[start:end]
+
+    def on_header_value(data: bytes, start: int, end: int) -> None:
+        part["value"] += data[start:end]
+
+    def on_header_end() -> None:
+        if part["header"].lower() == b"content-disposition":
+            part["name"] = parse_options_header(part["value"])[1].get(b"name")
+        part["header"], part["value"] = b"", b""
+
+    def on_part_data(data: bytes, start: int, end: int) -> None:
+        nonlocal found
+        if part["name"] == field.encode():
+            found = True
+            received.append(data[start:end])
+
+    parser = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_part_data": on_part_data,
+    })
+    try:
+        async for chunk in chunks:
+            parser.write(chunk)
+            for data in received:
+                yield data
+            received.clear()
+        parser.finalize()
+    except MultipartParseError as error:
+        raise InvalidUpload(f"Cuerpo multipart inválido: {error}") from error
+    for data in received:
+        yield data
+    if not found:
+        raise InvalidUpload(f"Falta el archivo '{field}'")
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, str]]:
+    """Líneas numeradas a partir de bloques de bytes UTF-8 (con o sin BOM), sin leer todo el cuerpo.
+
+    Una línea de más de IMPORT_MAX_LINE_LENGTH caracteres lanza LineTooLong en lugar de
+    seguir acumulándose en memoria.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    number = 0
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            number += 1
+            if len(line) > settings.IMPORT_MAX_LINE_LENGTH:
+                raise LineTooLong(number)
+            yield number, line
+        if len(pending) > settings.IMPORT_MAX_LINE_LENGTH:
+            raise LineTooLong(number + 1)
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield number + 1, pending
+
+
+async def _ndjson_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Record]:
+    async for number, line in _lines(chunks):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as error:
+            yield number, None, f"JSON inválido: {error}"
+            continue
+        if isinstance(record, dict):
+            yield number, record, None
+        else:
+            yield number, None, "Cada línea debe ser un objeto JSON"
+
+
+async def _csv_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Record]:
+    header = None
+    record = ""
+    quotes = 0
+    start = 0
+    async for number, line in _lines(chunks):
+        if not record:
+            if not line.strip():
+                continue
+            start = number
+        record += line + "\n"
+        if len(record) > settings.IMPORT_MAX_LINE_LENGTH:
+            raise LineTooLong(start)  # un campo entre comillas que no se cierra
+        quotes += line.count('"')
+        if quotes % 2:
+            continue  # salto de línea dentro de un campo entre comillas
+
+        values = next(csv.reader([record]))
+        record, quotes = "", 0
+        if header is None:
+            header = [name.strip().lower() for name in values]
+            if "task_name" not in header:
+                yield start, None, "La cabecera CSV debe incluir la columna task_name"
+                return
+            continue
+        if len(values) != len(header):
+            yield start, None, f"Se esperaban {len(header)} columnas y hay {len(values)}"
+            continue
+        # El CSV no distingue vacío de nulo: como en la exportación, vacío es None
+        yield start, {name: value or None for name, value in zip(header, values)}, None
+
+    if record:
+        yield start, None, "Comillas sin cerrar al final del archivo"
+
+
+async def read_records(chunks: AsyncIterator[bytes], fmt: ExportFormat) -> AsyncIterator[Record]:
+    """Registros de un cuerpo NDJSON o CSV (con cabecera) leído en streaming."""
+    records = _csv_records(chunks) if fmt == ExportFormat.csv else _ndjson_records(chunks)
+    try:
+        async for item in records:
+            yield item
+    except UnicodeDecodeError:
+        yield 0, None, "El archivo debe estar codificado en UTF-8"
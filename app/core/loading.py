@@ -0,0 +1,38 @@
+from typing import Iterable, List, Sequence
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, lazyload, noload, selectinload
+
+# Las relaciones de los modelos se declaran con lazy="raise": cada servicio
+# pide explícitamente qué relaciones necesita y con qué estrategia.
+LOADER_STRATEGIES = {
+    "selectin": selectinload,
+    "joined": joinedload,
+    "lazy": lazyload,
+    "noload": noload,
+}
+
+DEFAULT_STRATEGY = "selectin"
+
+
+def load_options(model, load: Iterable[str] = ()) -> List:
+    """Traduce nombres de relación ("tasks", "logs:joined") a opciones de carga."""
+    relationships = inspect(model).relationships
+    options = []
+    for spec in load:
+        name, _, strategy = spec.partition(":")
+        strategy = strategy or DEFAULT_STRATEGY
+
+        if name not in relationships:
+            raise ValueError(f"'{model.__name__}' no tiene la relación '{name}'")
+        if strategy not in LOADER_STRATEGIES:
+            raise ValueError(f"Estrategia de carga desconocida: '{strategy}'")
+
+        options.append(LOADER_STRATEGIES[strategy](getattr(model, name)))
+    return options
+
+
+def with_relations(query, model, load: Sequence[str] = ()):
+    if not load:
+        return query
+    return query.options(*load_options(model, load))
@@ -0,0 +1,363 @@
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+
+from app.core import sql_budget
+
+# Buckets fijos (segundos / sentencias); las listas de conteo se reservan una vez por ruta
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    """Sin locks: todo se actualiza desde el bucle de eventos de un único proceso."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RequestStats:
+    """Tiempo y número de sentencias SQL de la petición en curso."""
+
+    __slots__ = ("db_seconds", "statements")
+
+    def __init__(self):
+        self.db_seconds = 0.0
+        self.statements = 0
+
+
+request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+class RouteMetrics:
+    __slots__ = ("method", "route", "in_flight", "statuses", "latency", "db_time", "db_statements")
+
+    def __init__(self, method: str, route: str):
+        self.method = method
+        self.route = route
+        self.in_flight = 0
+        self.statuses: Dict[int, int] = {}
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.db_time = Histogram(DB_TIME_BUCKETS)
+        self.db_statements = Histogram(STATEMENT_BUCKETS)
+
+
+class Metrics:
+    def __init__(self):
+        self.routes: Dict[Tuple[str, str], RouteMetrics] = {}
+        self.db_statements = 0
+        self.db_seconds = 0.0
+        self.encrypt_count = 0
+        self.encrypt_seconds = 0.0
+        self.decrypt_count = 0
+        self.decrypt_seconds = 0.0
+        self.password_running = 0
+        self.password_queued = 0
+        self.password_operations: Dict[str, int] = {"hash": 0, "verify": 0}
+        self.password_rejected = 0
+        self.password_wait = {op: Histogram(LATENCY_BUCKETS) for op in self.password_operations}
+        self.password_seconds = {op: Histogram(LATENCY_BUCKETS) for op in self.password_operations}
+        self.task_stats_reconciliations = 0
+        self.task_stats_drift = 0
+        self.task_event_subscribers = 0
+        self.task_events_delivered = 0
+        self.task_event_consumers_dropped = 0
+        # stats() de componentes con estado propio; se leen al generar /metrics
+        self.sources: Dict[str, Callable[[], dict]] = {}
+
+    def register_source(self, name: str, stats: Callable[[], dict]) -> None:
+        self.sources[name] = stats
+
+    def route(self, method: str, path: str) -> RouteMetrics:
+        key = (method, path)
+        metrics = self.routes.get(key)
+        if metrics is None:
+            metrics = self.routes[key] = RouteMetrics(method, path)
+        return metrics
+
+
+metrics = Metrics()
+
+
+class InstrumentedRoute(APIRoute):
+    """Ruta de FastAPI que mide cada petición con la plantilla de la ruta como etiqueta."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, endpoint, **kwargs)
+        # Se reservan aquí para no crear nada en el camino caliente
+        self._route_metrics = {method: metrics.route(method, self.path) for method in self.methods}
+        self._sql_budget = getattr(endpoint, "__sql_budget__", None)
+        self._sql_allow_repeats = getattr(endpoint, "__sql_allow_repeats__", False)
+
+    async def handle(self, scope, receive, send) -> None:
+        route_metrics = self._route_metrics.get(scope["method"]) or metrics.route(scope["method"], self.path)
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        budget_token = None
+        if sql_budget.tracking_enabled():
+            budget_token = sql_budget.start_request(
+                f"{scope['method']} {self.path}", self._sql_budget, self._sql_allow_repeats
+            )
+        status_code = 500
+
+        async def send_wrapper(message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                if budget_token is not None:
+                    sql_budget.check_request(sql_budget.current_log.get())
+                status_code = message["status"]
+            await send(message)
+
+        route_metrics.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await super().handle(scope, receive, send_wrapper)
+        finally:
+            route_metrics.in_flight -= 1
+            route_metrics.latency.observe(time.perf_counter() - start)
+            route_metrics.statuses[status_code] = route_metrics.statuses.get(status_code, 0) + 1
+            route_metrics.db_time.observe(stats.db_seconds)
+            route_metrics.db_statements.observe(stats.statements)
+            request_stats.reset(token)
+            if budget_token is not None:
+                sql_budget.finish_request(budget_token)
+
+
+def instrument_engine(engine) -> None:
+    """Acumula tiempo y número de sentencias SQL, globales y de la petición en curso."""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["metrics_query_start"].pop()
+        metrics.db_statements += 1
+        metrics.db_seconds += elapsed
+        stats = request_stats.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.db_seconds += elapsed
+
+
+def _labels(**labels) -> str:
+    return ",".join(f'{name}="{value}"' for name, value in labels.items())
+
+
+def _histogram_lines(name: str, histogram: Histogram, labels: str) -> List[str]:
+    lines = []
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+    lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+    lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+    return lines
+
+
+def _principal_cache_lines(stats: dict) -> List[str]:
+    return [
+        "# HELP principal_cache_hits_total Usuarios autenticados servidos desde la caché.",
+        "# TYPE principal_cache_hits_total counter",
+        f"principal_cache_hits_total {stats['hits']}",
+        "# HELP principal_cache_misses_total Búsquedas en la caché de usuarios que fueron a la base de datos.",
+        "# TYPE principal_cache_misses_total counter",
+        f"principal_cache_misses_total {stats['misses']}",
+        "# HELP principal_cache_evictions_total Entradas expulsadas por superar PRINCIPAL_CACHE_MAX_SIZE.",
+        "# TYPE principal_cache_evictions_total counter",
+        f"principal_cache_evictions_total {stats['evictions']}",
+        "# HELP principal_cache_stale_sets_total Usuarios cargados que no se guardaron por una invalidación durante la carga.",
+        "# TYPE principal_cache_stale_sets_total counter",
+        f"principal_cache_stale_sets_total {stats['stale_sets']}",
+        "# HELP principal_cache_size Usuarios en la caché.",
+        "# TYPE principal_cache_size gauge",
+        f"principal_cache_size {stats['size']}",
+    ]
+
+
+def _audit_lines(stats: dict) -> List[str]:
+    return [
+        "# HELP audit_queue_depth Logs de auditoría en cola esperando al escritor asíncrono.",
+        "# TYPE audit_queue_depth gauge",
+        f"audit_queue_depth {stats['queue_depth']}",
+        "# HELP audit_enqueued_total Logs de auditoría encolados.",
+        "# TYPE audit_enqueued_total counter",
+        f"audit_enqueued_total {stats['enqueued']}",
+        "# HELP audit_dropped_total Logs de auditoría descartados (cola llena o escritor parado).",
+        "# TYPE audit_dropped_total counter",
+        f"audit_dropped_total {stats['dropped']}",
+        "# HELP audit_flushed_total Logs de auditoría insertados por el escritor asíncrono.",
+        "# TYPE audit_flushed_total counter",
+        f"audit_flushed_total {stats['flushed']}",
+        "# HELP audit_failed_total Logs de auditoría perdidos por un error al insertar el lote.",
+        "# TYPE audit_failed_total counter",
+        f"audit_failed_total {stats['failed']}",
+    ]
+
+
+def _revocation_lines(stats: dict) -> List[str]:
+    backend = _labels(backend=stats["backend"])
+    lines = [
+        "# HELP revocation_bloom_entries Claves añadidas al filtro de Bloom de tokens revocados.",
+        "# TYPE revocation_bloom_entries gauge",
+        f"revocation_bloom_entries{{{backend}}} {stats['bloom_entries']}",
+        "# HELP revocation_bloom_capacity Capacidad del filtro de Bloom (REVOCATION_BLOOM_CAPACITY).",
+        "# TYPE revocation_bloom_capacity gauge",
+        f"revocation_bloom_capacity{{{backend}}} {stats['bloom_capacity']}",
+        "# HELP revocation_checks_total Comprobaciones de revocación por resultado.",
+        "# TYPE revocation_checks_total counter",
+    ]
+    for result in ("bloom_negative", "revoked", "false_positive"):
+        lines.append(f'revocation_checks_total{{{backend},result="{result}"}} {stats["checks"][result]}')
+    if "revoked" in stats:
+        lines += [
+            "# HELP revoked_tokens Tokens revocados y aún vigentes en memoria de este worker.",
+            "# TYPE revoked_tokens gauge",
+            f"revoked_tokens{{{backend}}} {stats['revoked']}",
+        ]
+    return lines
+
+
+def _pool_lines(pools: dict) -> List[str]:
+    lines = []
+    for name, key, help_text in (
+        ("db_pool_size", "size", "Conexiones permanentes del pool (DB_POOL_SIZE)."),
+        ("db_pool_checked_out", "checked_out", "Conexiones del pool en uso."),
+        ("db_pool_checked_in", "checked_in", "Conexiones libres en el pool."),
+        ("db_pool_overflow", "overflow", "Conexiones de overflow abiertas."),
+    ):
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+        for pool, status in pools.items():
+            # overflow() de SQLAlchemy empieza en -pool_size mientras no se abre ninguna de overflow
+            lines.append(f"{name}{{{_labels(pool=pool)}}} {max(0, status[key])}")
+    # Las latencias de checkout solo se miden en el pool del primario
+    for name, key, help_text in (
+        ("db_pool_checkouts_total", "checkouts", "Conexiones entregadas por el pool."),
+        ("db_pool_waits_total", "waits", "Checkouts que esperaron por falta de conexiones libres."),
+        ("db_pool_wait_seconds_total", "wait_seconds", "Tiempo esperando una conexión libre."),
+        ("db_pool_timeouts_total", "timeouts", "Checkouts que superaron DB_POOL_TIMEOUT."),
+        ("db_pool_connects_total", "connects", "Conexiones nuevas abiertas con Postgres."),
+    ):
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        for pool, status in pools.items():
+            if key in status:
+                lines.append(f"{name}{{{_labels(pool=pool)}}} {status[key]}")
+    return lines
+
+
+# Series de cada fuente registrada con metrics.register_source
+SOURCE_LINES: Dict[str, Callable[[dict], List[str]]] = {
+    "principal_cache": _principal_cache_lines,
+    "audit": _audit_lines,
+    "revocation": _revocation_lines,
+    "db_pools": _pool_lines,
+}
+
+
+def render_metrics() -> str:
+    """Formato de texto de Prometheus (versión 0.0.4)."""
+    routes = list(metrics.routes.values())
+    lines = [
+        "# HELP http_requests_total Peticiones HTTP por ruta y código de estado.",
+        "# TYPE http_requests_total counter",
+    ]
+    for route in routes:
+        labels = _labels(method=route.method, route=route.route)
+        for status_code, count in sorted(route.statuses.items()):
+            lines.append(f'http_requests_total{{{labels},status="{status_code}"}} {count}')
+
+    lines += [
+        "# HELP http_requests_in_flight Peticiones en curso por ruta.",
+        "# TYPE http_requests_in_flight gauge",
+    ]
+    for route in routes:
+        lines.append(f"http_requests_in_flight{{{_labels(method=route.method, route=route.route)}}} {route.in_flight}")
+
+    for name, attribute, help_text in (
+        ("http_request_duration_seconds", "latency", "Latencia de las peticiones HTTP."),
+        ("http_request_db_seconds", "db_time", "Tiempo en la base de datos por petición."),
+        ("http_request_db_statements", "db_statements", "Sentencias SQL por petición."),
+    ):
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for route in routes:
+            histogram = getattr(route, attribute)
+            if histogram.count:
+                lines += _histogram_lines(name, histogram, _labels(method=route.method, route=route.route))
+
+    lines += [
+        "# HELP db_statements_total Sentencias SQL ejecutadas.",
+        "# TYPE db_statements_total counter",
+        f"db_statements_total {metrics.db_statements}",
+        "# HELP db_seconds_total Tiempo total en la base de datos.",
+        "# TYPE db_seconds_total counter",
+        f"db_seconds_total {metrics.db_seconds}",
+        "# HELP encryption_operations_total Valores cifrados o descifrados.",
+        "# TYPE encryption_operations_total counter",
+        f'encryption_operations_total{{op="encrypt"}} {metrics.encrypt_count}',
+        f'encryption_operations_total{{op="decrypt"}} {metrics.decrypt_count}',
+        "# HELP encryption_seconds_total Tiempo dedicado a cifrar o descifrar.",
+        "# TYPE encryption_seconds_total counter",
+        f'encryption_seconds_total{{op="encrypt"}} {metrics.encrypt_seconds}',
+        f'encryption_seconds_total{{op="decrypt"}} {metrics.decrypt_seconds}',
+        "# HELP password_hash_running Hashes de contraseña ejecutándose en el pool.",
+        "# TYPE password_hash_running gauge",
+        f"password_hash_running {metrics.password_running}",
+        "# HELP password_hash_queue_depth Hashes de contraseña esperando un hilo libre.",
+        "# TYPE password_hash_queue_depth gauge",
+        f"password_hash_queue_depth {metrics.password_queued}",
+        "# HELP password_hash_operations_total Hashes y verificaciones de contraseña completados.",
+        "# TYPE password_hash_operations_total counter",
+    ]
+    for op, count in metrics.password_operations.items():
+        lines.append(f'password_hash_operations_total{{op="{op}"}} {count}')
+    lines += [
+        "# HELP password_hash_rejected_total Peticiones rechazadas (503) con la cola de hashing llena.",
+        "# TYPE password_hash_rejected_total counter",
+        f"password_hash_rejected_total {metrics.password_rejected}",
+        "# HELP task_stats_reconciliations_total Reconstrucciones de task_stats.",
+        "# TYPE task_stats_reconciliations_total counter",
+        f"task_stats_reconciliations_total {metrics.task_stats_reconciliations}",
+        "# HELP task_stats_drift_total Filas (usuario, estado) de task_stats que no coincidían con tasks.",
+        "# TYPE task_stats_drift_total counter",
+        f"task_stats_drift_total {metrics.task_stats_drift}",
+        "# HELP task_event_subscribers Conexiones SSE/WebSocket suscritas a eventos de tareas en este worker.",
+        "# TYPE task_event_subscribers gauge",
+        f"task_event_subscribers {metrics.task_event_subscribers}",
+        "# HELP task_events_delivered_total Eventos de tareas encolados a suscriptores.",
+        "# TYPE task_events_delivered_total counter",
+        f"task_events_delivered_total {metrics.task_events_delivered}",
+        "# HELP task_event_consumers_dropped_total Suscriptores dados de baja por no consumir a tiempo.",
+        "# TYPE task_event_consumers_dropped_total counter",
+        f"task_event_consumers_dropped_total {metrics.task_event_consumers_dropped}",
+    ]
+    for name, histograms, help_text in (
+        ("password_hash_wait_seconds", metrics.password_wait, "Espera en la cola del pool de hashing."),
+        ("password_hash_seconds", metrics.password_seconds, "Duración de cada hash o verificación."),
+    ):
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for op, histogram in histograms.items():
+            if histogram.count:
+                lines += _histogram_lines(name, histogram, _labels(op=op))
+    for name, render in SOURCE_LINES.items():
+        stats = metrics.sources.get(name)
+        if stats is not None:
+            lines += render(stats())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,45 @@
+import base64
+import json
+from datetime import datetime
+from typing import NamedTuple, Optional, Sequence
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class Cursor(NamedTuple):
+    created_at: datetime
+    id: str
+    score: Optional[int] = None
+
+
+def encode_cursor(created_at: datetime, id: str, score: Optional[int] = None) -> str:
+    payload = {"c": created_at.isoformat(), "i": id}
+    if score is not None:
+        payload["s"] = score
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    """Cursor opaco -> (created_at, id[, score]) para el predicado de búsqueda por clave."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        score = payload.get("s")
+        return Cursor(
+            created_at=datetime.fromisoformat(payload["c"]),
+            id=str(payload["i"]),
+            score=int(score) if score is not None else None,
+        )
+    except (ValueError, KeyError, TypeError) as error:
+        raise InvalidCursor("Cursor inválido") from error
+
+
+def next_page_cursor(items: Sequence, limit: int) -> Optional[str]:
+    """Cursor de la página siguiente, ordenando por (created_at DESC, id DESC)."""
+    if len(items) < limit or not items:
+        return None
+    last = items[-1]
+    return encode_cursor(last.created_at, last.id)
@@ -0,0 +1,111 @@
+import asyncio
+import hmac
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Tuple
+
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+
+from app.config import settings
+from app.core.metrics import metrics
+
+HASH = "hash"
+VERIFY = "verify"
+ARGON2_PREFIX = "$argon2"
+
+
+class HashingBusy(Exception):
+    """La cola del pool de hashing está llena: la petición se rechaza con 503 en lugar de esperar."""
+
+
+class HashingPool:
+    """Hilos dedicados y acotados para argon2 (libera el GIL), fuera del bucle de eventos.
+
+    Como mucho `workers` hashes a la vez (cada uno reserva `memory_cost` KiB) y
+    `max_pending` entre ejecutándose y en cola; por encima se lanza HashingBusy.
+    """
+
+    def __init__(self, hasher: PasswordHasher, workers: int, max_pending: int):
+        self.hasher = hasher
+        self.workers = max(1, workers)
+        self.max_pending = max(self.workers, max_pending)
+        self.pending = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _publish(self) -> None:
+        metrics.password_running = min(self.pending, self.workers)
+        metrics.password_queued = max(0, self.pending - self.workers)
+
+    async def run(self, op: str, fn: Callable, *args):
+        if self.pending >= self.max_pending:
+            metrics.password_rejected += 1
+            raise HashingBusy()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+
+        def timed():
+            started = time.perf_counter()
+            return started, fn(*args), time.perf_counter()
+
+        self.pending += 1
+        self._publish()
+        submitted = time.perf_counter()
+        try:
+            started, result, finished = await asyncio.get_running_loop().run_in_executor(self._executor, timed)
+        finally:
+            self.pending -= 1
+            self._publish()
+        metrics.password_operations[op] += 1
+        metrics.password_wait[op].observe(started - submitted)
+        metrics.password_seconds[op].observe(finished - started)
+        return result
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+hashing_pool = HashingPool(
+    PasswordHasher(
+        time_cost=settings.PASSWORD_HASH_TIME_COST,
+        memory_cost=settings.PASSWORD_HASH_MEMORY_COST,
+        parallelism=settings.PASSWORD_HASH_PARALLELISM,
+    ),
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_QUEUE_SIZE,
+)
+
+
+def is_hashed(stored: str) -> bool:
+    return stored.startswith(ARGON2_PREFIX)
+
+
+async def hash_password(password: str) -> str:
+    return await hashing_pool.run(HASH, hashing_pool.hasher.hash, password)
+
+
+def _verify(stored: str, password: str) -> Tuple[bool, bool]:
+    hasher = hashing_pool.hasher
+    try:
+        hasher.verify(stored, password)
+    except (VerificationError, InvalidHashError):
+        return False, False
+    return True, hasher.check_needs_rehash(stored)
+
+
+async def verify_password(password: str, stored: str) -> Tuple[bool, Optional[str]]:
+    """(válida, hash nuevo). El hash nuevo viene informado si hay que guardarlo:
+    contraseña heredada en claro o parámetros de coste distintos de los actuales.
+    """
+    if not is_hashed(stored):
+        # Contraseñas anteriores al hashing: se comparan en tiempo constante y se migran al acertar
+        if not hmac.compare_digest(password.encode(), stored.encode()):
+            return False, None
+        return True, await hash_password(password)
+
+    valid, needs_rehash = await hashing_pool.run(VERIFY, _verify, stored, password)
+    if valid and needs_rehash:
+        return True, await hash_password(password)
+    return valid, None
@@ -0,0 +1,91 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import asyncpg
+
+from app.config import settings
+
+NotifyHandler = Callable[[str], None]
+ReconnectHandler = Callable[[], Awaitable[None]]
+
+
+class PgListener:
+    """Una sola conexión LISTEN por proceso, compartida por todos los canales.
+
+    Si la conexión se pierde se reconecta y llama a los `on_reconnect` de cada canal,
+    porque las notificaciones emitidas mientras tanto no se reciben.
+    """
+
+    def __init__(self, dsn: str, reconnect_delay: float = 2.0):
+        self.dsn = dsn
+        self.reconnect_delay = reconnect_delay
+        self._handlers: Dict[str, List[NotifyHandler]] = {}
+        self._on_reconnect: List[ReconnectHandler] = []
+        self._task: Optional[asyncio.Task] = None
+        self._connected = asyncio.Event()
+
+    def subscribe(self, channel: str, handler: NotifyHandler, on_reconnect: Optional[ReconnectHandler] = None) -> None:
+        self._handlers.setdefault(channel, []).append(handler)
+        if on_reconnect is not None:
+            self._on_reconnect.append(on_reconnect)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self, timeout: float = 10.0) -> None:
+        if self.running or not self._handlers:
+            return
+        self._task = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(self._connected.wait(), timeout)
+        except asyncio.TimeoutError:
+            print("PgListener: no se pudo conectar, se reintentará en segundo plano")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def _dispatch(self, connection, pid, channel: str, payload: str) -> None:
+        for handler in self._handlers.get(channel, ()):
+            try:
+                handler(payload)
+            except Exception as error:
+                print(f"PgListener: error procesando '{channel}': {error}")
+
+    async def _run(self) -> None:
+        resync = False
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(self.dsn)
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _: closed.set())
+                for channel in self._handlers:
+                    await connection.add_listener(channel, self._dispatch)
+
+                if resync:
+                    for on_reconnect in self._on_reconnect:
+                        await on_reconnect()
+                self._connected.set()
+                await closed.wait()
+                print("PgListener: conexión perdida, reconectando")
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                print(f"PgListener: error de conexión: {error}")
+            finally:
+                resync = True
+                self._connected.clear()
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            await asyncio.sleep(self.reconnect_delay)
+
+
+pg_listener = PgListener(settings.DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://"))
@@ -0,0 +1,91 @@
+import os
+import time
+from bisect import bisect_left
+from typing import List, Optional
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+# Límites superiores (ms) de los buckets del histograma de latencia de checkout
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class PoolStats:
+    """Métricas del pool de este proceso (cada worker de uvicorn tiene su propio pool)."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.reset()
+
+    def reset(self) -> None:
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.timeouts = 0
+        self.connects = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self._counts: List[int] = [0] * (len(self.buckets) + 1)
+
+    def observe(self, seconds: float, waited: bool) -> None:
+        self.checkouts += 1
+        self.latency_sum += seconds
+        self.latency_max = max(self.latency_max, seconds)
+        self._counts[bisect_left(self.buckets, seconds * 1000)] += 1
+        if waited:
+            self.waits += 1
+            self.wait_seconds += seconds
+
+    def histogram(self) -> dict:
+        labels = [f"le_{bound}ms" for bound in self.buckets] + ["inf"]
+        return dict(zip(labels, self._counts))
+
+    def as_dict(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "checkouts": self.checkouts,
+            "connects": self.connects,
+            "waits": self.waits,
+            "wait_seconds": round(self.wait_seconds, 6),
+            "timeouts": self.timeouts,
+            "checkout_latency_avg_ms": round(self.latency_sum / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "checkout_latency_max_ms": round(self.latency_max * 1000, 3),
+            "checkout_latency_histogram": self.histogram(),
+        }
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Mide cuánto tarda cada checkout (espera en la cola, conexión nueva y pre-ping)."""
+
+    def connect(self):
+        # Sin conexiones libres ni overflow disponible la petición tiene que esperar
+        waited = self.checkedin() == 0 and self._max_overflow > -1 and self.overflow() >= self._max_overflow
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            pool_stats.timeouts += 1
+            raise
+        pool_stats.observe(time.perf_counter() - start, waited)
+        return connection
+
+    def _create_connection(self):
+        pool_stats.connects += 1
+        return super()._create_connection()
+
+
+def pool_status(pool, stats: Optional[PoolStats] = pool_stats) -> dict:
+    status = {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": pool._max_overflow,
+        "timeout": pool.timeout(),
+    }
+    if stats is not None:
+        status.update(stats.as_dict())
+    return status
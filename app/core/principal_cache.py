@@ -0,0 +1,151 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.metrics import metrics
+from app.core.pg_listener import pg_listener
+from app.models.user import User
+
+_PENDING_KEY = "pending_principal_invalidations"
+CHANNEL = "principal_invalidations"
+
+
+class PrincipalCache:
+    """Cache LRU con TTL de usuarios autenticados, indexado por el `sub` del token.
+
+    `generation` aumenta con cada invalidación. Quien carga un usuario lee antes la
+    generación y la pasa a `set`: si entretanto se invalidó algo, lo cargado puede ser
+    anterior a ese commit y no se guarda.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, User]]" = OrderedDict()
+        self._subjects_by_user_id: Dict[str, str] = {}
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stale_sets = 0
+
+    def get(self, subject: str) -> Optional[User]:
+        entry = self._entries.get(subject)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, user = entry
+        if expires_at <= time.monotonic():
+            self._remove(subject)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(subject)
+        self.hits += 1
+        return user
+
+    def set(self, subject: str, user: User, generation: int) -> None:
+        if self.max_size <= 0 or self.ttl_seconds <= 0:
+            return
+        if generation != self.generation:
+            self.stale_sets += 1
+            return
+
+        if subject in self._entries:
+            self._remove(subject)
+
+        self._entries[subject] = (time.monotonic() + self.ttl_seconds, user)
+        self._subjects_by_user_id[user.id] = subject
+
+        while len(self._entries) > self.max_size:
+            oldest, _ = next(iter(self._entries.items()))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate(self, subject: str) -> None:
+        self.generation += 1
+        self._remove(subject)
+
+    def invalidate_user(self, user_id: str) -> None:
+        self.generation += 1
+        subject = self._subjects_by_user_id.get(user_id)
+        if subject is not None:
+            self._remove(subject)
+
+    def clear(self) -> None:
+        self.generation += 1
+        self._entries.clear()
+        self._subjects_by_user_id.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "stale_sets": self.stale_sets,
+            "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+        }
+
+    def _remove(self, subject: str) -> None:
+        entry = self._entries.pop(subject, None)
+        if entry is not None:
+            _, user = entry
+            if self._subjects_by_user_id.get(user.id) == subject:
+                del self._subjects_by_user_id[user.id]
+
+
+principal_cache = PrincipalCache(
+    max_size=settings.PRINCIPAL_CACHE_MAX_SIZE,
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+metrics.register_source("principal_cache", principal_cache.stats)
+
+
+def _invalidate_users(payload: str) -> None:
+    for user_id in payload.split(","):
+        principal_cache.invalidate_user(user_id)
+
+
+async def _clear_after_reconnect() -> None:
+    # Las invalidaciones emitidas sin LISTEN se han perdido
+    principal_cache.clear()
+
+
+# Cada worker tiene su caché: las invalidaciones de los demás llegan por NOTIFY
+pg_listener.subscribe(CHANNEL, _invalidate_users, on_reconnect=_clear_after_reconnect)
+
+
+def invalidate_on_commit(session: Session, user_id: str) -> None:
+    """Invalida al usuario cuando la transacción confirma, en este worker y en los demás.
+
+    Antes del commit el resto de peticiones ve la fila anterior.
+    """
+    session.info.setdefault(_PENDING_KEY, set()).add(user_id)
+
+
+@event.listens_for(Session, "before_commit")
+def _notify_pending(session: Session) -> None:
+    # pg_notify se entrega al confirmar, en la misma transacción que el cambio
+    pending = session.info.get(_PENDING_KEY)
+    if pending:
+        session.execute(select(func.pg_notify(CHANNEL, ",".join(sorted(pending)))))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_pending(session: Session) -> None:
+    for user_id in session.info.pop(_PENDING_KEY, ()):
+        principal_cache.invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending(session: Session, previous_transaction) -> None:
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,50 @@
+from typing import Any, Iterable, List, Sequence, Type
+
+import orjson
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from app.config import settings
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse con orjson. Serializa datetime igual que pydantic (UTC como `Z`)."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+
+
+def _row(fields: Sequence[str], obj: Any) -> dict:
+    # Las columnas cargadas están en __dict__: leerlas ahí evita el descriptor de SQLAlchemy,
+    # que es lo más caro de la fila. Las que falten (expiradas, diferidas) van por getattr.
+    loaded = obj.__dict__
+    return {name: loaded[name] if name in loaded else getattr(obj, name) for name in fields}
+
+
+def model_row(model: Type[BaseModel], obj: Any) -> dict:
+    return _row(tuple(model.model_fields), obj)
+
+
+def model_rows(model: Type[BaseModel], objects: Iterable[Any]) -> List[dict]:
+    """Filas ORM como dicts con los campos del esquema, sin instanciar ni validar el modelo.
+
+    Solo para esquemas planos cuyos campos son columnas ya tipadas (TaskResponse, UserResponse).
+    """
+    fields = tuple(model.model_fields)
+    return [_row(fields, obj) for obj in objects]
+
+
+def fast_response(content: Any, response: Response) -> Any:
+    """Con FAST_JSON el contenido se serializa una sola vez con orjson y se salta el `response_model`.
+
+    Sin FAST_JSON se devuelve tal cual y FastAPI lo valida y serializa como siempre.
+    Las cabeceras puestas en `response` (ETag, X-Next-Cursor, cookies) se conservan en ambos casos.
+    """
+    if not settings.FAST_JSON:
+        return content
+    fast = FastJSONResponse(content)
+    fast.raw_headers.extend(
+        (name, value) for name, value in response.raw_headers if name != b"content-length"
+    )
+    return fast
@@ -0,0 +1,252 @@
+import hashlib
+import hmac
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import case, delete, distinct, func, literal, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.blind_index import normalize
+from app.core.pagination import decode_cursor, encode_cursor
+from app.models.search import SearchToken
+
+TASK = "task"
+USER = "user"
+
+GRAM_SIZES = (1, 2, 3)
+PREFIX_MAX = 32
+MAX_INDEXED_CHARS = 1000
+
+PREFIX = "p"
+GRAM = "g"
+
+# Mismas reglas y pesos que el filtrado en Python que reemplaza: cada grupo
+# suma los puntos de la primera alternativa que se cumpla. PREFIX: el campo empieza
+# por el término; GRAM: el campo contiene el término (como ILIKE '%término%').
+TASK_SCORING = [
+    [(("task_name",), PREFIX, 100), (("task_name",), GRAM, 30)],
+    [(("description",), GRAM, 50)],
+    [(("status",), GRAM, 20)],
+]
+USER_SCORING = [
+    [(("name_complete",), PREFIX, 100), (("name_complete",), GRAM, 30)],
+    [(("email", "role"), PREFIX, 50), (("email", "role"), GRAM, 20)],
+]
+
+
+
+class InvalidSearch(ValueError):
+    pass
+
+
+_KEY = hmac.new(settings.BLIND_INDEX_KEY.encode(), b"search-index", hashlib.sha256).digest()
+
+
+def _digest(entity: str, field: str, kind: str, text: str) -> str:
+    message = f"{entity}|{field}|{kind}|{text}".encode()
+    return hmac.new(_KEY, message, hashlib.sha256).hexdigest()[:32]
+
+
+def _grams(text: str) -> set:
+    grams = set()
+    for size in GRAM_SIZES:
+        for start in range(len(text) - size + 1):
+            grams.add(text[start:start + size])
+    return grams
+
+
+def field_tokens(entity: str, field: str, value: Optional[str]) -> set:
+    if not value:
+        return set()
+
+    text = normalize(value)[:MAX_INDEXED_CHARS]
+    tokens = {_digest(entity, field, GRAM, gram) for gram in _grams(text)}
+    tokens.update(
+        _digest(entity, field, PREFIX, text[:length])
+        for length in range(1, min(len(text), PREFIX_MAX) + 1)
+    )
+    return tokens
+
+
+def term_tokens(entity: str, field: str, term: str) -> Tuple[str, List[str]]:
+    """Token de prefijo y n-gramas que debe tener un campo para contener `term`."""
+    size = max(GRAM_SIZES)
+    if len(term) <= size:
+        grams = {term}
+    else:
+        grams = {term[start:start + size] for start in range(len(term) - size + 1)}
+    prefix = _digest(entity, field, PREFIX, term[:PREFIX_MAX])
+    return prefix, sorted(_digest(entity, field, GRAM, gram) for gram in grams)
+
+
+def document_rows(entity: str, entity_id: str, owner_id: Optional[str], fields: Dict[str, Optional[str]]) -> List[dict]:
+    rows = []
+    for field, value in fields.items():
+        for token in field_tokens(entity, field, value):
+            rows.append({
+                "token": token,
+                "entity_id": entity_id,
+                "entity": entity,
+                "owner_id": owner_id,
+                "field": field,
+            })
+    return rows
+
+
+async def index_document(
+    db: AsyncSession,
+    entity: str,
+    entity_id: str,
+    fields: Dict[str, Optional[str]],
+    owner_id: Optional[str] = None,
+    created: bool = False,
+) -> None:
+    """Reemplaza los tokens del documento; se ejecuta en la transacción de la escritura."""
+    await index_documents(db, entity, [(entity_id, owner_id, fields)], created=created)
+
+
+async def index_documents(
+    db: AsyncSession,
+    entity: str,
+    documents: Sequence[Tuple[str, Optional[str], Dict[str, Optional[str]]]],
+    created: bool = False,
+) -> None:
+    """Igual que index_document para varios (entity_id, owner_id, fields): un DELETE y un INSERT.
+
+    Con `created=True` (filas recién insertadas) no hay tokens previos y se omite el DELETE.
+    """
+    if not documents:
+        return
+    if not created:
+        entity_ids = [entity_id for entity_id, _, _ in documents]
+        await db.execute(delete(SearchToken).where(SearchToken.entity_id.in_(entity_ids)))
+
+    rows = []
+    for entity_id, owner_id, fields in documents:
+        rows.extend(document_rows(entity, entity_id, owner_id, fields))
+    if rows:
+        # Dos reindexados concurrentes sin cambios en la fila (sin lock) insertan los mismos tokens
+        await db.execute(insert(SearchToken).on_conflict_do_nothing(), rows)
+
+
+async def copy_documents(
+    db: AsyncSession,
+    entity: str,
+    documents: Sequence[Tuple[str, Optional[str], Dict[str, Optional[str]]]],
+) -> None:
+    """Indexa documentos nuevos con COPY (importaciones): sin DELETE previo ni ON CONFLICT.
+
+    Usa la conexión de la sesión, así que entra en su transacción; esta ya debe haber
+    empezado con alguna sentencia previa (p. ej. el INSERT de las filas).
+    """
+    columns = ("token", "entity_id", "entity", "owner_id", "field")
+    records = [
+        (token, entity_id, entity, owner_id, field)
+        for entity_id, owner_id, fields in documents
+        for field, value in fields.items()
+        for token in field_tokens(entity, field, value)
+    ]
+    if not records:
+        return
+    connection = await (await db.connection()).get_raw_connection()
+    await connection.driver_connection.copy_records_to_table(
+        SearchToken.__tablename__, records=records, columns=columns
+    )
+
+
+def search_scores(entity: str, term: str, scoring: Sequence, owner_id: Optional[str] = None):
+    """Subconsulta (entity_id, score) con la puntuación calculada en Postgres.
+
+    Es una cota superior: que un campo tenga todos los n-gramas del término no implica que
+    lo contenga ("abcxbcd" tiene los de "abcd"). Sirve para elegir candidatos; la
+    puntuación real sale de exact_score sobre los valores descifrados.
+    """
+    all_tokens = set()
+    score = literal(0)
+
+    for group in scoring:
+        whens = []
+        for fields, kind, points in group:
+            matches = []
+            for field in fields:
+                prefix, grams = term_tokens(entity, field, term)
+                if kind == PREFIX:
+                    all_tokens.add(prefix)
+                    matches.append(func.bool_or(SearchToken.token == prefix))
+                else:
+                    all_tokens.update(grams)
+                    matched = func.count(distinct(SearchToken.token)).filter(SearchToken.token.in_(grams))
+                    matches.append(matched == len(grams))
+            condition = matches[0]
+            for match in matches[1:]:
+                condition = condition | match
+            whens.append((condition, points))
+        score = score + case(*whens, else_=0)
+
+    query = select(SearchToken.entity_id, score.label("score")).where(
+        SearchToken.entity == entity,
+        SearchToken.token.in_(sorted(all_tokens)),
+    )
+    if owner_id is not None:
+        query = query.where(SearchToken.owner_id == owner_id)
+
+    return query.group_by(SearchToken.entity_id).subquery("search_scores")
+
+
+def exact_score(term: str, scoring: Sequence, values: Dict[str, Optional[str]]) -> int:
+    """Puntuación de `scoring` sobre los valores descifrados del documento."""
+    score = 0
+    for group in scoring:
+        for fields, kind, points in group:
+            texts = [normalize(values[field]) for field in fields if values.get(field)]
+            if any(text.startswith(term) if kind == PREFIX else term in text for text in texts):
+                score += points
+                break
+    return score
+
+
+def rank_matches(
+    candidates: Sequence,
+    term: str,
+    scoring: Sequence,
+    values: Callable[[object], Dict[str, Optional[str]]],
+    limit: int,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+) -> Tuple[list, int, Optional[str]]:
+    """Verifica los candidatos del índice y devuelve (página, total, cursor siguiente).
+
+    Los candidatos ya vienen descifrados; los que no contienen el término quedan fuera
+    del orden (score DESC, created_at DESC, id DESC) y del total.
+    """
+    scored = []
+    for item in candidates:
+        score = exact_score(term, scoring, values(item))
+        if score > 0:
+            scored.append((score, item))
+    scored.sort(key=lambda pair: (pair[0], pair[1].created_at, pair[1].id), reverse=True)
+
+    if cursor:
+        position = decode_cursor(cursor)
+        after = (position.score or 0, position.created_at, position.id)
+        page = [pair for pair in scored if (pair[0], pair[1].created_at, pair[1].id) < after][:limit]
+    else:
+        page = scored[offset:offset + limit]
+
+    next_cursor = None
+    if page and len(page) == limit:
+        score, last = page[-1]
+        next_cursor = encode_cursor(last.created_at, last.id, score=score)
+    return [item for _, item in page], len(scored), next_cursor
+
+
+def search_term(search: Optional[str]) -> Optional[str]:
+    """Término normalizado; InvalidSearch si supera PREFIX_MAX caracteres (el índice guarda
+    prefijos hasta esa longitud, así que uno más largo no se podría buscar por prefijo)."""
+    if search is None:
+        return None
+    term = normalize(search)
+    if len(term) > PREFIX_MAX:
+        raise InvalidSearch(f"La búsqueda admite como máximo {PREFIX_MAX} caracteres")
+    return term or None
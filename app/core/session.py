@@ -1,11 +1,103 @@
+import time
+from collections import OrderedDict
+from uuid import uuid4
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.config import settings
+from app.core.metrics import instrument_engine, metrics
+from app.core.pool_stats import InstrumentedQueuePool, pool_status
+from app.core import sql_budget
 
-engine = create_async_engine(settings.DATABASE_URL, echo=True, future=True)
+
+def _connect_args() -> dict:
+    if settings.DB_PGBOUNCER:
+        # PgBouncer en modo transacción no conserva sentencias preparadas entre transacciones
+        return {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+    return {
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+    }
+
+
+def _create_engine(url: str, poolclass):
+    engine = create_async_engine(
+        url,
+        echo=settings.DB_ECHO,
+        future=True,
+        poolclass=poolclass,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args=_connect_args(),
+    )
+    instrument_engine(engine)
+    sql_budget.instrument_engine(engine)
+    return engine
+
+
+engine = _create_engine(settings.DATABASE_URL, InstrumentedQueuePool)
 async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False, future=True)
 
+# Réplica de solo lectura opcional; sin DB_REPLICA_HOST las lecturas usan el primario
+replica_engine = (
+    _create_engine(settings.DATABASE_REPLICA_URL, AsyncAdaptedQueuePool)
+    if settings.DATABASE_REPLICA_URL else None
+)
+replica_session = (
+    sessionmaker(replica_engine, class_=AsyncSession, expire_on_commit=False, future=True)
+    if replica_engine is not None else None
+)
+
+
+def _pools_status() -> dict:
+    pools = {"primary": pool_status(engine.sync_engine.pool)}
+    if replica_engine is not None:
+        pools["replica"] = pool_status(replica_engine.sync_engine.pool, stats=None)
+    return pools
+
+
+metrics.register_source("db_pools", _pools_status)
+
+
+class StickyWindow:
+    """Usuarios que acaban de escribir: leen del primario durante `seconds` (lee-tus-escrituras).
+
+    Es memoria del proceso; entre workers lo complementa la cookie STICKY_COOKIE.
+    """
+
+    def __init__(self, seconds: float, max_size: int = 10000):
+        self.seconds = seconds
+        self.max_size = max_size
+        self._until: "OrderedDict[str, float]" = OrderedDict()
+
+    def mark(self, key: str) -> None:
+        self._until[key] = time.monotonic() + self.seconds
+        self._until.move_to_end(key)
+        while len(self._until) > self.max_size:
+            self._until.popitem(last=False)
+
+    def active(self, key: str) -> bool:
+        until = self._until.get(key)
+        if until is None:
+            return False
+        if until <= time.monotonic():
+            del self._until[key]
+            return False
+        return True
+
+
+STICKY_COOKIE = "db_primary_until"
+sticky_writes = StickyWindow(settings.DB_STICKY_SECONDS)
+
+
 async def get_db():
     async with async_session() as session:
         try:
@@ -14,4 +106,3 @@ async def get_db():
         except exc.SQLAlchemyError as error:
             await session.rollback()
             raise
-
@@ -0,0 +1,127 @@
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, List, Optional
+
+from sqlalchemy import event
+
+from app.config import settings
+
+OFF = "off"
+WARN = "warn"
+RAISE = "raise"
+
+_PARAM = re.compile(r"\$\d+(::\w+(\s+WITH(OUT)?\s+TIME\s+ZONE)?(\[\])?)?|%\([^)]+\)s|\?", re.IGNORECASE)
+_LIST = re.compile(r"\(\s*\?(\s*,\s*\?)+\s*\)")
+_NUMBER = re.compile(r"\b\d+\b")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_SPACES = re.compile(r"\s+")
+
+
+class SqlBudgetExceeded(RuntimeError):
+    pass
+
+
+def normalize_sql(statement: str) -> str:
+    """Misma consulta con distintos parámetros o listas IN de distinto tamaño -> misma clave."""
+    sql = _STRING.sub("?", statement)
+    sql = _PARAM.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _LIST.sub("(?...)", sql)
+    return _SPACES.sub(" ", sql).strip()
+
+
+class StatementLog:
+    """Sentencias de una petición agrupadas por SQL normalizado."""
+
+    def __init__(self, route: str = "", budget: Optional[int] = None, allow_repeats: bool = False):
+        self.route = route
+        self.budget = budget
+        self.allow_repeats = allow_repeats
+        self.total = 0
+        self.statements: Counter = Counter()
+
+    def record(self, statement: str) -> None:
+        self.total += 1
+        self.statements[normalize_sql(statement)] += 1
+
+    def repeated(self, threshold: Optional[int] = None) -> List[str]:
+        """Sentencias idénticas (salvo parámetros) repetidas: típico patrón N+1."""
+        threshold = threshold or settings.SQL_N_PLUS_ONE_THRESHOLD
+        return [sql for sql, count in self.statements.items() if count >= threshold]
+
+    def problems(self) -> List[str]:
+        problems = []
+        if self.budget is not None and self.total > self.budget:
+            problems.append(f"{self.route}: {self.total} sentencias SQL, presupuesto {self.budget}")
+        for sql in () if self.allow_repeats else self.repeated():
+            problems.append(f"{self.route}: posible N+1, {self.statements[sql]} veces: {sql[:200]}")
+        return problems
+
+
+current_log: ContextVar[Optional[StatementLog]] = ContextVar("sql_statement_log", default=None)
+_captures: List[List[StatementLog]] = []
+
+
+def sql_budget(limit: Optional[int], allow_repeats: bool = False) -> Callable:
+    """Declara el máximo de sentencias SQL de un endpoint (se comprueba con SQL_BUDGET_MODE).
+
+    `allow_repeats` es para rutas que repiten sentencias a propósito (p. ej. un INSERT por bloque).
+    """
+    def decorator(endpoint: Callable) -> Callable:
+        endpoint.__sql_budget__ = limit
+        endpoint.__sql_allow_repeats__ = allow_repeats
+        return endpoint
+    return decorator
+
+
+def tracking_enabled() -> bool:
+    return settings.SQL_BUDGET_MODE != OFF or bool(_captures)
+
+
+def start_request(route: str, budget: Optional[int], allow_repeats: bool = False):
+    return current_log.set(StatementLog(route, budget, allow_repeats))
+
+
+def check_request(log: StatementLog) -> None:
+    """Con SQL_BUDGET_MODE=raise se llama antes de enviar la respuesta, así el cliente recibe el error."""
+    problems = log.problems()
+    if problems and settings.SQL_BUDGET_MODE == RAISE:
+        raise SqlBudgetExceeded("; ".join(problems))
+
+
+def finish_request(token) -> None:
+    log = current_log.get()
+    current_log.reset(token)
+    if log is None:
+        return
+    for captured in _captures:
+        captured.append(log)
+    if settings.SQL_BUDGET_MODE == WARN:
+        for problem in log.problems():
+            print(f"SQL budget: {problem}")
+
+
+@contextmanager
+def capture_sql() -> Iterator[List[StatementLog]]:
+    """Para pruebas: recoge el StatementLog de cada petición terminada dentro del bloque.
+
+        with capture_sql() as logs:
+            await client.get("/tasks")
+        assert logs[0].total <= logs[0].budget
+    """
+    captured: List[StatementLog] = []
+    _captures.append(captured)
+    try:
+        yield captured
+    finally:
+        _captures.remove(captured)
+
+
+def instrument_engine(engine) -> None:
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _record_statement(conn, cursor, statement, parameters, context, executemany):
+        log = current_log.get()
+        if log is not None:
+            log.record(statement)
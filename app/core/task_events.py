@@ -0,0 +1,124 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Set
+
+from sqlalchemy import String, bindparam, func, select
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from app.config import settings
+from app.core.metrics import metrics
+from app.core.pg_listener import pg_listener
+
+CHANNEL = "task_events"
+
+CREATED = "created"
+UPDATED = "updated"
+DELETED = "deleted"
+# Solo para suscriptores: se perdieron notificaciones (reconexión) o el cliente iba demasiado lento
+RESYNC = "resync"
+DROPPED = "dropped"
+
+# pg_notify admite hasta 8000 bytes por mensaje: los lotes grandes se reparten en varios
+IDS_PER_NOTIFY = 200
+
+
+class Subscription:
+    """Cola acotada de eventos de tareas de un usuario, para una conexión SSE o WebSocket."""
+
+    def __init__(self, user_id: str, size: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=size)
+        self.dropped = False
+
+    async def next(self, timeout: float) -> Optional[dict]:
+        """Siguiente evento, o None si no llega ninguno en `timeout` segundos (latido)."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class TaskEventHub:
+    """Reparte las notificaciones de `task_events` (una conexión LISTEN por proceso) a las
+    colas de los suscriptores del usuario afectado.
+
+    Nunca espera a un consumidor: si su cola está llena se vacía, recibe `dropped` y se
+    da de baja; el cliente debe reconectar y volver a leer sus tareas.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+
+    @property
+    def subscribers(self) -> int:
+        return sum(len(subscriptions) for subscriptions in self._subscribers.values())
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: str) -> AsyncIterator[Subscription]:
+        subscription = Subscription(user_id, self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(subscription)
+        metrics.task_event_subscribers = self.subscribers
+        try:
+            yield subscription
+        finally:
+            self._remove(subscription)
+
+    def _remove(self, subscription: Subscription) -> None:
+        subscriptions = self._subscribers.get(subscription.user_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscribers[subscription.user_id]
+        metrics.task_event_subscribers = self.subscribers
+
+    def _deliver(self, subscription: Subscription, event: dict) -> None:
+        try:
+            subscription.queue.put_nowait(event)
+            metrics.task_events_delivered += 1
+        except asyncio.QueueFull:
+            while not subscription.queue.empty():
+                subscription.queue.get_nowait()
+            subscription.queue.put_nowait({"type": DROPPED})
+            subscription.dropped = True
+            self._remove(subscription)
+            metrics.task_event_consumers_dropped += 1
+
+    def dispatch(self, payload: str) -> None:
+        event = json.loads(payload)
+        for subscription in list(self._subscribers.get(event["user_id"], ())):
+            self._deliver(subscription, event)
+
+    async def resync(self) -> None:
+        """Tras reconectar el LISTEN: las notificaciones intermedias se perdieron."""
+        for subscriptions in list(self._subscribers.values()):
+            for subscription in list(subscriptions):
+                self._deliver(subscription, {"type": RESYNC})
+
+
+task_events = TaskEventHub(settings.TASK_EVENTS_QUEUE_SIZE)
+if settings.TASK_EVENTS:
+    pg_listener.subscribe(CHANNEL, task_events.dispatch, on_reconnect=task_events.resync)
+
+
+def _payloads(event: str, user_id: str, task_ids: Sequence[str]) -> List[str]:
+    ids = list(task_ids)
+    return [
+        json.dumps({"type": event, "user_id": user_id, "ids": ids[start:start + IDS_PER_NOTIFY]})
+        for start in range(0, len(ids), IDS_PER_NOTIFY)
+    ]
+
+
+def notify_statement(event: str, user_id: str, task_ids: Sequence[str]):
+    """SELECT pg_notify(...) con un mensaje por bloque de ids; None si no hay nada que enviar.
+
+    Solo viajan ids (nunca campos cifrados): el cliente relee las tareas que le interesan.
+    La notificación se entrega al confirmar la transacción y se descarta si hay rollback.
+    """
+    if not settings.TASK_EVENTS or not task_ids:
+        return None
+    payload = func.unnest(
+        bindparam("task_event_payloads", _payloads(event, user_id, task_ids), type_=ARRAY(String))
+    ).table_valued("payload").render_derived()
+    return select(func.pg_notify(CHANNEL, payload.c.payload)).select_from(payload)
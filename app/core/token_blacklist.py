@@ -1,10 +1,213 @@
-blacklisted_tokens = set()
+import asyncio
+import hashlib
+import heapq
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 
-def add_token_to_blacklist(token: str):
-    blacklisted_tokens.add(token)
+import pytz
+from sqlalchemy import delete, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 
-def is_token_blacklisted(token: str) -> bool:
-    return token in blacklisted_tokens
+from app.config import settings
+from app.core.bloom import BloomFilter
+from app.core.metrics import metrics
+from app.core.pg_listener import pg_listener
+from app.core.session import async_session
+from app.models.revoked_token import RevokedToken
 
-#Nota: En producción es mejor usar Redis con expiración automática (EXPIRE) 
-#para que los tokens caduquen y no llenar la memoria.
\ No newline at end of file
+MEMORY = "memory"
+POSTGRES = "postgres"
+
+CHANNEL = "revoked_tokens"
+
+
+def token_key(payload: dict, token: str) -> str:
+    """`jti` del token; los emitidos antes de incluirlo se identifican por su hash."""
+    return payload.get("jti") or hashlib.sha256(token.encode()).hexdigest()
+
+
+def token_expiry(payload: dict) -> float:
+    return float(payload.get("exp") or time.time() + settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+
+class RevocationStore:
+    """Filtro de Bloom delante del almacén: un token no revocado se descarta en O(1) sin más consultas."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._bloom = BloomFilter(capacity, error_rate)
+        self.checks: Dict[str, int] = {"bloom_negative": 0, "revoked": 0, "false_positive": 0}
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    async def revoke(self, db: AsyncSession, key: str, expires_at: float) -> None:
+        raise NotImplementedError
+
+    async def is_revoked(self, db: AsyncSession, key: str) -> bool:
+        if key not in self._bloom:
+            self.checks["bloom_negative"] += 1
+            return False
+        revoked = await self._confirm(db, key)
+        self.checks["revoked" if revoked else "false_positive"] += 1
+        return revoked
+
+    async def _confirm(self, db: AsyncSession, key: str) -> bool:
+        raise NotImplementedError
+
+    def _build_bloom(self, keys) -> BloomFilter:
+        """Filtro nuevo con `keys`; se sustituye de una vez, nunca se vacía el que está en uso."""
+        bloom = BloomFilter(self.capacity, self.error_rate)
+        for key in keys:
+            bloom.add(key)
+        return bloom
+
+    def stats(self) -> dict:
+        return {
+            "bloom_entries": self._bloom.count,
+            "bloom_capacity": self._bloom.capacity,
+            "checks": dict(self.checks),
+        }
+
+
+class MemoryRevocationStore(RevocationStore):
+    """Por proceso: dict jti -> exp más un min-heap de expiraciones para purgar en O(log n)."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        super().__init__(capacity, error_rate)
+        self._expiry: Dict[str, float] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._stale = 0
+
+    def _prune(self, now: float) -> None:
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, key = heapq.heappop(self._heap)
+            if self._expiry.get(key) == expires_at:
+                del self._expiry[key]
+                self._stale += 1
+        # El filtro no admite borrados: se reconstruye cuando la mitad son entradas vencidas
+        if self._stale and (self._stale > len(self._expiry) or self._bloom.saturated):
+            self._bloom = self._build_bloom(self._expiry)
+            self._stale = 0
+
+    async def revoke(self, db: AsyncSession, key: str, expires_at: float) -> None:
+        now = time.time()
+        if expires_at <= now:
+            return
+        self._prune(now)
+        self._expiry[key] = max(expires_at, self._expiry.get(key, 0))
+        heapq.heappush(self._heap, (self._expiry[key], key))
+        self._bloom.add(key)
+
+    async def _confirm(self, db: AsyncSession, key: str) -> bool:
+        self._prune(time.time())
+        return key in self._expiry
+
+    def stats(self) -> dict:
+        return {**super().stats(), "backend": MEMORY, "revoked": len(self._expiry)}
+
+
+class PostgresRevocationStore(RevocationStore):
+    """Compartido entre workers: tabla `revoked_tokens` y NOTIFY para alimentar el filtro de cada proceso."""
+
+    def __init__(self, capacity: int, error_rate: float, prune_interval: float):
+        super().__init__(capacity, error_rate)
+        self.prune_interval = prune_interval
+        self._task: Optional[asyncio.Task] = None
+        # Una lista por recarga en curso con las claves recibidas mientras espera a la consulta
+        self._reloads: List[List[str]] = []
+
+    async def start(self) -> None:
+        await self.reload()
+        pg_listener.subscribe(CHANNEL, self._add, on_reconnect=self.reload)
+        self._task = asyncio.create_task(self._prune_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _add(self, key: str) -> None:
+        self._bloom.add(key)
+        for received in self._reloads:
+            received.append(key)
+
+    async def _load_keys(self) -> List[str]:
+        async with async_session() as db:
+            result = await db.execute(
+                select(RevokedToken.jti).where(RevokedToken.expires_at > datetime.now(pytz.utc))
+            )
+            return list(result.scalars())
+
+    async def reload(self) -> None:
+        """Reconstruye el filtro con los tokens vigentes de la tabla.
+
+        Una revocación que llega por NOTIFY mientras la consulta está en curso puede no
+        estar en su resultado: se guarda aparte y se añade al filtro nuevo antes de usarlo.
+        """
+        received: List[str] = []
+        self._reloads.append(received)
+        try:
+            keys = await self._load_keys()
+        finally:
+            self._reloads.remove(received)
+        self._bloom = self._build_bloom([*keys, *received])
+
+    async def revoke(self, db: AsyncSession, key: str, expires_at: float) -> None:
+        stmt = insert(RevokedToken).values(
+            jti=key, expires_at=datetime.fromtimestamp(expires_at, pytz.utc)
+        ).on_conflict_do_nothing(index_elements=[RevokedToken.jti])
+        await db.execute(stmt)
+        # pg_notify se entrega al confirmar la transacción, a todos los workers
+        await db.execute(text("SELECT pg_notify(:channel, :key)"), {"channel": CHANNEL, "key": key})
+        self._add(key)
+
+    async def _confirm(self, db: AsyncSession, key: str) -> bool:
+        result = await db.execute(
+            select(RevokedToken.jti).where(
+                RevokedToken.jti == key, RevokedToken.expires_at > datetime.now(pytz.utc)
+            )
+        )
+        return result.scalar() is not None
+
+    async def _prune_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.prune_interval)
+            try:
+                async with async_session() as db:
+                    await db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= datetime.now(pytz.utc)))
+                    await db.commit()
+                await self.reload()
+            except Exception as error:
+                print(f"Error purgando tokens revocados: {error}")
+
+    def stats(self) -> dict:
+        return {**super().stats(), "backend": POSTGRES}
+
+
+def _create_store() -> RevocationStore:
+    if settings.REVOCATION_BACKEND == POSTGRES:
+        return PostgresRevocationStore(
+            settings.REVOCATION_BLOOM_CAPACITY,
+            settings.REVOCATION_BLOOM_ERROR_RATE,
+            settings.REVOCATION_PRUNE_INTERVAL,
+        )
+    return MemoryRevocationStore(settings.REVOCATION_BLOOM_CAPACITY, settings.REVOCATION_BLOOM_ERROR_RATE)
+
+
+revocation_store = _create_store()
+metrics.register_source("revocation", revocation_store.stats)
+
+
+async def add_token_to_blacklist(db: AsyncSession, payload: dict, token: str) -> None:
+    await revocation_store.revoke(db, token_key(payload, token), token_expiry(payload))
+
+
+async def is_token_blacklisted(db: AsyncSession, payload: dict, token: str) -> bool:
+    return await revocation_store.is_revoked(db, token_key(payload, token))
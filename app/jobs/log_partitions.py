@@ -0,0 +1,120 @@
+import asyncio
+import re
+from datetime import date, datetime
+from typing import List, Optional
+
+import pytz
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.counters import LOGS, bump, sharded_key
+from app.core.session import async_session
+
+PARENT = "logs"
+
+_NAME = re.compile(r"^logs_p(\d{4})(\d{2})$")
+_LOCK_ID = 727001  # pg_advisory_xact_lock: un solo proceso gestiona particiones a la vez
+
+
+def month_start(value: datetime) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"logs_p{month.year:04d}{month.month:02d}"
+
+
+def partition_bounds(month: date) -> str:
+    """Rango [inicio de mes, inicio del mes siguiente) en UTC."""
+    return f"FROM ('{month.isoformat()} 00:00:00+00') TO ('{add_months(month, 1).isoformat()} 00:00:00+00')"
+
+
+def create_partition_sql(month: date) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} "
+        f"PARTITION OF {PARENT} FOR VALUES {partition_bounds(month)}"
+    )
+
+
+async def list_partitions(db: AsyncSession) -> List[date]:
+    result = await db.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE parent.relname = :parent"
+    ), {"parent": PARENT})
+
+    months = []
+    for name in result.scalars():
+        match = _NAME.match(name)
+        if match:
+            months.append(date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+
+async def _drop_partition(db: AsyncSession, month: date) -> int:
+    name = partition_name(month)
+    rows = (await db.execute(text(f"SELECT count(*) FROM {name}"))).scalar() or 0
+    await db.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {name}"))
+    await db.execute(text(f"DROP TABLE {name}"))
+    await bump(db, LOGS, sharded_key(), -rows)
+    return rows
+
+
+async def maintain_log_partitions(
+    db: AsyncSession,
+    now: Optional[datetime] = None,
+    ahead: int = settings.LOG_PARTITIONS_AHEAD,
+    retention_months: int = settings.LOG_RETENTION_MONTHS,
+) -> dict:
+    """Crea las particiones de los próximos `ahead` meses y elimina las anteriores a la retención.
+
+    No hay partición por defecto: así Postgres puede recorrer las particiones en orden
+    (Append ordenado) y una lectura "más recientes primero" solo toca la última.
+    """
+    current = month_start(now or datetime.now(pytz.utc))
+    await db.execute(text("SELECT pg_advisory_xact_lock(:lock)"), {"lock": _LOCK_ID})
+
+    existing = set(await list_partitions(db))
+    created, dropped, rows_dropped = [], [], 0
+
+    for offset in range(ahead + 1):
+        month = add_months(current, offset)
+        if month not in existing:
+            await db.execute(text(create_partition_sql(month)))
+            created.append(partition_name(month))
+
+    if retention_months > 0:
+        oldest_kept = add_months(current, -retention_months)
+        for month in sorted(existing):
+            if month < oldest_kept:
+                rows_dropped += await _drop_partition(db, month)
+                dropped.append(partition_name(month))
+
+    return {"created": created, "dropped": dropped, "rows_dropped": rows_dropped}
+
+
+async def run_log_partition_maintenance() -> None:
+    async with async_session() as db:
+        summary = await maintain_log_partitions(db)
+        await db.commit()
+    if summary["created"] or summary["dropped"]:
+        print(f"Particiones de logs: {summary}")
+
+
+async def log_partition_loop(interval: float = settings.LOG_PARTITION_CHECK_INTERVAL) -> None:
+    """Tarea de fondo: revisa las particiones al arrancar y luego cada `interval` segundos."""
+    while True:
+        try:
+            await run_log_partition_maintenance()
+        except asyncio.CancelledError:
+            raise
+        except Exception as error:
+            print(f"Error en el mantenimiento de particiones de logs: {error}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,87 @@
+import asyncio
+from typing import List
+
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.metrics import metrics
+from app.core.session import async_session
+from app.models.counter import TaskStat
+from app.models.task import Task
+
+_LOCK_ID = 727002  # pg_try_advisory_xact_lock: una sola reconciliación a la vez entre workers
+
+def _actual_counts():
+    return (
+        select(Task.user_id, Task.status, func.count().label("count"))
+        .where(Task.deleted == False, Task.user_id.is_not(None))
+        .group_by(Task.user_id, Task.status)
+    )
+
+
+async def reconcile_task_stats(db: AsyncSession) -> dict:
+    """Reconstruye task_stats desde `tasks` y devuelve las diferencias que tenía (drift).
+
+    LOCK ... EXCLUSIVE espera a las transacciones que ya aplicaron deltas y frena las
+    nuevas hasta el commit: el recuento no pierde ni duplica ninguna escritura. Las
+    lecturas de task_stats no se bloquean.
+
+    Cada worker ejecuta su propio bucle: si otro proceso ya está reconciliando, no se
+    repite el trabajo ni se espera al LOCK, y se devuelve `skipped`.
+    """
+    acquired = (await db.execute(text("SELECT pg_try_advisory_xact_lock(:lock)"), {"lock": _LOCK_ID})).scalar()
+    if not acquired:
+        return {"skipped": True, "rows": 0, "drift": []}
+    await db.execute(text("LOCK TABLE task_stats IN EXCLUSIVE MODE"))
+
+    actual = _actual_counts().subquery("actual")
+    stored = select(TaskStat).subquery("stored")
+    stored_count = func.coalesce(stored.c.count, 0)
+    actual_count = func.coalesce(actual.c.count, 0)
+    result = await db.execute(
+        select(
+            func.coalesce(actual.c.user_id, stored.c.user_id).label("user_id"),
+            func.coalesce(actual.c.status, stored.c.status).label("status"),
+            stored_count.label("stored"),
+            actual_count.label("actual"),
+        )
+        .select_from(actual.join(
+            stored,
+            (actual.c.user_id == stored.c.user_id) & (actual.c.status == stored.c.status),
+            full=True,
+        ))
+        .where(stored_count != actual_count)
+    )
+    drift: List[dict] = [row._asdict() for row in result]
+
+    await db.execute(delete(TaskStat))
+    inserted = await db.execute(
+        insert(TaskStat).from_select(["user_id", "status", "count"], _actual_counts())
+    )
+    return {"skipped": False, "rows": inserted.rowcount, "drift": drift}
+
+
+async def run_task_stats_reconciliation() -> dict:
+    async with async_session() as db:
+        summary = await reconcile_task_stats(db)
+        await db.commit()
+    if summary["skipped"]:
+        return summary
+    metrics.task_stats_reconciliations += 1
+    if summary["drift"]:
+        metrics.task_stats_drift += len(summary["drift"])
+        print(f"task_stats con diferencias ({len(summary['drift'])}), reconstruida: {summary['drift'][:20]}")
+    return summary
+
+
+async def task_stats_loop(interval: float = settings.TASK_STATS_RECONCILE_INTERVAL) -> None:
+    """Tarea de fondo: reconcilia task_stats cada `interval` segundos (la primera vez tras esperar uno)."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_task_stats_reconciliation()
+        except asyncio.CancelledError:
+            raise
+        except Exception as error:
+            print(f"Error al reconciliar task_stats: {error}")
@@ -1,31 +1,67 @@
-from fastapi import FastAPI
+import asyncio
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, RedirectResponse
 from starlette.middleware.sessions import SessionMiddleware
 
 from app.config import settings
-from app.core.session import async_session, engine
+from app.core.audit import ASYNC, audit_writer
+from app.core.metrics import render_metrics
+from app.core.pagination import InvalidCursor
+from app.core.passwords import HashingBusy, hashing_pool
+from app.core.pg_listener import pg_listener
+from app.core.search_index import InvalidSearch
+from app.core.responses import FastJSONResponse
+from app.core.session import async_session, engine, replica_engine
+from app.core.token_blacklist import revocation_store
+from app.jobs.log_partitions import log_partition_loop
+from app.jobs.task_stats import task_stats_loop
 from app.schemas.user_schema import UserCreate
 from app.services.user_service import get_user_by_email, create_user
 
 from app.api.auth import router as auth_router
 from app.api.user import router as user_router
 from app.api.tasks import router as task_router  
+from app.api.admin import router as admin_router
 
 
 def create_app() -> FastAPI:
     app = FastAPI(
         title=settings.PROJECT_NAME,
         redoc_url=None,
+        default_response_class=FastJSONResponse if settings.FAST_JSON else JSONResponse,
     )
 
     @app.get("/", include_in_schema=False)
     async def root_redirect():
         return RedirectResponse(url="/auth/login")
 
+    if settings.METRICS_ENABLED:
+        @app.get("/metrics", include_in_schema=False)
+        async def metrics_endpoint():
+            return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+    @app.exception_handler(InvalidCursor)
+    async def invalid_cursor_handler(request: Request, exc: InvalidCursor):
+        return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+    @app.exception_handler(InvalidSearch)
+    async def invalid_search_handler(request: Request, exc: InvalidSearch):
+        return JSONResponse(status_code=422, content={"detail": str(exc)})
+
+    @app.exception_handler(HashingBusy)
+    async def hashing_busy_handler(request: Request, exc: HashingBusy):
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Servidor ocupado, inténtalo de nuevo en unos segundos"},
+            headers={"Retry-After": "1"},
+        )
+
     app.include_router(auth_router, prefix="/auth", tags=["Autenticación"])
     app.include_router(user_router, prefix="/users", tags=["Usuarios"])
     app.include_router(task_router, prefix="/tasks", tags=["Tareas"])  
+    app.include_router(admin_router, prefix="/admin", tags=["Administración"])
 
     app.add_middleware(
         CORSMiddleware,
@@ -45,6 +81,13 @@ app = create_app()
 
 @app.on_event("startup")
 async def startup_event():
+    if settings.AUDIT_MODE == ASYNC:
+        audit_writer.start()
+    app.state.log_partition_task = asyncio.create_task(log_partition_loop())
+    app.state.task_stats_task = asyncio.create_task(task_stats_loop())
+    await revocation_store.start()
+    await pg_listener.start()
+
     async with async_session() as db:
         admin_email = "admin@task.com"
         existing_user = await get_user_by_email(db, admin_email)
@@ -56,11 +99,20 @@ async def startup_event():
                 role="Admin",
             )
             await create_user(db, admin_user)
+            await db.commit()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    app.state.log_partition_task.cancel()
+    app.state.task_stats_task.cancel()
+    await pg_listener.stop()
+    await revocation_store.stop()
+    await audit_writer.stop()
+    hashing_pool.shutdown()
     await engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
 
 
 if __name__ == "__main__":
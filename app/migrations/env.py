@@ -10,6 +10,9 @@ from app.core.base import Base
 from app.config import settings
 from app.models.user import User, Log
 from app.models.task import Task
+from app.models.search import SearchToken
+from app.models.counter import RowCounter, TaskStat
+from app.models.revoked_token import RevokedToken
 
 config = context.config
 
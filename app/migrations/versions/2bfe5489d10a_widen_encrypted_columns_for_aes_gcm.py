@@ -0,0 +1,59 @@
+"""Widen encrypted columns for AES-GCM
+
+Revision ID: 2bfe5489d10a
+Revises: fe0ad6100bad
+Create Date: 2026-10-17 15:49:19.288359
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2bfe5489d10a'
+down_revision: Union[str, Sequence[str], None] = 'fe0ad6100bad'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+COLUMNS = [
+    ('users', 'name_complete', False),
+    ('users', 'email', True),
+    ('users', 'password', False),
+    ('users', 'role', False),
+    ('tasks', 'task_name', True),
+    ('tasks', 'status', False),
+    ('logs', 'action', False),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # varchar(200) -> text no reescribe la tabla; el formato AES-GCM ocupa más que 200 caracteres
+    for table, column, nullable in COLUMNS:
+        op.alter_column(table, column, existing_type=sa.String(length=200), type_=sa.Text(), existing_nullable=nullable)
+
+    # Con cifrado no determinista la restricción sobre el texto cifrado ya no detecta duplicados
+    duplicates = op.get_bind().execute(sa.text(
+        "SELECT count(*) FROM (SELECT email_bidx FROM users WHERE email_bidx IS NOT NULL "
+        "GROUP BY email_bidx HAVING count(*) > 1) AS dup"
+    )).scalar()
+    if duplicates:
+        raise RuntimeError(f"{duplicates} emails duplicados (sin distinguir mayúsculas); resuélvelos antes de migrar")
+
+    op.drop_constraint('users_email_key', 'users', type_='unique')
+    op.drop_index('ix_users_email_bidx', table_name='users')
+    op.create_index('ix_users_email_bidx', 'users', ['email_bidx'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_email_bidx', table_name='users')
+    op.create_index('ix_users_email_bidx', 'users', ['email_bidx'], unique=False)
+    op.create_unique_constraint('users_email_key', 'users', ['email'])
+
+    # Solo es reversible si no hay valores en formato AES-GCM (más largos que 200)
+    for table, column, nullable in COLUMNS:
+        op.alter_column(table, column, existing_type=sa.Text(), type_=sa.String(length=200), existing_nullable=nullable)
@@ -0,0 +1,119 @@
+"""Add blind index columns for email, role and status
+
+Revision ID: 4efc49587bc2
+Revises: 05e208ed8191
+Create Date: 2026-10-17 09:12:40.518230
+
+"""
+import hashlib
+import hmac
+import os
+from typing import Optional, Sequence, Tuple, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy_utils import StringEncryptedType
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4efc49587bc2'
+down_revision: Union[str, Sequence[str], None] = '05e208ed8191'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+USER_EMAIL = 'user.email'
+USER_ROLE = 'user.role'
+TASK_STATUS = 'task.status'
+
+
+def _keys() -> Tuple[str, str]:
+    """(DB_SECRET_KEY, BLIND_INDEX_KEY) del entorno (env.py carga app/.env).
+
+    Se leen al ejecutar la migración y no al importarla: alembic importa todas las
+    revisiones, también en `history`, `current` o en modo offline.
+    """
+    key = os.environ['DB_SECRET_KEY']
+    return key, os.getenv('BLIND_INDEX_KEY', key)
+
+
+def blind_index(blind_index_key: str, value: Optional[str], purpose: str) -> Optional[str]:
+    """HMAC-SHA256 del valor normalizado con una clave derivada por columna (como app.core.blind_index hoy)."""
+    if value is None:
+        return None
+    purpose_key = hmac.new(blind_index_key.encode(), f'blind-index:{purpose}'.encode(), hashlib.sha256).digest()
+    return hmac.new(purpose_key, value.strip().lower().encode(), hashlib.sha256).hexdigest()
+
+
+def _tables(key: str):
+    users = sa.table(
+        'users',
+        sa.column('id', sa.String(40)),
+        sa.column('email', StringEncryptedType(sa.String(200), key)),
+        sa.column('role', StringEncryptedType(sa.String(200), key)),
+        sa.column('email_bidx', sa.String(64)),
+        sa.column('role_bidx', sa.String(64)),
+    )
+    tasks = sa.table(
+        'tasks',
+        sa.column('id', sa.String(40)),
+        sa.column('status', StringEncryptedType(sa.String(200), key)),
+        sa.column('status_bidx', sa.String(64)),
+    )
+    return users, tasks
+
+
+def _backfill(table, source_columns, build_values) -> None:
+    """Recorre la tabla por lotes ordenados por id y escribe los digests."""
+    bind = op.get_bind()
+    last_id = ''
+    while True:
+        rows = bind.execute(
+            sa.select(table.c.id, *[table.c[name] for name in source_columns])
+            .where(table.c.id > last_id)
+            .order_by(table.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+
+        bind.execute(
+            table.update().where(table.c.id == sa.bindparam('b_id')),
+            [{'b_id': row.id, **build_values(row)} for row in rows],
+        )
+        last_id = rows[-1].id
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('email_bidx', sa.String(length=64), nullable=True))
+    op.add_column('users', sa.Column('role_bidx', sa.String(length=64), nullable=True))
+    op.add_column('tasks', sa.Column('status_bidx', sa.String(length=64), nullable=True))
+
+    key, blind_index_key = _keys()
+    users, tasks = _tables(key)
+    _backfill(users, ['email', 'role'], lambda row: {
+        'email_bidx': blind_index(blind_index_key, row.email, USER_EMAIL),
+        'role_bidx': blind_index(blind_index_key, row.role, USER_ROLE),
+    })
+    _backfill(tasks, ['status'], lambda row: {
+        'status_bidx': blind_index(blind_index_key, row.status, TASK_STATUS),
+    })
+
+    op.alter_column('tasks', 'status_bidx', nullable=False)
+    op.create_index(op.f('ix_users_email_bidx'), 'users', ['email_bidx'], unique=False)
+    op.create_index(op.f('ix_users_role_bidx'), 'users', ['role_bidx'], unique=False)
+    op.drop_index('ix_tasks_status', table_name='tasks')
+    op.create_index('ix_tasks_status_bidx', 'tasks', ['status_bidx'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_status_bidx', table_name='tasks')
+    op.create_index('ix_tasks_status', 'tasks', ['status'], unique=False)
+    op.drop_index(op.f('ix_users_role_bidx'), table_name='users')
+    op.drop_index(op.f('ix_users_email_bidx'), table_name='users')
+    op.drop_column('tasks', 'status_bidx')
+    op.drop_column('users', 'role_bidx')
+    op.drop_column('users', 'email_bidx')
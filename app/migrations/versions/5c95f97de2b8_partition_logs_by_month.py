@@ -0,0 +1,101 @@
+"""Partition logs by month
+
+Revision ID: 5c95f97de2b8
+Revises: d33b775a5b57
+Create Date: 2026-10-17 13:52:15.130378
+
+"""
+import os
+from typing import Sequence, Union
+
+from datetime import date, datetime
+
+from alembic import op
+import pytz
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c95f97de2b8'
+down_revision: Union[str, Sequence[str], None] = 'd33b775a5b57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LOG_PARTITIONS_AHEAD = int(os.getenv('LOG_PARTITIONS_AHEAD', 3))
+
+
+def month_start(value: datetime) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def create_partition_sql(month: date) -> str:
+    """Partición mensual `logs_pAAAAMM` con el rango [inicio de mes, mes siguiente) en UTC."""
+    return (
+        f"CREATE TABLE IF NOT EXISTS logs_p{month.year:04d}{month.month:02d} PARTITION OF logs "
+        f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{add_months(month, 1).isoformat()} 00:00:00+00')"
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("ALTER TABLE logs RENAME TO logs_old")
+    op.execute("ALTER INDEX logs_pkey RENAME TO logs_old_pkey")
+    op.execute("ALTER INDEX ix_logs_created_id RENAME TO ix_logs_old_created_id")
+
+    op.create_table('logs',
+    sa.Column('id', sa.String(length=40), nullable=False),
+    sa.Column('action', sa.String(length=200), nullable=False),
+    sa.Column('user_id', sa.String(length=40), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id', 'created_at'),
+    postgresql_partition_by='RANGE (created_at)'
+    )
+    # Índice particionado: Postgres crea uno por partición
+    op.create_index('ix_logs_created_id', 'logs', ['created_at', 'id'], unique=False)
+
+    # Sin partición por defecto: tiene que haber una para cada fila existente, también
+    # para las fechadas después de los meses que se crean por adelantado
+    current = month_start(datetime.now(pytz.utc))
+    oldest, newest = op.get_bind().execute(
+        sa.text("SELECT min(created_at), max(created_at) FROM logs_old")
+    ).one()
+    month = min(month_start(oldest), current) if oldest else current
+    last = add_months(current, LOG_PARTITIONS_AHEAD)
+    if newest:
+        last = max(last, month_start(newest))
+    while month <= last:
+        op.execute(create_partition_sql(month))
+        month = add_months(month, 1)
+
+    op.execute(
+        "INSERT INTO logs (id, action, user_id, created_at) "
+        "SELECT id, action, user_id, created_at FROM logs_old"
+    )
+    op.drop_table('logs_old')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_table('logs_plain',
+    sa.Column('id', sa.String(length=40), nullable=False),
+    sa.Column('action', sa.String(length=200), nullable=False),
+    sa.Column('user_id', sa.String(length=40), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id', name='logs_plain_pkey')
+    )
+    op.execute(
+        "INSERT INTO logs_plain (id, action, user_id, created_at) "
+        "SELECT id, action, user_id, created_at FROM logs"
+    )
+    # Borra la tabla particionada junto con todas sus particiones
+    op.drop_table('logs')
+    op.execute("ALTER TABLE logs_plain RENAME TO logs")
+    op.execute("ALTER INDEX logs_plain_pkey RENAME TO logs_pkey")
+    op.create_index('ix_logs_created_id', 'logs', ['created_at', 'id'], unique=False)
@@ -0,0 +1,173 @@
+"""Query-shaped partial indexes and smallint task status
+
+Revision ID: 9655146b77c4
+Revises: 2bfe5489d10a
+Create Date: 2026-10-17 18:05:12.730114
+
+"""
+import base64
+import hashlib
+import hmac
+import os
+from typing import Sequence, Tuple, Union
+
+from alembic import op
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9655146b77c4'
+down_revision: Union[str, Sequence[str], None] = '2bfe5489d10a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+ACTIVE = sa.text('deleted = false')
+
+# Código smallint de cada estado (posición en app.models.task.TaskStatus)
+STATUSES = ('pending', 'in_progress', 'done')
+
+# Índices sin uso por las consultas actuales: texto cifrado (aleatorio), booleano
+# sin selectividad, o prefijos de los índices compuestos nuevos.
+OLD_TASK_INDEXES = [
+    ('ix_tasks_task_name', ['task_name']),
+    ('ix_tasks_created_at', ['created_at']),
+    ('ix_tasks_deleted', ['deleted']),
+    ('ix_tasks_user_id', ['user_id']),
+    ('ix_tasks_user_created_id', ['user_id', 'created_at', 'id']),
+]
+
+
+def _keys() -> Tuple[str, str]:
+    """(DB_SECRET_KEY, BLIND_INDEX_KEY) del entorno (env.py carga app/.env).
+
+    Se leen al ejecutar la migración y no al importarla: alembic importa todas las
+    revisiones, también en `history`, `current` o en modo offline.
+    """
+    key = os.environ['DB_SECRET_KEY']
+    return key, os.getenv('BLIND_INDEX_KEY', key)
+
+
+def status_digest(blind_index_key: str, status: str) -> str:
+    """Índice ciego de `tasks.status_bidx` (HMAC-SHA256 con la clave derivada de 'task.status')."""
+    purpose_key = hmac.new(blind_index_key.encode(), b'blind-index:task.status', hashlib.sha256).digest()
+    return hmac.new(purpose_key, status.strip().lower().encode(), hashlib.sha256).hexdigest()
+
+
+def encrypt(key: str, value: str) -> str:
+    """Formato AES-GCM versionado de las columnas cifradas: 'g1:' + base64(nonce + cifrado)."""
+    gcm_key = hmac.new(key.encode(), b'column-encryption:aes-256-gcm:v1', hashlib.sha256).digest()
+    nonce = os.urandom(12)
+    return 'g1:' + base64.b64encode(nonce + AESGCM(gcm_key).encrypt(nonce, value.encode(), None)).decode()
+
+
+def _create_partial_indexes() -> None:
+    op.create_index(
+        'ix_tasks_user_active_created', 'tasks',
+        ['user_id', sa.text('created_at DESC'), sa.text('id DESC')], postgresql_where=ACTIVE,
+    )
+    op.create_index(
+        'ix_tasks_user_active_status_created', 'tasks',
+        ['user_id', 'status', sa.text('created_at DESC'), sa.text('id DESC')], postgresql_where=ACTIVE,
+    )
+    op.create_index(
+        'ix_tasks_active_created', 'tasks',
+        [sa.text('created_at DESC'), sa.text('id DESC')], postgresql_where=ACTIVE,
+    )
+    op.create_index(
+        'ix_users_active_created', 'users',
+        [sa.text('created_at DESC'), sa.text('id DESC')], postgresql_where=ACTIVE,
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Los índices parciales usan `deleted = false`: un NULL quedaría fuera de todos ellos
+    for table in ('tasks', 'users'):
+        op.execute(sa.text(f'UPDATE {table} SET deleted = false WHERE deleted IS NULL'))
+        op.alter_column(table, 'deleted', existing_type=sa.Boolean(), nullable=False, server_default=sa.false())
+
+    # El estado se traduce por su índice ciego, sin descifrar ninguna fila
+    _, blind_index_key = _keys()
+    codes = {status_digest(blind_index_key, status): code for code, status in enumerate(STATUSES)}
+    bind = op.get_bind()
+    unknown = bind.execute(
+        sa.text('SELECT count(*) FROM tasks WHERE status_bidx NOT IN :digests')
+        .bindparams(sa.bindparam('digests', expanding=True)),
+        {'digests': list(codes)},
+    ).scalar()
+    if unknown:
+        raise RuntimeError(
+            f"{unknown} tareas con un estado fuera de {', '.join(STATUSES)}; corrígelas antes de migrar"
+        )
+
+    op.add_column('tasks', sa.Column('status_code', sa.SmallInteger(), nullable=True))
+    tasks = sa.table('tasks', sa.column('status_bidx', sa.String(64)), sa.column('status_code', sa.SmallInteger()))
+    bind.execute(tasks.update().values(status_code=sa.case(codes, value=tasks.c.status_bidx)))
+
+    op.drop_index('ix_tasks_status_bidx', table_name='tasks')
+    op.drop_column('tasks', 'status_bidx')
+    op.drop_column('tasks', 'status')
+    op.alter_column('tasks', 'status_code', new_column_name='status', nullable=False)
+
+    for name, _ in OLD_TASK_INDEXES:
+        op.drop_index(name, table_name='tasks')
+    op.drop_index('ix_users_created_id', table_name='users')
+    _create_partial_indexes()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_active_created', table_name='users')
+    op.drop_index('ix_tasks_active_created', table_name='tasks')
+    op.drop_index('ix_tasks_user_active_status_created', table_name='tasks')
+    op.drop_index('ix_tasks_user_active_created', table_name='tasks')
+    op.create_index('ix_users_created_id', 'users', ['created_at', 'id'], unique=False)
+    for name, columns in OLD_TASK_INDEXES:
+        op.create_index(name, 'tasks', columns, unique=False)
+
+    op.alter_column('tasks', 'status', new_column_name='status_code')
+    op.add_column('tasks', sa.Column('status', sa.Text(), nullable=True))
+    op.add_column('tasks', sa.Column('status_bidx', sa.String(length=64), nullable=True))
+
+    # Se vuelve a cifrar fila a fila (cada valor con su propio nonce)
+    key, blind_index_key = _keys()
+    tasks = sa.table(
+        'tasks',
+        sa.column('id', sa.String(40)),
+        sa.column('status_code', sa.SmallInteger()),
+        sa.column('status', sa.Text()),
+        sa.column('status_bidx', sa.String(64)),
+    )
+    bind = op.get_bind()
+    last_id = ''
+    while True:
+        rows = bind.execute(
+            sa.select(tasks.c.id, tasks.c.status_code)
+            .where(tasks.c.id > last_id)
+            .order_by(tasks.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        bind.execute(
+            tasks.update().where(tasks.c.id == sa.bindparam('b_id')),
+            [
+                {
+                    'b_id': row.id,
+                    'status': encrypt(key, STATUSES[row.status_code]),
+                    'status_bidx': status_digest(blind_index_key, STATUSES[row.status_code]),
+                }
+                for row in rows
+            ],
+        )
+        last_id = rows[-1].id
+
+    op.drop_column('tasks', 'status_code')
+    op.alter_column('tasks', 'status', nullable=False)
+    op.alter_column('tasks', 'status_bidx', nullable=False)
+    op.create_index('ix_tasks_status_bidx', 'tasks', ['status_bidx'], unique=False)
+
+    for table in ('tasks', 'users'):
+        op.alter_column(table, 'deleted', existing_type=sa.Boolean(), nullable=True, server_default=None)
@@ -0,0 +1,148 @@
+"""Add search_tokens table for encrypted search
+
+Revision ID: aa77a0403c94
+Revises: 4efc49587bc2
+Create Date: 2026-10-17 10:03:51.226714
+
+"""
+import hashlib
+import hmac
+import os
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy_utils import StringEncryptedType
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'aa77a0403c94'
+down_revision: Union[str, Sequence[str], None] = '4efc49587bc2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 500
+
+# Tokens de app.core.search_index en esta revisión: n-gramas de 1 a 3 caracteres y
+# prefijos de hasta 32 del valor normalizado, como HMAC truncado a 32 caracteres.
+TASK = 'task'
+USER = 'user'
+GRAM_SIZES = (1, 2, 3)
+PREFIX_MAX = 32
+MAX_INDEXED_CHARS = 1000
+PREFIX = 'p'
+GRAM = 'g'
+
+def _keys() -> Tuple[str, str]:
+    """(DB_SECRET_KEY, BLIND_INDEX_KEY) del entorno (env.py carga app/.env).
+
+    Se leen al ejecutar la migración y no al importarla: alembic importa todas las
+    revisiones, también en `history`, `current` o en modo offline.
+    """
+    key = os.environ['DB_SECRET_KEY']
+    return key, os.getenv('BLIND_INDEX_KEY', key)
+
+
+def _digest(search_key: bytes, entity: str, field: str, kind: str, text: str) -> str:
+    message = f'{entity}|{field}|{kind}|{text}'.encode()
+    return hmac.new(search_key, message, hashlib.sha256).hexdigest()[:32]
+
+
+def _field_tokens(search_key: bytes, entity: str, field: str, value: Optional[str]) -> set:
+    if not value:
+        return set()
+    text = value.strip().lower()[:MAX_INDEXED_CHARS]
+    tokens = {
+        _digest(search_key, entity, field, GRAM, text[start:start + size])
+        for size in GRAM_SIZES
+        for start in range(len(text) - size + 1)
+    }
+    tokens.update(
+        _digest(search_key, entity, field, PREFIX, text[:length])
+        for length in range(1, min(len(text), PREFIX_MAX) + 1)
+    )
+    return tokens
+
+
+def document_rows(
+    search_key: bytes, entity: str, entity_id: str, owner_id: Optional[str], fields: Dict[str, Optional[str]]
+) -> List[dict]:
+    return [
+        {'token': token, 'entity_id': entity_id, 'entity': entity, 'owner_id': owner_id, 'field': field}
+        for field, value in fields.items()
+        for token in _field_tokens(search_key, entity, field, value)
+    ]
+
+
+def _tables(key: str):
+    users = sa.table(
+        'users',
+        sa.column('id', sa.String(40)),
+        sa.column('name_complete', StringEncryptedType(sa.String(200), key)),
+        sa.column('email', StringEncryptedType(sa.String(200), key)),
+        sa.column('role', StringEncryptedType(sa.String(200), key)),
+    )
+    tasks = sa.table(
+        'tasks',
+        sa.column('id', sa.String(40)),
+        sa.column('user_id', sa.String(40)),
+        sa.column('task_name', StringEncryptedType(sa.String(200), key)),
+        sa.column('description', StringEncryptedType(sa.Text, key)),
+        sa.column('status', StringEncryptedType(sa.String(200), key)),
+    )
+    return users, tasks
+
+
+def _backfill(search_key, search_tokens, table, fields, entity, owner_column=None) -> None:
+    bind = op.get_bind()
+    columns = [table.c[name] for name in fields]
+    if owner_column is not None:
+        columns.append(table.c[owner_column])
+
+    last_id = ''
+    while True:
+        rows = bind.execute(
+            sa.select(table.c.id, *columns)
+            .where(table.c.id > last_id)
+            .order_by(table.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+
+        tokens = []
+        for row in rows:
+            owner_id = getattr(row, owner_column) if owner_column else None
+            values = {name: getattr(row, name) for name in fields}
+            tokens.extend(document_rows(search_key, entity, row.id, owner_id, values))
+        if tokens:
+            bind.execute(search_tokens.insert(), tokens)
+        last_id = rows[-1].id
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    search_tokens = op.create_table('search_tokens',
+    sa.Column('token', sa.String(length=32), nullable=False),
+    sa.Column('entity_id', sa.String(length=40), nullable=False),
+    sa.Column('entity', sa.String(length=10), nullable=False),
+    sa.Column('owner_id', sa.String(length=40), nullable=True),
+    sa.Column('field', sa.String(length=20), nullable=False),
+    sa.PrimaryKeyConstraint('token', 'entity_id')
+    )
+
+    key, blind_index_key = _keys()
+    search_key = hmac.new(blind_index_key.encode(), b'search-index', hashlib.sha256).digest()
+    users, tasks = _tables(key)
+    _backfill(search_key, search_tokens, tasks, ['task_name', 'description', 'status'], TASK, owner_column='user_id')
+    _backfill(search_key, search_tokens, users, ['name_complete', 'email', 'role'], USER)
+
+    op.create_index('ix_search_tokens_lookup', 'search_tokens', ['entity', 'owner_id', 'token'], unique=False)
+    op.create_index('ix_search_tokens_entity_id', 'search_tokens', ['entity_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_search_tokens_entity_id', table_name='search_tokens')
+    op.drop_index('ix_search_tokens_lookup', table_name='search_tokens')
+    op.drop_table('search_tokens')
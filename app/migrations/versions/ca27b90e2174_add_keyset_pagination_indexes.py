@@ -0,0 +1,32 @@
+"""Add composite (created_at, id) indexes for keyset pagination
+
+Revision ID: ca27b90e2174
+Revises: aa77a0403c94
+Create Date: 2026-10-17 11:20:07.481903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ca27b90e2174'
+down_revision: Union[str, Sequence[str], None] = 'aa77a0403c94'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_tasks_user_created_id', 'tasks', ['user_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_users_created_id', 'users', ['created_at', 'id'], unique=False)
+    op.create_index('ix_logs_created_id', 'logs', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_logs_created_id', table_name='logs')
+    op.drop_index('ix_users_created_id', table_name='users')
+    op.drop_index('ix_tasks_user_created_id', table_name='tasks')
@@ -0,0 +1,42 @@
+"""Add row_counters table for O(1) totals
+
+Revision ID: d33b775a5b57
+Revises: ca27b90e2174
+Create Date: 2026-10-17 12:41:19.904532
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd33b775a5b57'
+down_revision: Union[str, Sequence[str], None] = 'ca27b90e2174'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('row_counters',
+    sa.Column('scope', sa.String(length=20), nullable=False),
+    sa.Column('key', sa.String(length=40), nullable=False),
+    sa.Column('value', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('scope', 'key')
+    )
+    op.execute(
+        "INSERT INTO row_counters (scope, key, value) "
+        "SELECT 'tasks', user_id, count(*) FROM tasks "
+        "WHERE deleted = false AND user_id IS NOT NULL GROUP BY user_id"
+    )
+    op.execute(
+        "INSERT INTO row_counters (scope, key, value) "
+        "SELECT 'logs', '*', count(*) FROM logs"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('row_counters')
@@ -0,0 +1,38 @@
+"""Add task_stats table with active tasks per user and status
+
+Revision ID: ed59211329fb
+Revises: 9655146b77c4
+Create Date: 2026-10-17 19:32:48.115207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ed59211329fb'
+down_revision: Union[str, Sequence[str], None] = '9655146b77c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('task_stats',
+    sa.Column('user_id', sa.String(length=40), nullable=False),
+    sa.Column('status', sa.SmallInteger(), nullable=False),
+    sa.Column('count', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('user_id', 'status')
+    )
+    op.execute(
+        "INSERT INTO task_stats (user_id, status, count) "
+        "SELECT user_id, status, count(*) FROM tasks "
+        "WHERE deleted = false AND user_id IS NOT NULL GROUP BY user_id, status"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('task_stats')
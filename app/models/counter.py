@@ -0,0 +1,25 @@
+from sqlalchemy import BigInteger, Column, String
+from app.core.base import Base
+from app.core.enum_column import SmallIntEnum
+from app.models.task import TaskStatus
+
+
+class RowCounter(Base):
+    """Totales mantenidos en la misma transacción que las escrituras."""
+    __tablename__ = "row_counters"
+
+    scope = Column(String(20), primary_key=True)  # tasks, logs
+    key = Column(String(40), primary_key=True)    # user_id o "*" para totales globales
+    value = Column(BigInteger, nullable=False, default=0)
+
+
+class TaskStat(Base):
+    """Tareas activas por usuario y estado, actualizadas con deltas en la transacción de cada escritura.
+
+    app/jobs/task_stats.py las reconstruye desde `tasks` y avisa de las diferencias.
+    """
+    __tablename__ = "task_stats"
+
+    user_id = Column(String(40), primary_key=True)
+    status = Column(SmallIntEnum(TaskStatus), primary_key=True)
+    count = Column(BigInteger, nullable=False, default=0)
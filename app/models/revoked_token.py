@@ -0,0 +1,10 @@
+from sqlalchemy import Column, DateTime, String
+from app.core.base import Base
+
+
+class RevokedToken(Base):
+    """Tokens revocados (logout) compartidos entre workers; se purgan al expirar."""
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String(64), primary_key=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
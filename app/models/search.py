@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Index, String
+from app.core.base import Base
+
+
+class SearchToken(Base):
+    """Tokens HMAC (prefijos y n-gramas) de los campos cifrados buscables."""
+    __tablename__ = "search_tokens"
+
+    token = Column(String(32), primary_key=True)
+    entity_id = Column(String(40), primary_key=True)
+    entity = Column(String(10), nullable=False)   # task, user
+    owner_id = Column(String(40), nullable=True)  # user_id dueño de la tarea
+    field = Column(String(20), nullable=False)
+
+    __table_args__ = (
+        Index("ix_search_tokens_lookup", "entity", "owner_id", "token"),
+        Index("ix_search_tokens_entity_id", "entity_id"),
+    )
@@ -1,29 +1,63 @@
+from enum import Enum
 from nanoid import generate
-from sqlalchemy import Column, Index, String, ForeignKey, Text
+from sqlalchemy import Column, Index, String, ForeignKey, text
 from sqlalchemy.orm import relationship
-from sqlalchemy_utils import StringEncryptedType
 from app.config import settings
 from app.core.base import Base
-from app.utils.mixins import SoftDeleteMixin, TimestampMixin
+from app.core.encryption import EncryptedString
+from app.core.enum_column import SmallIntEnum
+from app.utils.mixins import ACTIVE, SoftDeleteMixin, TimestampMixin
 
 KEY = settings.DB_SECRET_KEY
 
+
+class TaskStatus(str, Enum):
+    # El orden es el código guardado en la BD: los estados nuevos van al final
+    pending = "pending"
+    in_progress = "in_progress"
+    done = "done"
+
+    @classmethod
+    def _missing_(cls, value):
+        # Como con el índice ciego anterior: sin distinguir mayúsculas ni espacios
+        if isinstance(value, str):
+            normalized = value.strip().lower()
+            for member in cls:
+                if member.value == normalized:
+                    return member
+        return None
+
+
+DEFAULT_STATUS = TaskStatus.pending.value
+
 class Task(Base, SoftDeleteMixin, TimestampMixin):
     __tablename__ = "tasks"
 
     id = Column(String(40), primary_key=True, default=generate)
-    task_name = Column(StringEncryptedType(String(200), KEY), index=True)
-    description = Column(StringEncryptedType(Text, KEY), nullable=True)
-    status = Column(StringEncryptedType(String(200), KEY), default="pending", nullable=False)
+    task_name = Column(EncryptedString(KEY))
+    description = Column(EncryptedString(KEY), nullable=True)
+    # Estado en claro como smallint: es un valor de un conjunto fijo, no un dato personal
+    status = Column(SmallIntEnum(TaskStatus), default=DEFAULT_STATUS, nullable=False)
     
     user_id = Column(String(40), ForeignKey(f"users.id"))
-    user = relationship("User", back_populates="tasks", lazy="selectin")
+    user = relationship("User", back_populates="tasks", lazy="raise")
     
+    # Índices con la forma de las consultas: parciales sobre las filas activas y
+    # en el orden de los listados (created_at DESC, id DESC), sin Sort ni filtro posterior.
     __table_args__ = (
-        Index("ix_tasks_user_id", "user_id"),
-        Index("ix_tasks_created_at", "created_at"),
-        Index("ix_tasks_status", "status"),
-        Index("ix_tasks_deleted", "deleted"),
+        Index(
+            "ix_tasks_user_active_created",
+            "user_id", text("created_at DESC"), text("id DESC"),
+            postgresql_where=ACTIVE,
+        ),
+        Index(
+            "ix_tasks_user_active_status_created",
+            "user_id", "status", text("created_at DESC"), text("id DESC"),
+            postgresql_where=ACTIVE,
+        ),
+        Index(
+            "ix_tasks_active_created",
+            text("created_at DESC"), text("id DESC"),
+            postgresql_where=ACTIVE,
+        ),
     )
-    
-    
\ No newline at end of file
@@ -1,10 +1,11 @@
 from nanoid import generate
-from sqlalchemy import Column, String, ForeignKey
+from sqlalchemy import Column, Index, PrimaryKeyConstraint, String, ForeignKey, event, text
 from sqlalchemy.orm import relationship
-from sqlalchemy_utils import StringEncryptedType
 from app.config import settings
 from app.core.base import Base
-from app.utils.mixins import SoftDeleteMixin, TimestampMixin, TimestampLogMixin
+from app.core.encryption import EncryptedString
+from app.core.blind_index import USER_EMAIL, USER_ROLE, blind_index
+from app.utils.mixins import ACTIVE, SoftDeleteMixin, TimestampMixin, TimestampLogMixin
 
 KEY = settings.DB_SECRET_KEY
 
@@ -12,19 +13,45 @@ class User(Base, SoftDeleteMixin, TimestampMixin):
     __tablename__ = "users"
 
     id = Column(String(40), primary_key=True, default=generate)
-    name_complete = Column(StringEncryptedType(String(200), KEY), nullable=False)  
-    email = Column(StringEncryptedType(String(200), KEY), unique=True)  
-    password = Column(StringEncryptedType(String(200), KEY), nullable=False)  
-    role = Column(StringEncryptedType(String(200), KEY), nullable=False)  # Admin, Public
+    name_complete = Column(EncryptedString(KEY), nullable=False)  
+    email = Column(EncryptedString(KEY))  
+    password = Column(EncryptedString(KEY), nullable=False)  
+    role = Column(EncryptedString(KEY), nullable=False)  # Admin, Public
+
+    # Índices ciegos (HMAC) para búsquedas por igualdad sin descifrar.
+    # El cifrado no es determinista: la unicidad del email se garantiza aquí.
+    email_bidx = Column(String(64), index=True, unique=True)
+    role_bidx = Column(String(64), index=True)
     
-    logs = relationship("Log", back_populates="user", lazy="selectin")
-    tasks = relationship("Task", back_populates="user", lazy="selectin")
+    logs = relationship("Log", back_populates="user", lazy="raise")
+    tasks = relationship("Task", back_populates="user", lazy="raise")
+
+    __table_args__ = (
+        Index("ix_users_active_created", text("created_at DESC"), text("id DESC"), postgresql_where=ACTIVE),
+    )
+
+
+@event.listens_for(User.email, "set")
+def _sync_email_bidx(target, value, oldvalue, initiator):
+    target.email_bidx = blind_index(value, USER_EMAIL)
+
+
+@event.listens_for(User.role, "set")
+def _sync_role_bidx(target, value, oldvalue, initiator):
+    target.role_bidx = blind_index(value, USER_ROLE)
     
 
 class Log(Base, TimestampLogMixin):
+    """Particionada por mes sobre created_at (ver app/jobs/log_partitions.py)."""
     __tablename__ = "logs"
 
-    id = Column(String(40), primary_key=True, default=generate)
-    action = Column(StringEncryptedType(String(200), KEY), nullable=False)      
+    id = Column(String(40), nullable=False, default=generate)
+    action = Column(EncryptedString(KEY), nullable=False)      
     user_id = Column(String(40), ForeignKey(f"users.id"))
-    user = relationship("User", back_populates="logs", lazy="selectin")
+    user = relationship("User", back_populates="logs", lazy="raise")
+
+    __table_args__ = (
+        PrimaryKeyConstraint("id", "created_at"),
+        Index("ix_logs_created_id", "created_at", "id"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
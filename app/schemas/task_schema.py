@@ -1,6 +1,8 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
+from app.config import settings
+from app.models.task import TaskStatus
 
 
 class TaskCreate(BaseModel):
@@ -11,7 +13,7 @@ class TaskCreate(BaseModel):
 class TaskUpdate(BaseModel):
     task_name: Optional[str] = None
     description: Optional[str] = None
-    status: Optional[str] = None
+    status: Optional[TaskStatus] = None
 
 
 class TaskResponse(BaseModel):
@@ -27,8 +29,58 @@ class TaskResponse(BaseModel):
         from_attributes = True
 
 
+class TaskStats(BaseModel):
+    pending: int = 0
+    in_progress: int = 0
+    done: int = 0
+    total: int = 0
+
+
 class PaginatedTasks(BaseModel):
-    total: int
+    total: Optional[int]
     limit: int
     offset: int
     tasks: List[TaskResponse]
+    next_cursor: Optional[str] = None
+
+
+class TaskBatchCreate(BaseModel):
+    tasks: List[TaskCreate] = Field(min_length=1, max_length=settings.MAX_BATCH_SIZE)
+
+
+class TaskBatchUpdateItem(TaskUpdate):
+    id: str
+
+
+class TaskBatchUpdate(BaseModel):
+    tasks: List[TaskBatchUpdateItem] = Field(min_length=1, max_length=settings.MAX_BATCH_SIZE)
+
+
+class TaskBatchDelete(BaseModel):
+    ids: List[str] = Field(min_length=1, max_length=settings.MAX_BATCH_SIZE)
+
+
+class TaskBatchItemResult(BaseModel):
+    index: int
+    id: Optional[str] = None
+    ok: bool
+    task: Optional[TaskResponse] = None
+    detail: Optional[str] = None
+
+
+class TaskBatchResponse(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[TaskBatchItemResult]
+
+
+class TaskImportError(BaseModel):
+    line: int
+    detail: str
+
+
+class TaskImportSummary(BaseModel):
+    imported: int = 0
+    failed: int = 0
+    chunks: int = 0
+    errors: List[TaskImportError] = []
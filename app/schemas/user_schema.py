@@ -33,10 +33,11 @@ class UserResponse(UserBase):
         from_attributes = True
 
 class PaginatedUsers(BaseModel):
-    total: int
+    total: Optional[int]
     limit: int
     offset: int
     users: List[UserResponse]
+    next_cursor: Optional[str] = None
     
 class LogOut(BaseModel):
     id: str
@@ -48,10 +49,11 @@ class LogOut(BaseModel):
         from_attributes = True
 
 class PaginatedLogsResponse(BaseModel):
-    total: int
+    total: Optional[int]
     limit: int
     offset: int
     logs: List[LogOut]
+    next_cursor: Optional[str] = None
 
     class Config:
         from_attributes = True
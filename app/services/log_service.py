@@ -0,0 +1,78 @@
+from datetime import datetime
+import pytz
+from typing import List, Optional, Sequence, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import insert, select, tuple_
+from app.config import settings
+from app.core.audit import ASYNC, AuditEntry, audit_writer, defer_audit
+from app.core.counters import LOGS, TotalMode, bump, estimate_count, read_sharded_counter, sharded_key
+from app.core.pagination import decode_cursor
+from app.models.user import Log
+
+
+async def add_log(db: AsyncSession, action: str, user_id: Optional[str]) -> Optional[Log]:
+    created_at = datetime.now(pytz.utc)
+    if settings.AUDIT_MODE == ASYNC and audit_writer.running:
+        # Se inserta por lotes fuera de la petición, solo si la transacción confirma
+        defer_audit(db.sync_session, AuditEntry(action, user_id, created_at))
+        return None
+
+    db_log = Log(
+        action=action,
+        created_at=created_at,
+        user_id=user_id
+    )
+    db.add(db_log)
+    await bump(db, LOGS, sharded_key(), 1)
+    return db_log
+
+
+async def add_logs(db: AsyncSession, actions: Sequence[str], user_id: Optional[str]) -> None:
+    """Registra varias acciones con un solo INSERT multi-fila (operaciones por lotes)."""
+    if not actions:
+        return
+    created_at = datetime.now(pytz.utc)
+    if settings.AUDIT_MODE == ASYNC and audit_writer.running:
+        for action in actions:
+            defer_audit(db.sync_session, AuditEntry(action, user_id, created_at))
+        return
+
+    await db.execute(
+        insert(Log),
+        [{"action": action, "created_at": created_at, "user_id": user_id} for action in actions],
+    )
+    await bump(db, LOGS, sharded_key(), len(actions))
+
+
+async def list_logs(
+    db: AsyncSession,
+    limit: int = settings.DEFAULT_LIMIT,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    total_mode: TotalMode = TotalMode.exact
+) -> Tuple[List[Log], Optional[int]]:
+    query = (
+        select(Log)
+        .order_by(Log.created_at.desc(), Log.id.desc())
+        .limit(limit)
+    )
+    if cursor:
+        position = decode_cursor(cursor)
+        query = query.where(
+            tuple_(Log.created_at, Log.id) < tuple_(position.created_at, position.id),
+            # Redundante, pero permite descartar particiones más recientes que el cursor
+            Log.created_at <= position.created_at,
+        )
+    else:
+        query = query.offset(offset)
+
+    result = await db.execute(query)
+    logs = result.scalars().all()
+
+    total = None
+    if total_mode == TotalMode.exact:
+        total = await read_sharded_counter(db, LOGS)
+    elif total_mode == TotalMode.estimate:
+        total = await estimate_count(db, select(Log.id))
+
+    return logs, total
@@ -1,34 +1,51 @@
+from collections import Counter
 from datetime import datetime
 import pytz
+from nanoid import generate
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_, func
-from typing import List, Optional, Dict, Any, Tuple
+from sqlalchemy import Boolean, String, Text, any_, case, column, insert, literal, select, or_, func, tuple_, type_coerce, update, values
+from sqlalchemy.dialects.postgresql import ARRAY
+from typing import AsyncIterator, Iterable, List, Mapping, Optional, Dict, Any, Sequence, Tuple
 from app.config import settings
-from app.models.task import Task
-from app.models.user import Log
-from app.schemas.task_schema import TaskCreate, TaskUpdate
+from app.core.counters import (
+    TASK_VERSIONS, TASKS, TotalMode, counters_upsert, estimate_count, read_counter, read_task_stats, task_stats_upsert,
+)
+from app.core.encryption import EncryptedString, decrypt_many
+from app.core.loading import with_relations
+from app.core.pagination import decode_cursor, next_page_cursor
+from app.core.task_events import CREATED, DELETED, UPDATED, notify_statement
+from app.core.search_index import (
+    MAX_INDEXED_CHARS, TASK, TASK_SCORING, copy_documents, index_document, index_documents, rank_matches,
+    search_scores, search_term,
+)
+from app.models.task import DEFAULT_STATUS, Task, TaskStatus
+from app.services.log_service import add_log, add_logs
+from app.schemas.task_schema import TaskBatchUpdateItem, TaskCreate, TaskUpdate
 
+UPDATABLE_FIELDS = ("task_name", "description", "status")
+EXPORT_FIELDS = ("id", "task_name", "description", "status", "user_id", "created_at", "updated_at")
 
-async def get_task(db: AsyncSession, task_id: str) -> Optional[Task]:
-    result = await db.execute(
-        select(Task).where(Task.id == task_id, Task.deleted.is_(False))
-    )
+
+async def get_task(db: AsyncSession, task_id: str, load: Sequence[str] = ()) -> Optional[Task]:
+    query = select(Task).where(Task.id == task_id, Task.deleted == False)
+    result = await db.execute(with_relations(query, Task, load))
     return result.scalars().first()
 
 
 async def get_tasks(
     db: AsyncSession,
     offset: int = 0,
-    limit: int = settings.DEFAULT_LIMIT
+    limit: int = settings.DEFAULT_LIMIT,
+    load: Sequence[str] = ()
 ) -> List[Task]:
     query = (
         select(Task)
-        .where(Task.deleted.is_(False))
+        .where(Task.deleted == False)
         .order_by(Task.created_at.desc())
         .offset(offset)
         .limit(limit)
     )
-    result = await db.execute(query)
+    result = await db.execute(with_relations(query, Task, load))
     return result.scalars().unique().all()
 
 
@@ -36,93 +53,354 @@ async def get_tasks_by_user(
     db: AsyncSession, 
     user_id: str, 
     limit: int = settings.DEFAULT_LIMIT,
-    offset: int = 0
-) -> Tuple[List[Task], int]:
-    total_query = select(func.count(Task.id)).where(
-        Task.user_id == user_id, Task.deleted.is_(False)
-    )
-    total = (await db.execute(total_query)).scalar_one()
+    offset: int = 0,
+    load: Sequence[str] = (),
+    status: Optional[TaskStatus] = None,
+    cursor: Optional[str] = None,
+    total_mode: TotalMode = TotalMode.exact
+) -> Tuple[List[Task], Optional[int]]:
+    conditions = [Task.user_id == user_id, Task.deleted == False]
+    if status is not None:
+        conditions.append(Task.status == status)
+
+    total = None
+    if total_mode == TotalMode.exact:
+        if status is None:
+            total = await read_counter(db, TASKS, user_id)
+        else:
+            total = (await read_task_stats(db, user_id))[TaskStatus(status).value]
+    elif total_mode == TotalMode.estimate:
+        total = await estimate_count(db, select(Task.id).where(*conditions))
 
     query = (
         select(Task)
-        .where(Task.user_id == user_id, Task.deleted.is_(False))
-        .offset(offset)
+        .where(*conditions)
+        .order_by(Task.created_at.desc(), Task.id.desc())
         .limit(limit)
     )
-    result = await db.execute(query)
+    if cursor:
+        position = decode_cursor(cursor)
+        query = query.where(tuple_(Task.created_at, Task.id) < tuple_(position.created_at, position.id))
+    else:
+        query = query.offset(offset)
+
+    result = await db.execute(with_relations(query, Task, load))
     tasks = result.scalars().unique().all()
 
     return tasks, total
 
 
+async def stream_user_tasks(
+    db: AsyncSession, user_id: str, batch_size: int = settings.EXPORT_BATCH_SIZE
+) -> AsyncIterator[List[tuple]]:
+    """Tareas del usuario (EXPORT_FIELDS) en bloques de `batch_size` leídos con un cursor del servidor.
+
+    Las columnas cifradas se leen sin procesar y se descifran por bloque con decrypt_many.
+    """
+    columns = []
+    encrypted = {}
+    for index, field in enumerate(EXPORT_FIELDS):
+        attribute = getattr(Task, field)
+        if isinstance(attribute.type, EncryptedString):
+            encrypted[index] = attribute.type.key
+            attribute = type_coerce(attribute, Text)
+        columns.append(attribute)
+
+    query = (
+        select(*columns)
+        .where(Task.user_id == user_id, Task.deleted == False)
+        .order_by(Task.created_at.desc(), Task.id.desc())
+        .execution_options(yield_per=batch_size)
+    )
+    result = await db.stream(query)
+    async for partition in result.partitions():
+        values_by_column = [list(values) for values in zip(*partition)]
+        for index, key in encrypted.items():
+            values_by_column[index] = decrypt_many(values_by_column[index], key)
+        yield list(zip(*values_by_column))
+
+
+async def search_tasks(
+    db: AsyncSession,
+    user_id: str,
+    search: Optional[str] = None,
+    limit: int = settings.DEFAULT_LIMIT,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    total_mode: TotalMode = TotalMode.exact
+) -> Tuple[List[Task], Optional[int], Optional[str]]:
+    term = search_term(search)
+    if term is None:
+        tasks, total = await get_tasks_by_user(
+            db, user_id, limit=limit, offset=offset, cursor=cursor, total_mode=total_mode
+        )
+        return tasks, total, next_page_cursor(tasks, limit)
+
+    # Candidatos: los que el índice puntúa y los de campos más largos que la parte indexada
+    # (se miden por el texto cifrado, que nunca es más corto que el claro). Se descifran y
+    # se verifican todos para que el orden, el total y el cursor sean los de la búsqueda real.
+    scores = search_scores(TASK, term, TASK_SCORING, owner_id=user_id)
+    query = select(Task).where(
+        Task.user_id == user_id,
+        Task.deleted == False,
+        or_(
+            Task.id.in_(select(scores.c.entity_id).where(scores.c.score > 0)),
+            func.length(Task.task_name) > MAX_INDEXED_CHARS,
+            func.length(Task.description) > MAX_INDEXED_CHARS,
+        ),
+    )
+    candidates = (await db.execute(query)).scalars().all()
+    tasks, total, next_cursor = rank_matches(
+        candidates, term, TASK_SCORING, _search_fields, limit=limit, offset=offset, cursor=cursor
+    )
+    return tasks, (total if total_mode != TotalMode.none else None), next_cursor
+
+
+async def _index_task(db: AsyncSession, tarea: Task, created: bool = False) -> None:
+    await index_document(
+        db,
+        TASK,
+        tarea.id,
+        _search_fields(tarea),
+        owner_id=tarea.user_id,
+        created=created,
+    )
+
+
+def _search_fields(tarea: Task) -> Dict[str, Optional[str]]:
+    return {"task_name": tarea.task_name, "description": tarea.description, "status": tarea.status}
+
+
+def _ids_param(task_ids: Sequence[str]):
+    return any_(literal(list(task_ids), ARRAY(String)))
+
+
+async def _touch_tasks(
+    db: AsyncSession,
+    user_id: str,
+    event: str,
+    task_ids: Sequence[str],
+    status_deltas: Optional[Mapping[str, int]] = None,
+) -> None:
+    """Registra un cambio en las tareas del usuario: sube su versión (ETag de listados),
+    aplica los deltas por estado y notifica `event` a los suscriptores de /tasks/stream.
+
+    El contador total cambia en la suma de los deltas. Todo va en una sola sentencia:
+    los upserts de row_counters y task_stats como CTE y el pg_notify como consulta principal.
+    """
+    status_deltas = status_deltas or {}
+    statements = [
+        stmt for stmt in (
+            counters_upsert([(TASKS, user_id, sum(status_deltas.values())), (TASK_VERSIONS, user_id, 1)]),
+            task_stats_upsert(user_id, status_deltas),
+            notify_statement(event, user_id, task_ids),
+        )
+        if stmt is not None
+    ]
+    stmt = statements[-1]
+    if len(statements) > 1:
+        stmt = stmt.add_cte(*(previous.cte(f"change_{index}") for index, previous in enumerate(statements[:-1])))
+    await db.execute(stmt)
+
+
+def _status_changes(changes: Iterable[Tuple[Optional[str], Optional[str]]]) -> Counter:
+    """Deltas por estado a partir de pares (estado anterior, estado nuevo); None = sin tarea activa."""
+    deltas = Counter()
+    for previous, current in changes:
+        if previous != current:
+            if previous is not None:
+                deltas[previous] -= 1
+            if current is not None:
+                deltas[current] += 1
+    return deltas
+
+
+async def get_tasks_version(db: AsyncSession, user_id: str) -> int:
+    return await read_counter(db, TASK_VERSIONS, user_id)
+
+
+async def get_task_stats(db: AsyncSession, user_id: str) -> Dict[str, int]:
+    return await read_task_stats(db, user_id)
+
+
+async def get_task_stamp(db: AsyncSession, task_id: str):
+    """(user_id, updated_at) de una tarea activa, sin cargar ni descifrar la fila."""
+    result = await db.execute(
+        select(Task.user_id, Task.updated_at).where(Task.id == task_id, Task.deleted == False)
+    )
+    return result.first()
+
+
+def _owned(task_id: str, user_id: str, deleted: bool = False):
+    """Condición de las escrituras de una tarea: el dueño va en el WHERE, no en una lectura previa."""
+    return (Task.id == task_id, Task.user_id == user_id, Task.deleted == deleted)
+
+
 async def create_task(db: AsyncSession, task: TaskCreate, user_id: str) -> Task:
-    task_data = task.dict(exclude_unset=True)
-    tarea = Task(**task_data, user_id=user_id)
-
-    db.add(tarea)
-    db.add(Log(
-        action=f"Tarea '{tarea.task_name}' fue creada.",
-        created_at=datetime.now(pytz.utc),
-        user_id=user_id
-    ))
-
-    await db.commit()
-    await db.refresh(tarea)
+    stmt = insert(Task).values(**task.dict(exclude_unset=True), user_id=user_id).returning(Task)
+    tarea = await db.scalar(stmt)
+
+    await _index_task(db, tarea, created=True)
+    await _touch_tasks(db, user_id, CREATED, [tarea.id], {tarea.status: 1})
+    await add_log(db, f"Tarea '{tarea.task_name}' fue creada.", user_id)
     return tarea
 
 
 async def update_task(db: AsyncSession, task_id: str, task_data: TaskUpdate, user_id: str) -> Optional[Task]:
-    tarea = await get_task(db, task_id)
-    if not tarea:
+    """UPDATE ... RETURNING sobre una tarea activa de `user_id`; None si no existe o no es suya.
+
+    El estado anterior sale de la misma sentencia (subconsulta FOR UPDATE), para el delta de task_stats.
+    """
+    data = task_data.dict(exclude_unset=True)
+    previous = select(Task.id, Task.status).where(*_owned(task_id, user_id)).with_for_update().subquery("previous")
+    stmt = (
+        update(Task)
+        .where(Task.id == previous.c.id)
+        .values(data)
+        .returning(Task, previous.c.status)
+        .execution_options(synchronize_session=False)
+    )
+    row = (await db.execute(stmt)).first()
+    if not row:
         return None
+    tarea = row.Task
 
-    for field, value in task_data.dict(exclude_unset=True).items():
-        setattr(tarea, field, value)
+    await _index_task(db, tarea)
+    await _touch_tasks(db, user_id, UPDATED, [tarea.id], _status_changes([(row.status, tarea.status)]))
+    await add_log(db, f"Tarea '{tarea.task_name}' fue actualizada.", user_id)
+    return tarea
 
-    db.add(Log(
-        action=f"Tarea '{tarea.task_name}' fue actualizada.",
-        created_at=datetime.now(pytz.utc),
-        user_id=user_id
-    ))
 
-    await db.commit()
-    await db.refresh(tarea)
-    return tarea
+async def _set_deleted(db: AsyncSession, task_id: str, user_id: str, deleted: bool):
+    stmt = (
+        update(Task)
+        .where(*_owned(task_id, user_id, deleted=not deleted))
+        .values(deleted=deleted)
+        .returning(Task.task_name, Task.status)
+        .execution_options(synchronize_session=False)
+    )
+    return (await db.execute(stmt)).first()
 
 
 async def deactivate_task(db: AsyncSession, task_id: str, user_id: str) -> bool:
-    tarea = await get_task(db, task_id)
-    if not tarea:
+    row = await _set_deleted(db, task_id, user_id, True)
+    if not row:
         return False
 
-    tarea.deleted = True
-    db.add(Log(
-        action=f"Tarea '{tarea.task_name}' fue deshabilitada.",
-        created_at=datetime.now(pytz.utc),
-        user_id=user_id
-    ))
-
-    await db.commit()
-    await db.refresh(tarea)
+    await _touch_tasks(db, user_id, DELETED, [task_id], {row.status: -1})
+    await add_log(db, f"Tarea '{row.task_name}' fue deshabilitada.", user_id)
     return True
 
 async def activate_task(db: AsyncSession, task_id: str, user_id: str) -> bool:
-    tarea = await get_task(db, task_id)
-    if not tarea or tarea.deleted is False:  
+    row = await _set_deleted(db, task_id, user_id, False)
+    if not row:
         return False
-    
-    tarea.deleted = False
 
-    db_log = Log(
-        action=f"Tarea '{tarea.task_name}' fue habilitada.",
-        created_at=datetime.now(pytz.utc),
-        user_id=user_id
+    # Para los listados del cliente, una tarea reactivada vuelve a aparecer
+    await _touch_tasks(db, user_id, CREATED, [task_id], {row.status: 1})
+    await add_log(db, f"Tarea '{row.task_name}' fue habilitada.", user_id)
+    return True
+
+
+async def create_tasks(db: AsyncSession, tasks: Sequence[TaskCreate], user_id: str) -> List[Task]:
+    """Alta por lotes: un INSERT multi-fila con RETURNING, en el mismo orden de entrada."""
+    rows = [{**task.dict(), "user_id": user_id} for task in tasks]
+    result = await db.scalars(insert(Task).returning(Task, sort_by_parameter_order=True), rows)
+    tareas = result.all()
+
+    await index_documents(db, TASK, [(tarea.id, user_id, _search_fields(tarea)) for tarea in tareas], created=True)
+    await _touch_tasks(db, user_id, CREATED, [tarea.id for tarea in tareas], Counter(tarea.status for tarea in tareas))
+    await add_logs(db, [f"Tarea '{tarea.task_name}' fue creada." for tarea in tareas], user_id)
+    return tareas
+
+
+async def import_tasks(db: AsyncSession, tasks: Sequence[TaskCreate], user_id: str) -> int:
+    """Bloque de una importación masiva: INSERT multi-fila sin RETURNING, tokens con COPY y un único log."""
+    rows = [{**task.dict(), "id": generate(), "user_id": user_id} for task in tasks]
+    await db.execute(insert(Task), rows)
+
+    # Ids recién generados: no hay tokens previos que borrar
+    await copy_documents(db, TASK, [
+        (row["id"], user_id, {"task_name": row["task_name"], "description": row["description"], "status": DEFAULT_STATUS})
+        for row in rows
+    ])
+    await _touch_tasks(db, user_id, CREATED, [row["id"] for row in rows], {DEFAULT_STATUS: len(rows)})
+    await add_log(db, f"{len(rows)} tareas importadas.", user_id)
+    return len(rows)
+
+async def update_tasks(db: AsyncSession, items: Sequence[TaskBatchUpdateItem], user_id: str) -> Dict[str, Task]:
+    """Actualización por lotes en un solo UPDATE ... FROM (VALUES ...) filtrado por dueño.
+
+    Cada fila de VALUES lleva, por campo, un indicador de si viene en la petición,
+    así un campo omitido conserva su valor y uno enviado como null se limpia.
+    """
+    if not items:
+        return {}
+
+    changes_columns = [column("id", String)]
+    for field in UPDATABLE_FIELDS:
+        changes_columns.append(column(f"set_{field}", Boolean))
+        changes_columns.append(column(field, Task.__table__.c[field].type))
+
+    rows = []
+    for item in items:
+        data = item.dict(exclude_unset=True)
+        row = [item.id]
+        for field in UPDATABLE_FIELDS:
+            row.extend([field in data, data.get(field)])
+        rows.append(tuple(row))
+    changes = values(*changes_columns, name="changes").data(rows)
+
+    assignments = {
+        field: case((changes.c[f"set_{field}"], changes.c[field]), else_=getattr(Task, field))
+        for field in UPDATABLE_FIELDS
+    }
+    # Estados anteriores para task_stats; las filas se bloquean en orden de id (sin interbloqueos entre lotes)
+    previous = (
+        select(Task.id, Task.status)
+        .where(Task.id == _ids_param([item.id for item in items]), Task.user_id == user_id, Task.deleted == False)
+        .order_by(Task.id)
+        .with_for_update()
+        .subquery("previous")
     )
-    db.add(db_log)
 
-    await db.commit()
-    await db.refresh(tarea)
-    await db.refresh(db_log)
+    stmt = (
+        update(Task)
+        .where(Task.id == changes.c.id, Task.id == previous.c.id)
+        .values(assignments)
+        .returning(Task, previous.c.status)
+        .execution_options(synchronize_session=False)
+    )
+    rows = (await db.execute(stmt)).all()
+    tareas = [row.Task for row in rows]
 
-    return True
+    await index_documents(db, TASK, [(tarea.id, user_id, _search_fields(tarea)) for tarea in tareas])
+    if tareas:
+        await _touch_tasks(
+            db, user_id, UPDATED, [tarea.id for tarea in tareas],
+            _status_changes((row.status, row.Task.status) for row in rows),
+        )
+    await add_logs(db, [f"Tarea '{tarea.task_name}' fue actualizada." for tarea in tareas], user_id)
+    return {tarea.id: tarea for tarea in tareas}
+
+
+async def deactivate_tasks(db: AsyncSession, task_ids: Sequence[str], user_id: str) -> List[str]:
+    """Baja lógica por lotes; devuelve los ids que realmente se deshabilitaron."""
+    if not task_ids:
+        return []
+
+    stmt = (
+        update(Task)
+        .where(Task.id == _ids_param(task_ids), Task.user_id == user_id, Task.deleted == False)
+        .values(deleted=True)
+        .returning(Task.id, Task.task_name, Task.status)
+        .execution_options(synchronize_session=False)
+    )
+    rows = (await db.execute(stmt)).all()
 
+    if rows:
+        await _touch_tasks(
+            db, user_id, DELETED, [row.id for row in rows], _status_changes((row.status, None) for row in rows)
+        )
+    await add_logs(db, [f"Tarea '{row.task_name}' fue deshabilitada." for row in rows], user_id)
+    return [row.id for row in rows]
@@ -1,136 +1,226 @@
 from datetime import datetime
 import pytz
-from typing import List, Optional
+from typing import List, Optional, Sequence, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import or_, func
+from sqlalchemy import insert, or_, func, tuple_, update
 from app.config import settings
-from app.models.user import User, Log
+from app.core.blind_index import USER_EMAIL, USER_ROLE, blind_index
+from app.core.counters import GLOBAL_KEY, USER_VERSIONS, TotalMode, bump, estimate_count, read_counter
+from app.core.loading import with_relations
+from app.core.pagination import decode_cursor, next_page_cursor
+from app.core.passwords import hash_password
+from app.core.principal_cache import invalidate_on_commit
+from app.core.search_index import (
+    MAX_INDEXED_CHARS, USER, USER_SCORING, index_document, rank_matches, search_scores, search_term,
+)
+from app.models.user import User
+from app.services.log_service import add_log
 from app.schemas.user_schema import PaginatedUsers, UserCreate, UserResponse, UserUpdate
 
 
-async def get_user(db: AsyncSession, user_id: str) -> User:    
-    result = await db.execute(select(User).where(User.id == user_id, User.deleted == False))
+async def get_user(db: AsyncSession, user_id: str, load: Sequence[str] = ()) -> User:    
+    query = select(User).where(User.id == user_id, User.deleted == False)
+    result = await db.execute(with_relations(query, User, load))
     usuario = result.scalars().first()      
     return usuario
 
-async def get_user_by_email(db: AsyncSession, email: str) -> User:
-    result = await db.execute(select(User).where(User.email == email, User.deleted == False))
+async def get_user_stamp(db: AsyncSession, user_id: str):
+    """updated_at de un usuario activo, sin cargar ni descifrar la fila."""
+    result = await db.execute(select(User.updated_at).where(User.id == user_id, User.deleted == False))
+    return result.scalar()
+
+async def get_users_version(db: AsyncSession) -> int:
+    return await read_counter(db, USER_VERSIONS, GLOBAL_KEY)
+
+async def _touch_users(db: AsyncSession) -> None:
+    """Cambia la versión global de usuarios (ETag de los listados de administración)."""
+    await bump(db, USER_VERSIONS, GLOBAL_KEY, 1)
+
+async def get_user_by_email(db: AsyncSession, email: str, load: Sequence[str] = ()) -> User:
+    query = select(User).where(User.email_bidx == blind_index(email, USER_EMAIL), User.deleted == False)
+    result = await db.execute(with_relations(query, User, load))
     usuario = result.scalars().first()        
     return usuario
 
 async def get_users(
     db: AsyncSession,
     offset: int = 0,
-    limit: int = settings.DEFAULT_LIMIT
+    limit: int = settings.DEFAULT_LIMIT,
+    load: Sequence[str] = (),
+    cursor: Optional[str] = None
 ) -> List[User]:
     query = (
         select(User)
-        .where(User.deleted.is_(False))
-        .order_by(User.created_at.desc())
-        .offset(offset)
+        .where(User.deleted == False)
+        .order_by(User.created_at.desc(), User.id.desc())
         .limit(limit)
     )
-    result = await db.execute(query)
+    if cursor:
+        position = decode_cursor(cursor)
+        query = query.where(tuple_(User.created_at, User.id) < tuple_(position.created_at, position.id))
+    else:
+        query = query.offset(offset)
+
+    result = await db.execute(with_relations(query, User, load))
     return result.scalars().unique().all()
 
-async def get_users_by_role(db: AsyncSession) -> List[User]:
+async def search_users(
+    db: AsyncSession,
+    search: Optional[str] = None,
+    limit: int = settings.DEFAULT_LIMIT,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    total_mode: TotalMode = TotalMode.exact
+) -> Tuple[List[User], Optional[int], Optional[str]]:
+    term = search_term(search)
+    if term is None:
+        total = None
+        if total_mode == TotalMode.exact:
+            total = (await db.execute(select(func.count(User.id)).where(User.deleted == False))).scalar_one()
+        elif total_mode == TotalMode.estimate:
+            total = await estimate_count(db, select(User.id).where(User.deleted == False))
+        users = await get_users(db, offset=offset, limit=limit, cursor=cursor)
+        return users, total, next_page_cursor(users, limit)
+
+    # Como en search_tasks: el índice da candidatos y se verifican descifrados
+    scores = search_scores(USER, term, USER_SCORING)
+    query = select(User).where(
+        User.deleted == False,
+        or_(
+            User.id.in_(select(scores.c.entity_id).where(scores.c.score > 0)),
+            func.length(User.name_complete) > MAX_INDEXED_CHARS,
+            func.length(User.email) > MAX_INDEXED_CHARS,
+        ),
+    )
+    candidates = (await db.execute(query)).scalars().all()
+    users, total, next_cursor = rank_matches(
+        candidates, term, USER_SCORING, _search_fields, limit=limit, offset=offset, cursor=cursor
+    )
+    return users, (total if total_mode != TotalMode.none else None), next_cursor
+
+def _search_fields(usuario: User) -> dict:
+    return {"name_complete": usuario.name_complete, "email": usuario.email, "role": usuario.role}
+
+async def _index_user(db: AsyncSession, usuario: User, created: bool = False) -> None:
+    await index_document(
+        db,
+        USER,
+        usuario.id,
+        _search_fields(usuario),
+        created=created,
+    )
+
+async def get_users_by_role(db: AsyncSession, load: Sequence[str] = ()) -> List[User]:
     query = (
     select(User)
     .where(        
-        User.role.in_(["Admin", "Public"]),
-        User.deleted.is_(False)
+        User.role_bidx.in_([blind_index(role, USER_ROLE) for role in ("Admin", "Public")]),
+        User.deleted == False
     )
 )
-    result = await db.execute(query)        
+    result = await db.execute(with_relations(query, User, load))        
     usuarios = result.scalars().all()  
     return usuarios  
 
-async def get_user_deactivate(db: AsyncSession, user_id: str) -> User:    
-    result = await db.execute(select(User).where(User.id == user_id, User.deleted == True))
+async def get_user_deactivate(db: AsyncSession, user_id: str, load: Sequence[str] = ()) -> User:    
+    query = select(User).where(User.id == user_id, User.deleted == True)
+    result = await db.execute(with_relations(query, User, load))
     usuario = result.scalars().first()      
     return usuario
 
-async def create_user(db: AsyncSession, usuario: UserCreate) -> User:
-    user_data = usuario.dict(exclude_unset=True)
-    usuario = User(**user_data)
+def _with_blind_indexes(data: dict) -> dict:
+    # Las sentencias INSERT/UPDATE no disparan los eventos `set` del modelo
+    if "email" in data:
+        data["email_bidx"] = blind_index(data["email"], USER_EMAIL)
+    if "role" in data:
+        data["role_bidx"] = blind_index(data["role"], USER_ROLE)
+    return data
 
-    db.add(usuario)
+async def _prepare(data: dict) -> dict:
+    # Nunca se guarda la contraseña en claro: se hashea (argon2id, fuera del bucle de eventos)
+    if data.get("password") is not None:
+        data["password"] = await hash_password(data["password"])
+    return _with_blind_indexes(data)
 
-    db_log = Log(
-        action=f"Usuario '{usuario.name_complete}' fue creado.",
-        created_at=datetime.now(pytz.utc),
-        user_id=usuario.id
-    )
-    db.add(db_log)
+async def create_user(db: AsyncSession, usuario: UserCreate) -> User:
+    stmt = insert(User).values(await _prepare(usuario.dict(exclude_unset=True))).returning(User)
+    usuario = await db.scalar(stmt)
 
-    await db.commit()
-    await db.refresh(usuario)
-    await db.refresh(db_log)
+    await _index_user(db, usuario, created=True)
+    await _touch_users(db)
+
+    await add_log(db, f"Usuario '{usuario.name_complete}' fue creado.", usuario.id)
 
     return usuario
 
 async def update_user(db: AsyncSession, user_id: str, usuario_data: UserUpdate) -> Optional[User]:
-    usuario = await get_user(db, user_id)
+    """UPDATE ... RETURNING sobre un usuario activo; None si no existe."""
+    stmt = (
+        update(User)
+        .where(User.id == user_id, User.deleted == False)
+        .values(await _prepare(usuario_data.dict(exclude_unset=True)))
+        .returning(User)
+        .execution_options(synchronize_session=False)
+    )
+    usuario = await db.scalar(stmt)
     if not usuario:
         return None
 
-    for field, value in usuario_data.dict(exclude_unset=True).items():
-        setattr(usuario, field, value)
+    await _index_user(db, usuario)
+    await _touch_users(db)
 
-    db_log = Log(
-        action=f"Usuario '{usuario.name_complete}' fue actualizado.",
-        created_at=datetime.now(pytz.utc),
-        user_id=usuario.id
-    )
-    db.add(db_log)
+    await add_log(db, f"Usuario '{usuario.name_complete}' fue actualizado.", usuario.id)
 
-    await db.commit()
-    await db.refresh(usuario)
-    await db.refresh(db_log)
+    invalidate_on_commit(db.sync_session, usuario.id)
 
     return usuario
 
+async def set_password_hash(db: AsyncSession, user_id: str, password_hash: str) -> None:
+    """Guarda un hash ya calculado (migración desde texto plano o rehash por cambio de coste)."""
+    await db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(password=password_hash)
+        .execution_options(synchronize_session=False)
+    )
+    # El UPDATE cambia updated_at, que sale en los listados: su ETag tiene que cambiar
+    await _touch_users(db)
+    invalidate_on_commit(db.sync_session, user_id)
+
+async def _set_deleted(db: AsyncSession, user_id: str, deleted: bool):
+    stmt = (
+        update(User)
+        .where(User.id == user_id, User.deleted == (not deleted))
+        .values(deleted=deleted)
+        .returning(User.id, User.name_complete)
+        .execution_options(synchronize_session=False)
+    )
+    return (await db.execute(stmt)).first()
+
 async def deactivate_user(db: AsyncSession, user_id: str) -> bool:
-    usuario = await get_user(db, user_id)
-    if not usuario:
+    row = await _set_deleted(db, user_id, True)
+    if not row:
         return False
 
-    usuario.deleted = True
+    await _touch_users(db)
 
-    db_log = Log(
-        action=f"Usuario '{usuario.name_complete}' fue deshabilitado.",
-        created_at=datetime.now(pytz.utc),
-        user_id=usuario.id
-    )
-    db.add(db_log)
+    await add_log(db, f"Usuario '{row.name_complete}' fue deshabilitado.", row.id)
 
-    await db.commit()
-    await db.refresh(usuario)
-    await db.refresh(db_log)
+    invalidate_on_commit(db.sync_session, row.id)
 
     return True
 
 
 async def activate_user(db: AsyncSession, user_id: str) -> bool:
-    usuario = await get_user_deactivate(db, user_id)
-    if not usuario:
+    row = await _set_deleted(db, user_id, False)
+    if not row:
         return False
 
-    usuario.deleted = False
+    await _touch_users(db)
 
-    db_log = Log(
-        action=f"Usuario '{usuario.name_complete}' fue habilitado.",
-        created_at=datetime.now(pytz.utc),
-        user_id=usuario.id
-    )
-    db.add(db_log)
+    await add_log(db, f"Usuario '{row.name_complete}' fue habilitado.", row.id)
 
-    await db.commit()
-    await db.refresh(usuario)
-    await db.refresh(db_log)
+    invalidate_on_commit(db.sync_session, row.id)
 
     return True
-
-
-
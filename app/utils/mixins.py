@@ -1,24 +1,30 @@
 from datetime import datetime
 import pytz
-from sqlalchemy import Column, Boolean, DateTime, select
+from sqlalchemy import Column, Boolean, DateTime, false, text, update
 from sqlalchemy.ext.declarative import declared_attr
 from sqlalchemy.orm import Query
 
+# Predicado de los índices parciales sobre filas activas. Las consultas deben filtrar
+# con `deleted == False` (no `.is_(False)`): Postgres no deduce el índice a partir de IS FALSE.
+ACTIVE = text("deleted = false")
+
 class SoftDeleteMixin:   
     @declared_attr
     def deleted(cls):       
-        return Column(Boolean, default=False)
+        return Column(Boolean, default=False, server_default=false(), nullable=False)
 
     @classmethod
     async def soft_delete(cls, db, id: str) -> bool:
-        query = select(cls).where(cls.id == id, cls.deleted == False)
-        result = await db.execute(query)
-        instance = result.scalars().first()
-        if instance:
-            instance.deleted = True
-            await db.commit()
-            return True
-        return False
+        # Un solo UPDATE; confirma quien abrió la sesión (get_db)
+        stmt = (
+            update(cls)
+            .where(cls.id == id, cls.deleted == False)
+            .values(deleted=True)
+            .returning(cls.id)
+            .execution_options(synchronize_session=False)
+        )
+        result = await db.execute(stmt)
+        return result.first() is not None
 
     @classmethod
     def filter_deleted(cls, query: Query) -> Query:
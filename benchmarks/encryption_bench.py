@@ -0,0 +1,71 @@
+"""Micro-benchmark del cifrado de columnas: filas/s de StringEncryptedType frente a EncryptedString.
+
+Uso (desde la raíz del repositorio, con app/.env configurado):
+    python -m benchmarks.encryption_bench --rows 20000 --columns 4
+"""
+import argparse
+import time
+
+from sqlalchemy import String
+from sqlalchemy.dialects import postgresql
+from sqlalchemy_utils import StringEncryptedType
+
+from app.config import settings
+from app.core.encryption import GCM, LEGACY, EncryptedString, decrypt_many
+
+DIALECT = postgresql.dialect()
+
+
+def _rate(rows: int, seconds: float) -> str:
+    return f"{rows / seconds:>12,.0f} filas/s"
+
+
+def _time(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def run(rows: int, columns: int, length: int) -> None:
+    key = settings.DB_SECRET_KEY
+    values = [f"valor {index:06d} ".ljust(length, "x") for index in range(rows)]
+
+    current = StringEncryptedType(String(200), key)
+    legacy_new = EncryptedString(key, fmt=LEGACY)
+    gcm_new = EncryptedString(key, fmt=GCM)
+
+    def encrypt_with(type_):
+        return [type_.process_bind_param(value, DIALECT) for value in values]
+
+    legacy_cipher = encrypt_with(current)
+    gcm_cipher = encrypt_with(gcm_new)
+    assert encrypt_with(legacy_new) == legacy_cipher, "el formato legacy no coincide con sqlalchemy_utils"
+
+    cases = [
+        ("cifrar   StringEncryptedType", lambda: encrypt_with(current)),
+        ("cifrar   EncryptedString (legacy)", lambda: encrypt_with(legacy_new)),
+        ("cifrar   EncryptedString (gcm)", lambda: encrypt_with(gcm_new)),
+        ("descifrar StringEncryptedType", lambda: [current.process_result_value(v, DIALECT) for v in legacy_cipher]),
+        ("descifrar EncryptedString (legacy)", lambda: [legacy_new.process_result_value(v, DIALECT) for v in legacy_cipher]),
+        ("descifrar EncryptedString (gcm)", lambda: [gcm_new.process_result_value(v, DIALECT) for v in gcm_cipher]),
+        ("descifrar decrypt_many (legacy)", lambda: decrypt_many(legacy_cipher, key)),
+        ("descifrar decrypt_many (gcm)", lambda: decrypt_many(gcm_cipher, key)),
+    ]
+
+    print(f"{rows} filas x {columns} columnas, valores de {length} caracteres")
+    for name, fn in cases:
+        seconds = min(_time(fn) for _ in range(3)) * columns
+        print(f"  {name:<36} {_rate(rows, seconds)}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--columns", type=int, default=4, help="columnas cifradas por fila (User tiene 4)")
+    parser.add_argument("--length", type=int, default=40, help="longitud del texto en claro")
+    args = parser.parse_args()
+    run(args.rows, args.columns, args.length)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""Comprueba con EXPLAIN que cada consulta de los servicios puede resolverse con un índice.
+
+Ejecuta las funciones de task_service, user_service y log_service contra la base de datos
+(dentro de una transacción que se deshace al final), captura cada sentencia SQL que emiten
+y la vuelve a lanzar como `EXPLAIN (FORMAT JSON)` con los mismos parámetros.
+Falla (código de salida 1) si algún plan contiene un Seq Scan. Los INSERT no se comprueban.
+
+Por defecto desactiva enable_seqscan: con pocas filas el planificador prefiere un Seq Scan
+aunque exista el índice, y lo que se comprueba es que haya uno utilizable. Con --natural se
+muestra el plan que elegiría el planificador con los datos actuales, sin fallar (en tablas
+pequeñas como row_counters o users el Seq Scan es la opción correcta).
+
+Uso (desde la raíz del repositorio, con app/.env configurado y datos de benchmarks.seed):
+    python -m benchmarks.explain_indexes
+    python -m benchmarks.explain_indexes --natural --verbose
+"""
+import argparse
+import asyncio
+import json
+import sys
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.counters import TotalMode
+from app.core.pagination import encode_cursor
+from app.core.session import engine
+from app.models.task import Task, TaskStatus
+from app.models.user import Log, User
+from app.schemas.task_schema import TaskBatchUpdateItem, TaskCreate, TaskUpdate
+from app.schemas.user_schema import UserUpdate
+from app.services import log_service, task_service, user_service
+
+EXPLAINABLE = ("SELECT", "UPDATE", "DELETE", "WITH")
+
+Case = Tuple[str, Callable[[AsyncSession], Awaitable]]
+
+
+class Capture:
+    """Sentencias enviadas al driver mientras `active` es True."""
+
+    def __init__(self):
+        self.active = False
+        self.statements: List[Tuple[str, tuple]] = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if self.active and not executemany and statement.lstrip().upper().startswith(EXPLAINABLE):
+            self.statements.append((statement, parameters))
+
+
+def _walk(node: dict):
+    yield node
+    for child in node.get("Plans", ()):
+        yield from _walk(child)
+
+
+def _describe(node: dict) -> str:
+    name = node["Node Type"]
+    if "Index Name" in node:
+        name += f" {node['Index Name']}"
+    elif "Relation Name" in node:
+        name += f" {node['Relation Name']}"
+    return name
+
+
+async def _drain(iterator) -> None:
+    async for _ in iterator:
+        pass
+
+
+async def _sample(db: AsyncSession):
+    """Un usuario típico (la mediana de tareas activas), una de sus tareas y el log más reciente."""
+    counts = (await db.execute(
+        select(Task.user_id, func.count())
+        .where(Task.deleted == False)
+        .group_by(Task.user_id)
+        .order_by(func.count().desc())
+    )).all()
+    if not counts:
+        sys.exit("No hay tareas: ejecuta antes python -m benchmarks.seed")
+    row = counts[len(counts) // 2]
+    user = await user_service.get_user(db, row.user_id)
+    task = (await task_service.get_tasks_by_user(db, user.id, limit=1, total_mode=TotalMode.none))[0][0]
+    log = (await db.execute(select(Log).order_by(Log.created_at.desc()).limit(1))).scalar()
+    return user, task, log
+
+
+def _cases(user: User, task: Task, log: Optional[Log]) -> List[Case]:
+    task_cursor = encode_cursor(task.created_at, task.id)
+    user_cursor = encode_cursor(user.created_at, user.id)
+    cases: List[Case] = [
+        ("task.get_task", lambda db: task_service.get_task(db, task.id)),
+        ("task.get_tasks", lambda db: task_service.get_tasks(db)),
+        ("task.get_tasks_by_user", lambda db: task_service.get_tasks_by_user(db, user.id)),
+        ("task.get_tasks_by_user offset", lambda db: task_service.get_tasks_by_user(db, user.id, offset=40)),
+        ("task.get_tasks_by_user cursor", lambda db: task_service.get_tasks_by_user(db, user.id, cursor=task_cursor)),
+        ("task.get_tasks_by_user status", lambda db: task_service.get_tasks_by_user(
+            db, user.id, status=TaskStatus.done, total_mode=TotalMode.exact)),
+        ("task.get_tasks_by_user status cursor", lambda db: task_service.get_tasks_by_user(
+            db, user.id, status=TaskStatus.pending, cursor=task_cursor, total_mode=TotalMode.estimate)),
+        ("task.search_tasks", lambda db: task_service.search_tasks(db, user.id, search="rev")),
+        ("task.search_tasks cursor", lambda db: task_service.search_tasks(db, user.id, search="rev", cursor=task_cursor)),
+        ("task.stream_user_tasks", lambda db: _drain(task_service.stream_user_tasks(db, user.id))),
+        ("task.get_task_stamp", lambda db: task_service.get_task_stamp(db, task.id)),
+        ("task.get_tasks_version", lambda db: task_service.get_tasks_version(db, user.id)),
+        ("task.get_task_stats", lambda db: task_service.get_task_stats(db, user.id)),
+        ("task.update_task", lambda db: task_service.update_task(db, task.id, TaskUpdate(status=TaskStatus.done), user.id)),
+        ("task.update_tasks", lambda db: task_service.update_tasks(
+            db, [TaskBatchUpdateItem(id=task.id, status=TaskStatus.in_progress)], user.id)),
+        ("task.deactivate_task", lambda db: task_service.deactivate_task(db, task.id, user.id)),
+        ("task.activate_task", lambda db: task_service.activate_task(db, task.id, user.id)),
+        ("task.deactivate_tasks", lambda db: task_service.deactivate_tasks(db, [task.id], user.id)),
+        ("task.create_task", lambda db: task_service.create_task(db, TaskCreate(task_name="explain"), user.id)),
+        ("user.get_user", lambda db: user_service.get_user(db, user.id)),
+        ("user.get_user_stamp", lambda db: user_service.get_user_stamp(db, user.id)),
+        ("user.get_user_by_email", lambda db: user_service.get_user_by_email(db, user.email)),
+        ("user.get_users", lambda db: user_service.get_users(db)),
+        ("user.get_users cursor", lambda db: user_service.get_users(db, cursor=user_cursor)),
+        ("user.search_users", lambda db: user_service.search_users(db, search="ben")),
+        ("user.search_users total", lambda db: user_service.search_users(db, total_mode=TotalMode.exact)),
+        ("user.get_users_by_role", lambda db: user_service.get_users_by_role(db)),
+        ("user.get_user_deactivate", lambda db: user_service.get_user_deactivate(db, user.id)),
+        ("user.update_user", lambda db: user_service.update_user(db, user.id, UserUpdate(name_complete="Explain"))),
+        ("user.deactivate_user", lambda db: user_service.deactivate_user(db, user.id)),
+        ("user.activate_user", lambda db: user_service.activate_user(db, user.id)),
+        ("log.list_logs", lambda db: log_service.list_logs(db)),
+    ]
+    if log is not None:
+        log_cursor = encode_cursor(log.created_at, log.id)
+        cases.append(("log.list_logs cursor", lambda db: log_service.list_logs(db, cursor=log_cursor)))
+    return cases
+
+
+async def run(natural: bool, verbose: bool) -> int:
+    capture = Capture()
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    failures = 0
+    natural_seq_scans = 0
+    try:
+        async with engine.connect() as conn:
+            await conn.begin()
+            if not natural:
+                await conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+            db = AsyncSession(bind=conn, expire_on_commit=False)
+            user, task, log = await _sample(db)
+
+            for name, call in _cases(user, task, log):
+                capture.statements.clear()
+                capture.active = True
+                try:
+                    await call(db)
+                finally:
+                    capture.active = False
+
+                if not capture.statements:
+                    print(f"{'-':<5} {name:<38} (solo INSERT)")
+                for statement, parameters in capture.statements:
+                    result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+                    plan = result.scalar()
+                    if isinstance(plan, str):
+                        plan = json.loads(plan)
+                    nodes = list(_walk(plan[0]["Plan"]))
+                    scans = [_describe(node) for node in nodes if "Relation Name" in node or "Index Name" in node]
+                    seq_scans = [node for node in nodes if node["Node Type"] == "Seq Scan"]
+                    if natural:
+                        natural_seq_scans += bool(seq_scans)
+                        mark = "seq" if seq_scans else "ok"
+                    else:
+                        failures += bool(seq_scans)
+                        mark = "FALLA" if seq_scans else "ok"
+                    print(f"{mark:<5} {name:<38} {', '.join(scans) or '(sin tablas)'}")
+                    if verbose or seq_scans:
+                        print(f"        {' '.join(statement.split())[:300]}")
+            await db.close()
+            await conn.rollback()
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", capture)
+        await engine.dispose()
+
+    if natural:
+        print(f"\n{natural_seq_scans} consultas con Seq Scan en el plan natural (informativo)")
+    else:
+        print(f"\n{failures} consultas con Seq Scan" if failures else "\nTodas las consultas usan un índice")
+    return 1 if failures else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--natural", action="store_true", help="no desactivar enable_seqscan")
+    parser.add_argument("--verbose", action="store_true", help="mostrar también el SQL de las consultas correctas")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.natural, args.verbose)))
+
+
+if __name__ == "__main__":
+    main()
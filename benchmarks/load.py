@@ -0,0 +1,330 @@
+"""Prueba de carga de cada ruta de auth, tasks y users, en proceso (ASGI) o contra un uvicorn local.
+
+Antes: python -m benchmarks.seed (usuarios bench-user-*, tareas y logs).
+
+Uso (desde la raíz del repositorio, con app/.env configurado):
+    python -m benchmarks.load --requests 300 --concurrency 10 --save benchmarks/results/base.json
+    python -m benchmarks.load --url http://127.0.0.1:8000 --compare benchmarks/results/base.json
+    python -m benchmarks.load --only /tasks --only "POST /auth/login"
+
+En proceso, el generador de carga comparte el bucle de eventos con la aplicación: sirve para
+comparar cambios entre sí, no como cifra absoluta. Con --url se mide el servidor real.
+Las rutas de escritura crean datos (registros, tareas, logs): usar una base de datos de pruebas.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.report import compare, load_baseline, print_report, save_baseline, summarize
+from benchmarks.seed import ADMIN_EMAIL, ADMIN_PASSWORD, PASSWORD, user_email
+
+BATCH_SIZE = 20
+IMPORT_SIZE = 100
+SEARCH_TERMS = ("comprar", "informe", "cliente", "pedido", "factura")
+
+
+class Context:
+    """Estado compartido por los escenarios: cliente, tokens y datos existentes."""
+
+    def __init__(self, client: httpx.AsyncClient, seed: int):
+        self.client = client
+        self.rng = random.Random(seed)
+        self.admin: Dict[str, str] = {}
+        self.users: List[Dict[str, str]] = []
+        self.user_ids: List[str] = []
+        self.tasks: List[Tuple[Dict[str, str], str]] = []
+
+    async def login(self, email: str, password: str) -> Dict[str, str]:
+        response = await self.client.post("/auth/login", json={"email": email, "password": password})
+        response.raise_for_status()
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def setup(self, users: int) -> None:
+        self.admin = await self.login(ADMIN_EMAIL, ADMIN_PASSWORD)
+        for index in range(users):
+            try:
+                headers = await self.login(user_email(index), PASSWORD)
+            except httpx.HTTPStatusError:
+                sys.exit(f"No existe {user_email(index)}: ejecuta antes python -m benchmarks.seed")
+            self.users.append(headers)
+            self.user_ids.append((await self.client.get("/auth/me", headers=headers)).json()["id"])
+            page = await self.client.get("/tasks", params={"limit": 100}, headers=headers)
+            self.tasks += [(headers, task["id"]) for task in page.json()]
+        if not self.tasks:
+            sys.exit("Los usuarios de benchmark no tienen tareas: ejecuta antes python -m benchmarks.seed")
+
+    def user(self) -> Dict[str, str]:
+        return self.rng.choice(self.users)
+
+    def task(self) -> Tuple[Dict[str, str], str]:
+        return self.rng.choice(self.tasks)
+
+    def new_email(self) -> str:
+        return f"bench-reg-{uuid.uuid4().hex[:12]}@bench.com"
+
+    async def new_user(self) -> str:
+        response = await self.client.post("/auth/register", json={
+            "name_complete": "Usuario Temporal", "email": self.new_email(), "password": PASSWORD, "role": "Public",
+        })
+        response.raise_for_status()
+        return response.json()["id"]
+
+
+# Devuelve los argumentos de la petición; se ejecuta antes de medir (puede hacer peticiones propias)
+Prepare = Callable[[Context], Awaitable[dict]]
+
+
+@dataclass
+class Scenario:
+    method: str
+    route: str
+    prepare: Prepare
+    expected: int = 200
+
+    @property
+    def name(self) -> str:
+        return f"{self.method} {self.route}"
+
+
+async def _login(ctx: Context) -> dict:
+    index = ctx.rng.randrange(len(ctx.users))
+    return {"url": "/auth/login", "json": {"email": user_email(index), "password": PASSWORD}}
+
+
+async def _register(ctx: Context) -> dict:
+    return {"url": "/auth/register", "json": {
+        "name_complete": "Usuario Registro", "email": ctx.new_email(), "password": PASSWORD, "role": "Public",
+    }}
+
+
+async def _me(ctx: Context) -> dict:
+    return {"url": "/auth/me", "headers": ctx.user()}
+
+
+async def _logout(ctx: Context) -> dict:
+    # Token propio: el logout lo revoca
+    index = ctx.rng.randrange(len(ctx.users))
+    return {"url": "/auth/logout", "headers": await ctx.login(user_email(index), PASSWORD)}
+
+
+async def _list_tasks(ctx: Context) -> dict:
+    return {"url": "/tasks", "params": {"limit": 50}, "headers": ctx.user()}
+
+
+async def _filter_tasks(ctx: Context) -> dict:
+    return {"url": "/tasks/filter", "params": {"search": ctx.rng.choice(SEARCH_TERMS), "limit": 20}, "headers": ctx.user()}
+
+
+async def _export_tasks(ctx: Context) -> dict:
+    return {"url": "/tasks/export", "params": {"format": ctx.rng.choice(("ndjson", "csv"))}, "headers": ctx.user()}
+
+
+async def _import_tasks(ctx: Context) -> dict:
+    lines = (json.dumps({"task_name": f"Importada {index}", "description": "benchmarks.load"}) for index in range(IMPORT_SIZE))
+    return {"url": "/tasks/import", "content": "\n".join(lines).encode(), "headers": ctx.user()}
+
+
+async def _create_task(ctx: Context) -> dict:
+    return {"url": "/tasks", "json": {"task_name": "Tarea de carga", "description": "creada por benchmarks.load"},
+            "headers": ctx.user()}
+
+
+async def _create_batch(ctx: Context) -> dict:
+    tasks = [{"task_name": f"Lote {index}", "description": "creada por benchmarks.load"} for index in range(BATCH_SIZE)]
+    return {"url": "/tasks/batch", "json": {"tasks": tasks}, "headers": ctx.user()}
+
+
+async def _update_batch(ctx: Context) -> dict:
+    headers, _ = ctx.task()
+    ids = [task_id for owner, task_id in ctx.tasks if owner is headers][:BATCH_SIZE]
+    return {"url": "/tasks/batch", "json": {"tasks": [{"id": task_id, "status": "pending"} for task_id in ids]},
+            "headers": headers}
+
+
+async def _delete_batch(ctx: Context) -> dict:
+    headers = ctx.user()
+    created = await ctx.client.post("/tasks/batch", headers=headers, json={
+        "tasks": [{"task_name": f"Borrar {index}"} for index in range(BATCH_SIZE)],
+    })
+    ids = [result["id"] for result in created.json()["results"]]
+    return {"url": "/tasks/batch", "json": {"ids": ids}, "headers": headers}
+
+
+async def _get_task(ctx: Context) -> dict:
+    headers, task_id = ctx.task()
+    return {"url": f"/tasks/{task_id}", "headers": headers}
+
+
+async def _update_task(ctx: Context) -> dict:
+    headers, task_id = ctx.task()
+    return {"url": f"/tasks/{task_id}", "json": {"status": ctx.rng.choice(("pending", "done"))}, "headers": headers}
+
+
+async def _delete_task(ctx: Context) -> dict:
+    headers = ctx.user()
+    created = await ctx.client.post("/tasks", headers=headers, json={"task_name": "Borrar"})
+    return {"url": f"/tasks/{created.json()['id']}", "headers": headers}
+
+
+async def _list_users(ctx: Context) -> dict:
+    return {"url": "/users", "params": {"limit": 50}, "headers": ctx.admin}
+
+
+async def _filter_users(ctx: Context) -> dict:
+    return {"url": "/users/filter", "params": {"search": "bench", "limit": 20}, "headers": ctx.admin}
+
+
+async def _list_logs(ctx: Context) -> dict:
+    return {"url": "/users/logs", "params": {"limit": 50}, "headers": ctx.admin}
+
+
+async def _get_user(ctx: Context) -> dict:
+    return {"url": f"/users/{ctx.rng.choice(ctx.user_ids)}", "headers": ctx.admin}
+
+
+async def _update_user(ctx: Context) -> dict:
+    index = ctx.rng.randrange(len(ctx.user_ids))
+    return {"url": f"/users/{ctx.user_ids[index]}", "json": {"name_complete": f"Usuario Bench {index:05d}"},
+            "headers": ctx.admin}
+
+
+async def _deactivate_user(ctx: Context) -> dict:
+    return {"url": f"/users/{await ctx.new_user()}", "headers": ctx.admin}
+
+
+async def _activate_user(ctx: Context) -> dict:
+    user_id = await ctx.new_user()
+    await ctx.client.delete(f"/users/{user_id}", headers=ctx.admin)
+    return {"url": f"/users/activate/{user_id}", "headers": ctx.admin}
+
+
+SCENARIOS = [
+    Scenario("POST", "/auth/login", _login),
+    Scenario("POST", "/auth/register", _register),
+    Scenario("GET", "/auth/me", _me),
+    Scenario("GET", "/auth/logout", _logout),
+    Scenario("GET", "/tasks", _list_tasks),
+    Scenario("GET", "/tasks/filter", _filter_tasks),
+    Scenario("GET", "/tasks/export", _export_tasks),
+    Scenario("POST", "/tasks/import", _import_tasks),
+    Scenario("POST", "/tasks", _create_task, expected=201),
+    Scenario("POST", "/tasks/batch", _create_batch, expected=201),
+    Scenario("PATCH", "/tasks/batch", _update_batch),
+    Scenario("DELETE", "/tasks/batch", _delete_batch),
+    Scenario("GET", "/tasks/{task_id}", _get_task),
+    Scenario("PUT", "/tasks/{task_id}", _update_task),
+    Scenario("DELETE", "/tasks/{task_id}", _delete_task),
+    Scenario("GET", "/users", _list_users),
+    Scenario("GET", "/users/filter", _filter_users),
+    Scenario("GET", "/users/logs", _list_logs),
+    Scenario("GET", "/users/{user_id}", _get_user),
+    Scenario("PUT", "/users/{user_id}", _update_user),
+    Scenario("DELETE", "/users/{user_id}", _deactivate_user),
+    Scenario("POST", "/users/activate/{user_id}", _activate_user),
+]
+
+
+async def _bounded(concurrency: int, jobs: List[Callable[[], Awaitable]]) -> list:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(job):
+        async with semaphore:
+            return await job()
+
+    return await asyncio.gather(*(run(job) for job in jobs))
+
+
+async def run_scenario(ctx: Context, scenario: Scenario, requests: int, concurrency: int, warmup: int) -> dict:
+    """Prepara todas las peticiones (sin medir) y luego las lanza con `concurrency` en vuelo."""
+    prepared = await _bounded(concurrency, [lambda: scenario.prepare(ctx) for _ in range(warmup + requests)])
+    for request in prepared[:warmup]:
+        await ctx.client.request(scenario.method, **request)
+
+    latencies: List[float] = []
+    failures: Dict[int, int] = {}
+
+    async def send(request: dict) -> None:
+        start = time.perf_counter()
+        response = await ctx.client.request(scenario.method, **request)
+        elapsed = time.perf_counter() - start
+        if response.status_code == scenario.expected:
+            latencies.append(elapsed)
+        else:
+            failures[response.status_code] = failures.get(response.status_code, 0) + 1
+
+    start = time.perf_counter()
+    await _bounded(concurrency, [lambda request=request: send(request) for request in prepared[warmup:]])
+    result = summarize(latencies, sum(failures.values()), time.perf_counter() - start)
+    if failures:
+        result["failures"] = {str(code): count for code, count in sorted(failures.items())}
+    return result
+
+
+@asynccontextmanager
+async def _client(url: Optional[str], timeout: float):
+    if url:
+        async with httpx.AsyncClient(base_url=url, timeout=timeout) as client:
+            yield client
+        return
+
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=timeout) as client:
+            yield client
+
+
+async def run(args: argparse.Namespace) -> int:
+    scenarios = [s for s in SCENARIOS if not args.only or any(part in s.name for part in args.only)]
+    routes: Dict[str, dict] = {}
+    async with _client(args.url, args.timeout) as client:
+        ctx = Context(client, args.seed)
+        await ctx.setup(args.users)
+        for scenario in scenarios:
+            routes[scenario.name] = await run_scenario(ctx, scenario, args.requests, args.concurrency, args.warmup)
+            print(f"  {scenario.name}: {routes[scenario.name]['throughput']} req/s", flush=True)
+
+    print_report(routes)
+    options = {key: value for key, value in vars(args).items() if key not in ("save", "compare")}
+    options["mode"] = "url" if args.url else "asgi"
+    if args.save:
+        save_baseline(args.save, routes, options)
+    if args.compare:
+        baseline = load_baseline(args.compare)
+        if baseline.get("options", {}).get("mode") != options["mode"]:
+            print("Aviso: el baseline se midió en otro modo (asgi/url)")
+        if compare(baseline["routes"], routes, args.tolerance):
+            return 1
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="servidor a medir (p. ej. http://127.0.0.1:8000); por defecto, en proceso")
+    parser.add_argument("--requests", type=int, default=200, help="peticiones medidas por ruta")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=10, help="peticiones por ruta sin medir")
+    parser.add_argument("--users", type=int, default=10, help="usuarios bench-user-* que generan carga")
+    parser.add_argument("--only", action="append", help="solo rutas cuyo nombre contenga el texto (repetible)")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save", type=Path, help="guarda el resultado como baseline JSON")
+    parser.add_argument("--compare", type=Path, help="baseline JSON con el que comparar")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="empeoramiento admitido (0.15 = 15%%)")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
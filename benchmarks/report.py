@@ -0,0 +1,120 @@
+"""Resumen por ruta (throughput y latencias p50/p95/p99), baselines JSON y comparación.
+
+Uso:
+    python -m benchmarks.report benchmarks/results/antes.json benchmarks/results/despues.json --tolerance 0.15
+"""
+import argparse
+import json
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import pytz
+
+# Métrica -> True si más alto es mejor
+COMPARED = {"throughput": True, "p50_ms": False, "p95_ms": False, "p99_ms": False}
+
+
+def percentile(ordered: Sequence[float], q: float) -> float:
+    """Interpolación lineal entre rangos sobre una lista ya ordenada."""
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> dict:
+    """`latencies` en segundos de las peticiones correctas; `elapsed` es el tiempo de pared de la ruta."""
+    ordered = sorted(latencies)
+    total = len(ordered) + errors
+    return {
+        "requests": total,
+        "errors": errors,
+        "throughput": round(total / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+    }
+
+
+def print_report(routes: Dict[str, dict]) -> None:
+    width = max((len(name) for name in routes), default=10)
+    print(f"{'ruta':<{width}} {'peticiones':>10} {'errores':>8} {'req/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, result in routes.items():
+        print(
+            f"{name:<{width}} {result['requests']:>10} {result['errors']:>8} {result['throughput']:>10.1f} "
+            f"{result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f}"
+        )
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_baseline(path: Path, routes: Dict[str, dict], options: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    baseline = {
+        "created_at": datetime.now(pytz.utc).isoformat(),
+        "commit": _git_commit(),
+        "options": options,
+        "routes": routes,
+    }
+    path.write_text(json.dumps(baseline, indent=2, ensure_ascii=False) + "\n")
+    print(f"baseline guardado en {path}")
+
+
+def load_baseline(path: Path) -> dict:
+    return json.loads(path.read_text())
+
+
+def compare(baseline: Dict[str, dict], current: Dict[str, dict], tolerance: float) -> List[str]:
+    """Imprime las diferencias por ruta y devuelve las regresiones mayores que `tolerance` (0.15 = 15%)."""
+    regressions = []
+    width = max((len(name) for name in current), default=10)
+    print(f"{'ruta':<{width}} " + " ".join(f"{metric:>18}" for metric in COMPARED))
+    for name, result in current.items():
+        before = baseline.get(name)
+        if before is None:
+            print(f"{name:<{width}} (sin baseline)")
+            continue
+        cells = []
+        for metric, higher_is_better in COMPARED.items():
+            old, new = before[metric], result[metric]
+            change = (new - old) / old if old else 0.0
+            worse = -change if higher_is_better else change
+            flag = " !" if worse > tolerance else "  "
+            if worse > tolerance:
+                regressions.append(f"{name} {metric}: {old} -> {new} ({change:+.1%})")
+            cells.append(f"{new:>9.1f} {change:>+6.0%}{flag}")
+        if result["errors"] > before["errors"]:
+            regressions.append(f"{name} errores: {before['errors']} -> {result['errors']}")
+        print(f"{name:<{width}} " + " ".join(cells))
+
+    for regression in regressions:
+        print(f"REGRESIÓN {regression}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("current", type=Path)
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args()
+    regressions = compare(load_baseline(args.baseline)["routes"], load_baseline(args.current)["routes"], args.tolerance)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
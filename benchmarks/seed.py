@@ -0,0 +1,142 @@
+"""Genera datos de prueba reproducibles para los benchmarks: usuarios, tareas y logs.
+
+Es idempotente: vuelve a ejecutarlo con los mismos tamaños y solo crea lo que falte.
+Usar siempre contra una base de datos local de pruebas.
+
+Uso (desde la raíz del repositorio, con app/.env configurado):
+    python -m benchmarks.seed --users 50 --tasks 200 --logs 1000000
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+import pytz
+from sqlalchemy import insert, text
+
+from app.config import settings
+from app.core.counters import LOGS, TASKS, bump, read_counter, read_sharded_counter, sharded_key
+from app.core.session import async_session, engine
+from app.jobs.log_partitions import add_months, create_partition_sql, month_start
+from app.models.user import Log
+from app.schemas.task_schema import TaskCreate
+from app.schemas.user_schema import UserCreate
+from app.services.task_service import create_tasks
+from app.services.user_service import create_user, get_user_by_email
+
+PASSWORD = "bench"
+ADMIN_EMAIL = "admin@task.com"
+ADMIN_PASSWORD = "admin"
+LOG_CHUNK = 5000
+
+_WORDS = (
+    "comprar", "revisar", "enviar", "preparar", "llamar", "pagar", "informe", "factura",
+    "reunión", "cliente", "proyecto", "pedido", "correo", "presupuesto", "inventario", "contrato",
+)
+
+
+def user_email(index: int) -> str:
+    return f"bench-user-{index:05d}@bench.com"
+
+
+def _phrase(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(words))
+
+
+async def seed_users(count: int) -> List[str]:
+    """Crea (si faltan) los usuarios `bench-user-*` y devuelve sus ids en orden."""
+    ids = []
+    for index in range(count):
+        async with async_session() as db:
+            user = await get_user_by_email(db, user_email(index))
+            if user is None:
+                user = await create_user(db, UserCreate(
+                    name_complete=f"Usuario Bench {index:05d}",
+                    email=user_email(index),
+                    password=PASSWORD,
+                    role="Public",
+                ))
+                await db.commit()
+            ids.append(user.id)
+    return ids
+
+
+async def seed_tasks(user_ids: List[str], per_user: int, seed: int) -> int:
+    """Completa `per_user` tareas por usuario con INSERT por lotes (mismo camino que POST /tasks/batch)."""
+    created = 0
+    for user_id in user_ids:
+        rng = random.Random(f"{seed}:{user_id}")
+        async with async_session() as db:
+            missing = per_user - await read_counter(db, TASKS, user_id)
+            while missing > 0:
+                size = min(missing, settings.MAX_BATCH_SIZE)
+                await create_tasks(db, [
+                    TaskCreate(task_name=_phrase(rng, 3), description=_phrase(rng, 8)) for _ in range(size)
+                ], user_id)
+                await db.commit()
+                missing -= size
+                created += size
+    return created
+
+
+async def seed_logs(total: int, user_ids: List[str], months: int, seed: int) -> int:
+    """Inserta logs repartidos en los últimos `months` meses, creando las particiones necesarias."""
+    rng = random.Random(seed)
+    now = datetime.now(pytz.utc)
+    first = add_months(month_start(now), 1 - months)
+    start = datetime(first.year, first.month, 1, tzinfo=pytz.utc)
+    span = (now - start).total_seconds()
+
+    async with async_session() as db:
+        for offset in range(months):
+            await db.execute(text(create_partition_sql(add_months(first, offset))))
+        missing = total - await read_sharded_counter(db, LOGS)
+        await db.commit()
+
+    inserted = 0
+    while missing > 0:
+        size = min(missing, LOG_CHUNK)
+        rows = [
+            {
+                "action": f"Tarea '{_phrase(rng, 3)}' fue actualizada.",
+                "user_id": rng.choice(user_ids) if user_ids else None,
+                "created_at": start + timedelta(seconds=rng.random() * span),
+            }
+            for _ in range(size)
+        ]
+        async with async_session() as db:
+            await db.execute(insert(Log), rows)
+            await bump(db, LOGS, sharded_key(), size)
+            await db.commit()
+        missing -= size
+        inserted += size
+    return inserted
+
+
+async def seed(users: int, tasks: int, logs: int, log_months: int, random_seed: int) -> None:
+    start = time.perf_counter()
+    user_ids = await seed_users(users)
+    print(f"usuarios: {len(user_ids)}")
+    print(f"tareas creadas: {await seed_tasks(user_ids, tasks, random_seed)}")
+    print(f"logs creados: {await seed_logs(logs, user_ids, log_months, random_seed)}")
+    async with engine.begin() as connection:
+        await connection.execute(text("ANALYZE"))
+    await engine.dispose()
+    print(f"listo en {time.perf_counter() - start:.1f}s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--tasks", type=int, default=200, help="tareas por usuario")
+    parser.add_argument("--logs", type=int, default=100000, help="total de filas en logs")
+    parser.add_argument("--log-months", type=int, default=3, help="meses sobre los que se reparten los logs")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    asyncio.run(seed(args.users, args.tasks, args.logs, args.log_months, args.seed))
+
+
+if __name__ == "__main__":
+    main()
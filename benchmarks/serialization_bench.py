@@ -0,0 +1,130 @@
+"""Micro-benchmark de la serialización de listados: respuestas/s con y sin FAST_JSON.
+
+Monta dos rutas FastAPI sin base de datos que devuelven las mismas `limit` tareas:
+- `std`: como antes, un TaskResponse por fila, validación del `response_model` y json estándar.
+- `fast`: `model_rows` + `fast_response` (una sola pasada con orjson).
+
+Uso (desde la raíz del repositorio, con app/.env configurado):
+    python -m benchmarks.serialization_bench --limit 500 --requests 200
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse
+
+from app.config import settings
+from app.core.responses import FastJSONResponse, fast_response, model_rows
+from app.models.task import Task
+from app.models.user import User  # noqa: F401  (resuelve la relación Task.user)
+from app.schemas.task_schema import TaskResponse
+
+
+def _tasks(count: int) -> List[Task]:
+    now = datetime.now(timezone.utc)  # como las devuelve asyncpg
+    return [
+        Task(
+            id=f"task-{index:021d}",
+            task_name=f"Tarea de prueba número {index}",
+            description="Descripción de la tarea con algo de texto, acentos y \"comillas\"",
+            status="pending",
+            user_id="bench-user-000000000000",
+            created_at=now - timedelta(minutes=index),
+            updated_at=now - timedelta(seconds=index),
+        )
+        for index in range(count)
+    ]
+
+
+def _app(tasks: List[Task], response_class) -> FastAPI:
+    app = FastAPI(default_response_class=response_class)
+
+    @app.get("/std", response_model=List[TaskResponse])
+    async def std():
+        return [
+            TaskResponse(
+                id=task.id,
+                task_name=task.task_name,
+                description=task.description,
+                status=task.status,
+                user_id=task.user_id,
+                created_at=task.created_at,
+                updated_at=task.updated_at,
+            )
+            for task in tasks
+        ]
+
+    @app.get("/fast", response_model=List[TaskResponse])
+    async def fast(response: Response):
+        return fast_response(model_rows(TaskResponse, tasks), response)
+
+    return app
+
+
+async def _call(app: FastAPI, path: str) -> bytes:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": [], "client": ("127.0.0.1", 1), "server": ("127.0.0.1", 80),
+    }
+    body = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            body.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return b"".join(body)
+
+
+async def _measure(app: FastAPI, path: str, requests: int) -> float:
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(requests):
+            await _call(app, path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+async def run(limit: int, requests: int) -> None:
+    tasks = _tasks(limit)
+    std_app = _app(tasks, JSONResponse)
+    fast_app = _app(tasks, FastJSONResponse)
+
+    settings.FAST_JSON = True
+    std_body = await _call(std_app, "/std")
+    fast_body = await _call(fast_app, "/fast")
+    assert json.loads(std_body) == json.loads(fast_body), "las dos rutas no devuelven lo mismo"
+
+    cases = [
+        ("response_model + json", std_app, "/std"),
+        ("response_model + orjson", fast_app, "/std"),
+        ("fast_response (una pasada)", fast_app, "/fast"),
+    ]
+    print(f"{requests} respuestas de {limit} tareas ({len(fast_body) / 1024:.0f} KiB)")
+    baseline = None
+    for name, app, path in cases:
+        seconds = await _measure(app, path, requests)
+        baseline = baseline or seconds
+        per_request = seconds / requests * 1000
+        print(f"  {name:<28} {requests / seconds:>8,.0f} resp/s  {per_request:>7.2f} ms/resp  x{baseline / seconds:.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limit", type=int, default=settings.MAX_LIMIT, help="tareas por respuesta")
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args.limit, args.requests))
+
+
+if __name__ == "__main__":
+    main()
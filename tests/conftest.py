@@ -0,0 +1,71 @@
+"""Pruebas de integración: necesitan la base de datos de app/.env con las migraciones aplicadas."""
+import uuid
+
+import httpx
+import pytest
+from sqlalchemy import update
+
+from app.core.session import async_session
+from app.main import app as fastapi_app
+from app.models.user import User
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+async def app():
+    async with fastapi_app.router.lifespan_context(fastapi_app):
+        yield fastapi_app
+
+
+@pytest.fixture
+async def client(app):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture
+async def user(client):
+    """Usuario nuevo con una tarea; devuelve credenciales, cabeceras y el id de la tarea."""
+    email = f"pytest-{uuid.uuid4().hex[:12]}@example.com"
+    password = "secreto"
+    response = await client.post(
+        "/auth/register",
+        json={"name_complete": "Prueba Pytest", "email": email, "password": password, "role": "Public"},
+    )
+    assert response.status_code == 200, response.text
+    user_id = response.json()["id"]
+    response = await client.post("/auth/login", json={"email": email, "password": password})
+    assert response.status_code == 200, response.text
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    response = await client.post("/tasks", json={"task_name": "Tarea de prueba"}, headers=headers)
+    assert response.status_code == 201, response.text
+    client.cookies.clear()
+    return {
+        "id": user_id,
+        "email": email,
+        "password": password,
+        "headers": headers,
+        "task_id": response.json()["id"],
+    }
+
+
+@pytest.fixture
+async def admin_headers(client):
+    """El administrador que crea la aplicación al arrancar."""
+    response = await client.post("/auth/login", json={"email": "admin@task.com", "password": "admin"})
+    assert response.status_code == 200, response.text
+    client.cookies.clear()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+async def legacy_password(user):
+    """Deja la contraseña de `user` en claro, como antes del hashing: el próximo login la rehashea."""
+    async with async_session() as db:
+        await db.execute(update(User).where(User.id == user["id"]).values(password=user["password"]))
+        await db.commit()
+    return user
@@ -0,0 +1,20 @@
+"""Los ETag de los listados de usuarios cambian con cualquier escritura visible en ellos."""
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.parametrize("path", ["/users", "/users/filter"])
+async def test_rehash_on_login_changes_users_etag(client, legacy_password, admin_headers, path):
+    response = await client.get(path, headers=admin_headers)
+    assert response.status_code == 200, response.text
+    etag = response.headers["etag"]
+    assert (await client.get(path, headers={**admin_headers, "If-None-Match": etag})).status_code == 304
+
+    credentials = {"email": legacy_password["email"], "password": legacy_password["password"]}
+    assert (await client.post("/auth/login", json=credentials)).status_code == 200
+    client.cookies.clear()
+
+    response = await client.get(path, headers={**admin_headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
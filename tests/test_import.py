@@ -0,0 +1,71 @@
+"""POST /tasks/import: multipart leído en streaming y líneas con longitud máxima."""
+import json
+
+import pytest
+
+from app.config import settings
+from app.core.ingest import multipart_file
+
+pytestmark = pytest.mark.anyio
+
+BOUNDARY = "limite-de-prueba"
+CONTENT_TYPE = f"multipart/form-data; boundary={BOUNDARY}"
+
+
+def _multipart(content: bytes, field: str = "file") -> bytes:
+    return (
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="otro"\r\n\r\nignorado\r\n'
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="{field}"; filename="tareas.ndjson"\r\n'
+        "Content-Type: application/x-ndjson\r\n\r\n"
+    ).encode() + content + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+async def test_multipart_file_is_yielded_before_the_body_ends():
+    body = _multipart(b'{"task_name": "uno"}\n' + b"x" * 1000)
+    requested = []
+
+    async def chunks():
+        for start in range(0, len(body), 256):
+            requested.append(start)
+            yield body[start:start + 256]
+
+    parts = multipart_file(chunks(), CONTENT_TYPE)
+    first = await parts.__anext__()
+    assert first.startswith(b'{"task_name": "uno"}')
+    assert len(requested) < len(range(0, len(body), 256))
+    rest = b"".join([data async for data in parts])
+    assert first + rest == b'{"task_name": "uno"}\n' + b"x" * 1000
+
+
+async def test_multipart_import(client, user):
+    lines = "".join(json.dumps({"task_name": f"multipart {n}"}) + "\n" for n in range(3)).encode()
+    response = await client.post(
+        "/tasks/import", content=_multipart(lines), headers={**user["headers"], "Content-Type": CONTENT_TYPE}
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["imported"] == 3
+
+
+async def test_multipart_without_file_is_rejected(client, user):
+    response = await client.post(
+        "/tasks/import", content=_multipart(b"{}", field="archivo"),
+        headers={**user["headers"], "Content-Type": CONTENT_TYPE},
+    )
+    assert response.status_code == 400
+    assert "Falta el archivo 'file'" in response.json()["detail"]
+
+
+@pytest.mark.parametrize("fmt, body", [
+    ("ndjson", b'{"task_name": "corta"}\n{"task_name": "' + b"a" * 300),
+    ("csv", b'task_name\ncorta\n"' + b"a\n" * 150),
+])
+async def test_line_longer_than_the_limit_is_rejected(client, user, monkeypatch, fmt, body):
+    monkeypatch.setattr(settings, "IMPORT_MAX_LINE_LENGTH", 200)
+    response = await client.post(
+        f"/tasks/import?format={fmt}", content=body,
+        headers={**user["headers"], "Content-Type": "application/octet-stream"},
+    )
+    assert response.status_code == 413
+    assert "supera 200 caracteres" in response.json()["detail"]
@@ -0,0 +1,23 @@
+"""Las revisiones de Alembic se pueden cargar sin las claves ni el código de la aplicación."""
+import sys
+from pathlib import Path
+
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+
+APP_DIR = Path(__file__).resolve().parent.parent / "app"
+
+
+def test_revisions_load_without_secret_keys(monkeypatch):
+    # Como `alembic history` o `alembic upgrade --sql`: se importan todas las revisiones
+    monkeypatch.delenv("DB_SECRET_KEY", raising=False)
+    monkeypatch.delenv("BLIND_INDEX_KEY", raising=False)
+    for name in [name for name in sys.modules if name == "app" or name.startswith("app.")]:
+        monkeypatch.delitem(sys.modules, name)
+
+    config = Config(str(APP_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(APP_DIR / "migrations"))
+    revisions = list(ScriptDirectory.from_config(config).walk_revisions())
+
+    assert revisions
+    assert not any(name == "app" or name.startswith("app.") for name in sys.modules)
@@ -0,0 +1,43 @@
+"""Caché de usuarios autenticados: invalidaciones durante la carga y entre workers."""
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+
+from app.core.principal_cache import CHANNEL, PrincipalCache, principal_cache
+from app.core.session import async_session
+from app.models.user import User
+
+pytestmark = pytest.mark.anyio
+
+
+def test_set_after_an_invalidation_during_the_load_is_discarded():
+    cache = PrincipalCache(max_size=10, ttl_seconds=60)
+    user = User(id="u1", email="u1@example.com")
+
+    generation = cache.generation          # la petición empieza a cargar el usuario
+    cache.invalidate_user(user.id)         # otra sesión confirma un cambio y lo invalida
+    cache.set(user.email, user, generation)  # la carga termina con la fila anterior
+
+    assert cache.get(user.email) is None
+    assert cache.stats()["stale_sets"] == 1
+
+    cache.set(user.email, user, cache.generation)
+    assert cache.get(user.email) is user
+
+
+async def test_invalidation_from_another_worker_arrives_by_notify(app):
+    user = User(id="otro-worker", email="otro-worker@example.com")
+    principal_cache.set(user.email, user, principal_cache.generation)
+    assert principal_cache.get(user.email) is user
+
+    # Otra conexión (otro worker) confirma el cambio: este proceso no ejecuta su after_commit
+    async with async_session() as db:
+        await db.execute(select(func.pg_notify(CHANNEL, user.id)))
+        await db.commit()
+
+    for _ in range(50):
+        if principal_cache.get(user.email) is None:
+            break
+        await asyncio.sleep(0.05)
+    assert principal_cache.get(user.email) is None
@@ -0,0 +1,117 @@
+"""Los listados se resuelven con su índice parcial y sin nodo Sort (EXPLAIN de las consultas reales).
+
+Misma técnica que benchmarks/explain_indexes.py: se ejecuta la función del servicio dentro
+de una transacción que se deshace, se captura el SELECT que emite y se relanza como
+`EXPLAIN (FORMAT JSON)` con sus parámetros. enable_seqscan y enable_sort están desactivados
+porque con las pocas filas de la base de pruebas el planificador prefiere un Seq Scan o un
+Sort de un puñado de filas; desactivados solo los encarece, así que si aparecen es que ningún
+índice sirve el filtro y el ORDER BY de la consulta.
+"""
+import json
+
+import pytest
+from sqlalchemy import event, text
+
+from app.core.counters import TotalMode
+from app.core.pagination import encode_cursor
+from app.core.session import async_session, engine
+from app.models.task import TaskStatus
+from app.services import task_service, user_service
+
+pytestmark = pytest.mark.anyio
+
+
+def _walk(node: dict):
+    yield node
+    for child in node.get("Plans", ()):
+        yield from _walk(child)
+
+
+# Tareas extra del usuario de la prueba, solo dentro de la transacción: con una sola tarea
+# cualquier índice que empiece por user_id cuesta lo mismo y el plan no dice nada.
+EXTRA_TASKS = 3000
+
+
+async def _plans(call, user_id: str) -> list:
+    """Nodos del plan de cada SELECT con ORDER BY que emite `call(db)`."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "ORDER BY" in statement.upper():
+            statements.append((statement, parameters))
+
+    plans = []
+    async with engine.connect() as conn:
+        await conn.begin()
+        await conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        await conn.exec_driver_sql("SET LOCAL enable_sort = off")
+        await conn.execute(
+            text(
+                "INSERT INTO tasks (id, user_id, deleted, status, created_at, updated_at) "
+                "SELECT 'plan-' || n, :user_id, false, n % 3, "
+                "now() - n * interval '1 minute', now() FROM generate_series(1, :count) AS n"
+            ),
+            {"user_id": user_id, "count": EXTRA_TASKS},
+        )
+        # ANALYZE es transaccional: las estadísticas también se deshacen con el rollback
+        await conn.exec_driver_sql("ANALYZE tasks, users")
+        async with async_session(bind=conn) as db:
+            event.listen(engine.sync_engine, "before_cursor_execute", capture)
+            try:
+                await call(db)
+            finally:
+                event.remove(engine.sync_engine, "before_cursor_execute", capture)
+            for statement, parameters in statements:
+                plan = (await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)).scalar()
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                plans.append(list(_walk(plan[0]["Plan"])))
+        await conn.rollback()
+    return plans
+
+
+async def _task(db, user_id):
+    return (await task_service.get_tasks_by_user(db, user_id, limit=1, total_mode=TotalMode.none))[0][0]
+
+
+async def _by_user_after_first(db, user_id):
+    task = await _task(db, user_id)
+    return await task_service.get_tasks_by_user(
+        db, user_id, cursor=encode_cursor(task.created_at, task.id), total_mode=TotalMode.none)
+
+
+LISTINGS = {
+    "task.get_tasks": (
+        "ix_tasks_active_created",
+        lambda db, user: task_service.get_tasks(db),
+    ),
+    "task.get_tasks_by_user": (
+        "ix_tasks_user_active_created",
+        lambda db, user: task_service.get_tasks_by_user(db, user["id"], total_mode=TotalMode.none),
+    ),
+    "task.get_tasks_by_user cursor": (
+        "ix_tasks_user_active_created",
+        lambda db, user: _by_user_after_first(db, user["id"]),
+    ),
+    "task.get_tasks_by_user status": (
+        "ix_tasks_user_active_status_created",
+        lambda db, user: task_service.get_tasks_by_user(
+            db, user["id"], status=TaskStatus.pending, total_mode=TotalMode.none),
+    ),
+    "user.get_users": (
+        "ix_users_active_created",
+        lambda db, user: user_service.get_users(db),
+    ),
+}
+
+
+@pytest.mark.parametrize("name", list(LISTINGS))
+async def test_listing_uses_partial_index_without_sort(app, user, name):
+    index, call = LISTINGS[name]
+    plans = await _plans(lambda db: call(db, user), user["id"])
+    assert plans, f"{name} no emitió ningún SELECT con ORDER BY"
+    nodes = plans[-1]
+    node_types = [node["Node Type"] for node in nodes]
+    assert "Seq Scan" not in node_types, node_types
+    assert "Sort" not in node_types and "Incremental Sort" not in node_types, node_types
+    assert index in {node.get("Index Name") for node in nodes}, node_types
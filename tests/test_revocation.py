@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+from app.core.token_blacklist import PostgresRevocationStore
+
+pytestmark = pytest.mark.anyio
+
+
+class SlowReloadStore(PostgresRevocationStore):
+    """La consulta de reload espera a `release`, para recibir un NOTIFY mientras tanto."""
+
+    def __init__(self, keys):
+        super().__init__(capacity=1000, error_rate=0.001, prune_interval=3600)
+        self.keys = keys
+        self.loading = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def _load_keys(self):
+        self.loading.set()
+        await self.release.wait()
+        return self.keys
+
+
+async def test_reload_keeps_keys_notified_during_the_query():
+    store = SlowReloadStore(["en-la-tabla"])
+    reload = asyncio.create_task(store.reload())
+    await asyncio.wait_for(store.loading.wait(), 5)
+
+    # Revocado en otro worker después de que empezara la consulta
+    store._add("notificado")
+    store.release.set()
+    await reload
+
+    assert "notificado" in store._bloom
+    assert "en-la-tabla" in store._bloom
@@ -0,0 +1,65 @@
+"""/tasks/filter y /users/filter devuelven lo mismo que ILIKE '%término%' sobre los valores descifrados."""
+import pytest
+
+from app.core.search_index import PREFIX_MAX
+
+pytestmark = pytest.mark.anyio
+
+
+async def _create(client, user, **task) -> str:
+    response = await client.post("/tasks", json=task, headers=user["headers"])
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+async def _search(client, user, term: str) -> dict:
+    response = await client.get("/tasks/filter", params={"search": term}, headers=user["headers"])
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def test_all_grams_without_the_substring_do_not_match(client, user):
+    # "abcxbcd" tiene todos los 3-gramas de "abcd" ("abc", "bcd") pero no lo contiene
+    await _create(client, user, task_name="abcxbcd")
+    match = await _create(client, user, task_name="zz abcd zz")
+
+    page = await _search(client, user, "abcd")
+    assert [task["id"] for task in page["tasks"]] == [match]
+    assert page["total"] == 1
+
+
+async def test_match_past_the_indexed_characters(client, user):
+    match = await _create(client, user, task_name="larga", description="x" * 1500 + " aguja")
+
+    page = await _search(client, user, "aguja")
+    assert [task["id"] for task in page["tasks"]] == [match]
+
+
+async def test_cursor_pages_follow_the_verified_ranking(client, user):
+    prefix = await _create(client, user, task_name="informe semanal")
+    gram = await _create(client, user, task_name="el informe")
+    await _create(client, user, task_name="infxorme")
+
+    response = await client.get(
+        "/tasks/filter", params={"search": "informe", "limit": 1}, headers=user["headers"]
+    )
+    first = response.json()
+    assert [task["id"] for task in first["tasks"]] == [prefix]
+    assert first["total"] == 2
+
+    response = await client.get(
+        "/tasks/filter", params={"search": "informe", "limit": 1, "cursor": first["next_cursor"]},
+        headers=user["headers"],
+    )
+    assert [task["id"] for task in response.json()["tasks"]] == [gram]
+
+
+@pytest.mark.parametrize("path", ["/tasks/filter", "/users/filter"])
+async def test_terms_longer_than_prefix_max_are_rejected(client, user, admin_headers, path):
+    headers = admin_headers if path == "/users/filter" else user["headers"]
+    response = await client.get(path, params={"search": "a" * (PREFIX_MAX + 1)}, headers=headers)
+    assert response.status_code == 422
+    assert response.json()["detail"] == f"La búsqueda admite como máximo {PREFIX_MAX} caracteres"
+
+    response = await client.get(path, params={"search": "a" * PREFIX_MAX}, headers=headers)
+    assert response.status_code == 200, response.text
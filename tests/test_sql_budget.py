@@ -0,0 +1,49 @@
+import pytest
+
+from app.config import settings
+from app.core.sql_budget import RAISE, SqlBudgetExceeded, StatementLog, capture_sql, normalize_sql
+
+
+def test_normalize_sql_ignores_parameters_and_in_list_sizes():
+    first = normalize_sql("SELECT * FROM tasks WHERE id = $1::VARCHAR AND user_id IN ($2, $3) LIMIT 10")
+    second = normalize_sql("SELECT *  FROM tasks\nWHERE id = $1::VARCHAR AND user_id IN ($2, $3, $4) LIMIT 20")
+    assert first == second
+
+
+def test_repeated_statement_is_reported_as_n_plus_one(monkeypatch):
+    monkeypatch.setattr(settings, "SQL_N_PLUS_ONE_THRESHOLD", 3)
+    log = StatementLog("GET /tasks", budget=10)
+    log.record("SELECT * FROM users WHERE id = $1")
+    for task_id in range(3):
+        log.record(f"SELECT * FROM tasks WHERE id = '{task_id}'")
+
+    assert log.repeated() == ["SELECT * FROM tasks WHERE id = ?"]
+    [problem] = log.problems()
+    assert "N+1" in problem and "3 veces" in problem
+
+
+def test_allow_repeats_silences_the_detector(monkeypatch):
+    monkeypatch.setattr(settings, "SQL_N_PLUS_ONE_THRESHOLD", 2)
+    log = StatementLog("POST /tasks/import", budget=None, allow_repeats=True)
+    for _ in range(5):
+        log.record("INSERT INTO tasks (id) VALUES ($1)")
+    assert log.problems() == []
+
+
+def test_budget_exceeded_is_reported():
+    log = StatementLog("GET /tasks", budget=1)
+    log.record("SELECT 1")
+    log.record("SELECT 2 FROM tasks")
+    assert log.problems() == ["GET /tasks: 2 sentencias SQL, presupuesto 1"]
+
+
+@pytest.mark.anyio
+async def test_route_over_budget_fails_in_raise_mode(app, client, user, monkeypatch):
+    monkeypatch.setattr(settings, "SQL_BUDGET_MODE", RAISE)
+    [route] = [route for route in app.routes if getattr(route, "path", None) == "/tasks/{task_id}"
+               and "GET" in route.methods]
+    monkeypatch.setattr(route, "_sql_budget", 0)
+
+    with capture_sql() as logs, pytest.raises(SqlBudgetExceeded):
+        await client.get(f"/tasks/{user['task_id']}", headers=user["headers"])
+    assert logs[0].total > 0
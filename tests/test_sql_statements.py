@@ -0,0 +1,114 @@
+"""Número exacto de sentencias SQL por endpoint, con SQL_BUDGET_MODE=raise.
+
+Se mide con la caché de usuarios vacía (el peor caso: incluye la consulta del usuario
+autenticado). Si un cambio añade o quita sentencias, hay que actualizar aquí el número
+y, si supera el presupuesto, también el `@sql_budget` de la ruta.
+"""
+import uuid
+
+import pytest
+
+from app.config import settings
+from app.core.metrics import InstrumentedRoute
+from app.core.principal_cache import principal_cache
+from app.core.sql_budget import RAISE, capture_sql
+from app.main import app
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(autouse=True)
+def raise_on_budget(monkeypatch):
+    monkeypatch.setattr(settings, "SQL_BUDGET_MODE", RAISE)
+
+
+async def statements(client, method: str, url: str, **kwargs) -> int:
+    principal_cache.clear()
+    with capture_sql() as logs:
+        response = await client.request(method, url, **kwargs)
+    assert response.status_code < 400, response.text
+    assert len(logs) == 1
+    client.cookies.clear()
+    return logs[0].total
+
+
+def test_every_route_declares_a_budget():
+    missing = [
+        f"{sorted(route.methods)} {route.path}"
+        for route in app.routes
+        if isinstance(route, InstrumentedRoute) and not hasattr(route.endpoint, "__sql_budget__")
+    ]
+    assert not missing
+
+
+async def test_register(client):
+    user = {"name_complete": "Prueba Registro", "email": f"pytest-{uuid.uuid4().hex[:12]}@example.com",
+            "password": "secreto", "role": "Public"}
+    assert await statements(client, "POST", "/auth/register", json=user) == 6
+
+
+async def test_login(client, user):
+    credentials = {"email": user["email"], "password": user["password"]}
+    assert await statements(client, "POST", "/auth/login", json=credentials) == 1
+
+
+async def test_login_with_rehash(client, legacy_password):
+    # Guarda el hash nuevo, cambia la versión de usuarios (ETag de los listados) y avisa a los workers
+    credentials = {"email": legacy_password["email"], "password": legacy_password["password"]}
+    assert await statements(client, "POST", "/auth/login", json=credentials) == 4
+
+
+async def test_me(client, user):
+    assert await statements(client, "GET", "/auth/me", headers=user["headers"]) == 1
+
+
+async def test_list_tasks(client, user):
+    assert await statements(client, "GET", "/tasks", headers=user["headers"]) == 3
+
+
+async def test_get_task(client, user):
+    assert await statements(client, "GET", f"/tasks/{user['task_id']}", headers=user["headers"]) == 2
+
+
+async def test_update_task(client, user):
+    url = f"/tasks/{user['task_id']}"
+    assert await statements(client, "PUT", url, json={"status": "done"}, headers=user["headers"]) == 7
+
+
+async def test_logout(client, user):
+    # Backend de revocación en memoria: no toca la base de datos
+    assert await statements(client, "GET", "/auth/logout", headers=user["headers"]) == 0
+
+
+async def test_list_users(client, admin_headers):
+    assert await statements(client, "GET", "/users", headers=admin_headers) == 3
+
+
+async def test_filter_users(client, admin_headers):
+    assert await statements(client, "GET", "/users/filter", headers=admin_headers) == 4
+
+
+async def test_list_logs(client, admin_headers):
+    assert await statements(client, "GET", "/users/logs", headers=admin_headers) == 3
+
+
+async def test_get_user(client, user, admin_headers):
+    assert await statements(client, "GET", f"/users/{user['id']}", headers=admin_headers) == 2
+
+
+async def test_update_user(client, user, admin_headers):
+    url = f"/users/{user['id']}"
+    assert await statements(client, "PUT", url, json={"name_complete": "Otro Nombre"}, headers=admin_headers) == 8
+
+
+async def test_deactivate_and_activate_user(client, user, admin_headers):
+    assert await statements(client, "DELETE", f"/users/{user['id']}", headers=admin_headers) == 6
+    assert await statements(client, "POST", f"/users/activate/{user['id']}", headers=admin_headers) == 6
+
+
+async def test_pool_status(client, admin_headers):
+    assert await statements(client, "GET", "/admin/pool", headers=admin_headers) == 1
+
+
+async def test_reconcile_task_stats(client, admin_headers):
+    assert await statements(client, "POST", "/admin/task-stats/reconcile", headers=admin_headers) == 6
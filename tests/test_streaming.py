@@ -0,0 +1,25 @@
+"""Las rutas en streaming no deben depender de get_db.
+
+Desde FastAPI 0.118 las dependencias con yield se cierran al terminar de enviar la
+respuesta: una sesión de get_db retendría una conexión del pool durante todo el envío.
+"""
+import pytest
+
+from app.core.session import get_db
+from app.main import app
+
+
+def _dependency_calls(dependant):
+    for dependency in dependant.dependencies:
+        yield dependency.call
+        yield from _dependency_calls(dependency)
+
+
+def _route(path):
+    [route] = [route for route in app.routes if getattr(route, "path", None) == path]
+    return route
+
+
+@pytest.mark.parametrize("path", ["/tasks/export", "/tasks/stream"])
+def test_streaming_route_does_not_hold_a_db_session(path):
+    assert get_db not in set(_dependency_calls(_route(path).dependant))
@@ -0,0 +1,21 @@
+"""Reconciliación de task_stats: un solo worker la ejecuta a la vez."""
+import pytest
+from sqlalchemy import text
+
+from app.core.session import engine
+from app.jobs import task_stats
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_reconciliation_skips_while_another_worker_holds_the_lock(app):
+    async with engine.connect() as other:
+        await other.begin()
+        await other.execute(text("SELECT pg_advisory_xact_lock(:lock)"), {"lock": task_stats._LOCK_ID})
+        summary = await task_stats.run_task_stats_reconciliation()
+        await other.rollback()
+    assert summary == {"skipped": True, "rows": 0, "drift": []}
+
+    summary = await task_stats.run_task_stats_reconciliation()
+    assert summary["skipped"] is False
+    assert summary["drift"] == []